@@ -0,0 +1,53 @@
+"""Add composite indexes for per-assessment finding and control counts
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 10:00:00.000000
+
+This migration adds composite indexes matching the per-assessment COUNT
+filters used by the assessment, finding and analytics endpoints, so the
+counts can be answered from the index. Indexes are built CONCURRENTLY to
+avoid locking writes on existing tables.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_findings_assessment_severity_status',
+            'findings',
+            ['assessment_id', 'severity', 'status'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.create_index(
+            'ix_assessment_controls_assessment_status',
+            'assessment_controls',
+            ['assessment_id', 'testing_status'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_assessment_controls_assessment_status',
+            table_name='assessment_controls',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+        op.drop_index(
+            'ix_findings_assessment_severity_status',
+            table_name='findings',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
@@ -0,0 +1,39 @@
+"""Add index for keyset-paginated assessment listing
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 11:00:00.000000
+
+This migration adds an (agency_id, created_at, id) index so an agency's
+assessments can be listed newest first, and paged by keyset, from an index
+range scan. Built CONCURRENTLY to avoid locking writes.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_assessments_agency_created',
+            'assessments',
+            ['agency_id', 'created_at', 'id'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_assessments_agency_created',
+            table_name='assessments',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
@@ -1,10 +1,21 @@
+import orjson
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
 from typing import Generator
 from api.src.config import settings
 
+
+def _json_serializer(obj) -> str:
+    """orjson for JSON columns (AgentTask.payload, conversation messages, ...)"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 # Create the engine and a session factory. Annotate SessionLocal to help type checkers.
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(
+    settings.DATABASE_URL,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads
+)
 # SQLAlchemy 2.0 supports parameterizing sessionmaker with Session for typing
 SessionLocal: sessionmaker[Session] = sessionmaker(autocommit=False, autoflush=False, bind=engine)  # type: ignore[assignment]
 
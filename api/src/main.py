@@ -6,8 +6,10 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
 import logging
+import os
 
 from api.src.config import settings
 from api.src.routers import projects, controls, evidence, reports
@@ -27,6 +29,11 @@ async def lifespan(app: FastAPI):
     Starts the background task worker on startup and stops it on shutdown.
     """
     # Startup
+    # Bound the default executor used by asyncio.to_thread (blocking agentic tools)
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=int(os.getenv("TOOL_THREAD_POOL_SIZE", "32")))
+    )
+    
     logger.info("Starting async database...")
     from api.src.db.async_database import async_db
     await async_db.connect()
@@ -54,6 +61,12 @@ async def lifespan(app: FastAPI):
     except asyncio.CancelledError:
         pass
     
+    logger.info("Closing LLM clients...")
+    from api.src.services.agentic_assistant import close_llm_clients
+    from api.src.services.llm_service import close_llm_service
+    await close_llm_clients()
+    await close_llm_service()
+    
     logger.info("Closing async database...")
     await async_db.disconnect()
     
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON, Date, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, JSON, Date, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from api.src.database import Base
@@ -154,6 +154,10 @@ class Agency(Base):
 class Assessment(Base):
     """Comprehensive Assessment model for formal compliance evaluations"""
     __tablename__ = "assessments"
+    __table_args__ = (
+        # Agency assessment list, newest first, with keyset pagination
+        Index("ix_assessments_agency_created", "agency_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -219,6 +223,10 @@ class Assessment(Base):
 class Finding(Base):
     """Comprehensive Finding model for vulnerabilities and compliance gaps"""
     __tablename__ = "findings"
+    __table_args__ = (
+        # Per-assessment counts by severity and status
+        Index("ix_findings_assessment_severity_status", "assessment_id", "severity", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     assessment_id = Column(Integer, ForeignKey("assessments.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -372,6 +380,10 @@ class ConversationSession(Base):
 class AssessmentControl(Base):
     """Junction table for Assessment-Control many-to-many relationship"""
     __tablename__ = "assessment_controls"
+    __table_args__ = (
+        # Per-assessment counts by testing status
+        Index("ix_assessment_controls_assessment_status", "assessment_id", "testing_status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     assessment_id = Column(Integer, ForeignKey("assessments.id", ondelete="CASCADE"), nullable=False, index=True)
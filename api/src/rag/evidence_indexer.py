@@ -13,10 +13,10 @@ Pipeline:
 
 import logging
 from typing import Dict, Any, List, Optional
-from datetime import datetime
 from sqlalchemy.orm import Session
 
 from api.src.config import settings
+from api.src.utils.datetime_utils import utc_now_iso
 
 logger = logging.getLogger(__name__)
 
@@ -240,7 +240,9 @@ class EvidenceIndexer:
             evidence_id: Database ID of the evidence record
             file_path: Path to the evidence file
             evidence_metadata: Metadata about the evidence (control_id, title, etc.)
-            db: Optional database session for updating indexed status
+            db: Optional database session for updating indexed status; when
+                omitted (e.g. indexing in the background) a session of our
+                own is opened and closed here
             
         Returns:
             Dict with indexing results
@@ -304,7 +306,11 @@ class EvidenceIndexer:
                 logger.info(f"📝 Azure Search disabled - {len(chunks)} chunks prepared but not uploaded")
             
             # Step 4: Update evidence record with indexed timestamp
-            if db and result["success"]:
+            if result["success"]:
+                owns_session = db is None
+                if owns_session:
+                    from api.src.database import SessionLocal
+                    db = SessionLocal()
                 try:
                     from api.src.models import Evidence
                     evidence = db.query(Evidence).filter(Evidence.id == evidence_id).first()
@@ -314,6 +320,9 @@ class EvidenceIndexer:
                         logger.info(f"✅ Evidence {evidence_id} indexed successfully")
                 except Exception as e:
                     logger.warning(f"Could not update evidence record: {e}")
+                finally:
+                    if owns_session:
+                        db.close()
             
             return result
             
@@ -334,6 +343,8 @@ class EvidenceIndexer:
             return 0
         
         documents = []
+        # One timestamp for the whole upload rather than one per chunk
+        indexed_at = utc_now_iso()
         
         for chunk in chunks:
             try:
@@ -356,7 +367,7 @@ class EvidenceIndexer:
                     "page_number": chunk.get("metadata", {}).get("page_number"),
                     "content": chunk["text"],
                     "content_vector": embedding,
-                    "indexed_at": datetime.utcnow().isoformat() + "Z"
+                    "indexed_at": indexed_at
                 }
                 
                 documents.append(search_doc)
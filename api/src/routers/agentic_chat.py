@@ -5,8 +5,9 @@ Natural language interface for compliance automation
 
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
+from sse_starlette.sse import EventSourceResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from typing import AsyncGenerator, Optional, Dict, Any, List
 from datetime import datetime
 import logging
 import json
@@ -17,7 +18,7 @@ from api.src.auth import get_current_user
 from api.src.models import AgentTask, User
 from api.src.services.llm_service import get_llm_service
 from api.src.services.conversation_manager import ConversationManager
-from api.src.services.agentic_assistant import AgenticAssistant
+from api.src.services.agentic_assistant import get_agentic_assistant
 from api.src.services.evidence_storage import evidence_storage_service
 
 logger = logging.getLogger(__name__)
@@ -119,7 +120,7 @@ async def chat(
         conversation_context = json.loads(context) if context else None
         
         # Initialize services
-        assistant = AgenticAssistant()  # Provider determined from LLM_PROVIDER env var
+        assistant = get_agentic_assistant()  # Provider determined from LLM_PROVIDER env var
         conv_manager = ConversationManager(db, current_user["id"])
         
         # Get or create session
@@ -329,12 +330,65 @@ async def chat(
         )
 
 
+@router.post("/stream")
+async def chat_stream(
+    message: str = Form(...),
+    conversation_id: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Streaming variant of the chat endpoint (text messages only).
+    
+    Emits SSE ``token`` events as the final answer is generated and a closing
+    ``done`` event with the session id, tool calls and any rich UI payload.
+    """
+    if not message or not message.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="Message cannot be empty. Please provide a question or command."
+        )
+    
+    if len(message) > 10000:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Message is too long ({len(message)} characters). Maximum allowed is 10,000 characters."
+        )
+    
+    assistant = get_agentic_assistant()
+    conv_manager = ConversationManager(db, current_user["id"])
+    
+    title = message[:50] + "..." if len(message) > 50 else message
+    session = conv_manager.get_session(conversation_id) if conversation_id else None
+    if not session:
+        session = conv_manager.create_session(title=title, session_id=conversation_id)
+    
+    conv_manager.add_message(session.session_id, role="user", content=message)
+    
+    async def event_generator() -> AsyncGenerator[Dict[str, str], None]:
+        try:
+            async for event in assistant.chat_stream(
+                message=message,
+                conversation_manager=conv_manager,
+                session_id=session.session_id,
+                db=db,
+                current_user=current_user
+            ):
+                event_type = event.pop("type")
+                yield {"event": event_type, "data": json.dumps(event, default=str)}
+        except Exception as e:
+            logger.error(f"Streaming chat error: {e}", exc_info=True)
+            yield {"event": "error", "data": json.dumps({"detail": f"Error processing chat: {str(e)}"})}
+    
+    return EventSourceResponse(event_generator())
+
+
 @router.get("/capabilities")
 async def get_capabilities():
     """Get list of available agentic capabilities"""
     # Get provider from AgenticAssistant (not LLMService) for accurate display
     try:
-        assistant = AgenticAssistant()
+        assistant = get_agentic_assistant()
         provider = assistant.provider
         model = assistant.model
         status = "active"
@@ -3,9 +3,12 @@ Analytics API
 Real-time metrics and dashboards for compliance tracking
 """
 
+import threading
+
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case
 from typing import Optional
 from datetime import datetime, timedelta
 from api.src.utils.datetime_utils import now_sgt
@@ -22,6 +25,18 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
+# Dashboard metrics per agency; dashboards refresh often and the numbers may lag briefly
+DASHBOARD_CACHE_TTL = 30.0
+_dashboard_cache: TTLCache = TTLCache(maxsize=1024, ttl=DASHBOARD_CACHE_TTL)
+_dashboard_cache_lock = threading.Lock()
+
+# Status and severity sets shared by the queries below, built once at import
+ACTIVE_ASSESSMENT_STATUSES = ("planning", "in_progress")
+OPEN_FINDING_STATUSES = ("open", "in_progress")
+RESOLVED_FINDING_STATUSES = ("resolved", "validated", "closed")
+BREAKDOWN_SEVERITIES = ("critical", "high", "medium", "low", "info")
+BREAKDOWN_STATUSES = OPEN_FINDING_STATUSES + RESOLVED_FINDING_STATUSES
+
 
 @router.get("/dashboard")
 async def get_dashboard_metrics(
@@ -40,82 +55,70 @@ async def get_dashboard_metrics(
     user = db.query(User).filter(User.id == current_user["id"]).first()
     agency_id = user.agency_id
     
-    # Assessment Metrics
-    total_assessments = db.query(Assessment).filter(
+    with _dashboard_cache_lock:
+        metrics = _dashboard_cache.get(agency_id)
+    if metrics is None:
+        metrics = _dashboard_metrics(db, agency_id)
+        with _dashboard_cache_lock:
+            _dashboard_cache[agency_id] = metrics
+    return metrics
+
+
+def _dashboard_metrics(db: Session, agency_id: int) -> dict:
+    """Compute the dashboard metrics for an agency (cached by get_dashboard_metrics)"""
+    # Assessment Metrics, from one GROUP BY status
+    assessment_status_counts = dict(db.query(
+        Assessment.status,
+        func.count(Assessment.id)
+    ).filter(
         Assessment.agency_id == agency_id
-    ).count()
+    ).group_by(Assessment.status).all())
     
-    active_assessments = db.query(Assessment).filter(
-        Assessment.agency_id == agency_id,
-        Assessment.status.in_(["planning", "in_progress"])
-    ).count()
-    
-    completed_assessments = db.query(Assessment).filter(
-        Assessment.agency_id == agency_id,
-        Assessment.status == "completed"
-    ).count()
-    
-    # Finding Metrics
-    findings_query = db.query(Finding).join(Assessment).filter(
-        Assessment.agency_id == agency_id
+    total_assessments = sum(assessment_status_counts.values())
+    active_assessments = sum(
+        assessment_status_counts.get(status, 0) for status in ACTIVE_ASSESSMENT_STATUSES
     )
+    completed_assessments = assessment_status_counts.get("completed", 0)
     
-    total_findings = findings_query.count()
-    
-    open_findings = findings_query.filter(
-        Finding.status == "open"
-    ).count()
-    
-    resolved_findings = findings_query.filter(
-        Finding.status.in_(["resolved", "validated", "closed"])
-    ).count()
-    
-    # Findings by Severity
-    critical_findings = findings_query.filter(
-        Finding.severity == "critical",
-        Finding.status.notin_(["resolved", "validated", "closed"])
-    ).count()
-    
-    high_findings = findings_query.filter(
-        Finding.severity == "high",
-        Finding.status.notin_(["resolved", "validated", "closed"])
-    ).count()
-    
-    medium_findings = findings_query.filter(
-        Finding.severity == "medium",
-        Finding.status.notin_(["resolved", "validated", "closed"])
-    ).count()
-    
-    low_findings = findings_query.filter(
-        Finding.severity == "low",
-        Finding.status.notin_(["resolved", "validated", "closed"])
-    ).count()
-    
-    # Overdue Findings
-    overdue_findings = findings_query.filter(
-        Finding.target_remediation_date < now_sgt().date(),
-        Finding.status.notin_(["resolved", "validated", "closed"])
-    ).count()
+    # Finding Metrics, all from one conditional-aggregate query
+    thirty_days_ago = now_sgt() - timedelta(days=30)
+    unresolved = Finding.status.notin_(RESOLVED_FINDING_STATUSES)
+    
+    (
+        total_findings,
+        open_findings,
+        resolved_findings,
+        critical_findings,
+        high_findings,
+        medium_findings,
+        low_findings,
+        overdue_findings,
+        recent_findings,
+        recent_resolved
+    ) = db.query(
+        func.count(Finding.id),
+        func.count(case((Finding.status == "open", 1))),
+        func.count(case((Finding.status.in_(RESOLVED_FINDING_STATUSES), 1))),
+        # Findings by Severity (unresolved only)
+        func.count(case((and_(Finding.severity == "critical", unresolved), 1))),
+        func.count(case((and_(Finding.severity == "high", unresolved), 1))),
+        func.count(case((and_(Finding.severity == "medium", unresolved), 1))),
+        func.count(case((and_(Finding.severity == "low", unresolved), 1))),
+        # Overdue Findings
+        func.count(case((and_(Finding.target_remediation_date < now_sgt().date(), unresolved), 1))),
+        # Recent Activity (last 30 days)
+        func.count(case((Finding.created_at >= thirty_days_ago, 1))),
+        func.count(case((Finding.actual_remediation_date >= thirty_days_ago, 1)))
+    ).select_from(Finding).join(Assessment).filter(
+        Assessment.agency_id == agency_id
+    ).one()
     
     # Control Metrics
-    total_controls = db.query(Control).filter(
-        Control.agency_id == agency_id
-    ).count()
-    
-    tested_controls = db.query(Control).filter(
-        Control.agency_id == agency_id,
-        Control.last_tested_at.isnot(None)
-    ).count()
-    
-    passed_controls = db.query(Control).filter(
-        Control.agency_id == agency_id,
-        Control.review_status == "passed"
-    ).count()
-    
-    failed_controls = db.query(Control).filter(
-        Control.agency_id == agency_id,
-        Control.review_status == "failed"
-    ).count()
+    control_counts = _control_counts(db, agency_id)
+    total_controls = control_counts["total"]
+    tested_controls = control_counts["tested"]
+    passed_controls = control_counts["passed"]
+    failed_controls = control_counts["failed"]
     
     # Evidence Metrics
     total_evidence = db.query(Evidence).join(Control).filter(
@@ -123,21 +126,11 @@ async def get_dashboard_metrics(
     ).count()
     
     # Recent Activity (last 30 days)
-    thirty_days_ago = now_sgt() - timedelta(days=30)
-    
     recent_assessments = db.query(Assessment).filter(
         Assessment.agency_id == agency_id,
         Assessment.created_at >= thirty_days_ago
     ).count()
     
-    recent_findings = findings_query.filter(
-        Finding.created_at >= thirty_days_ago
-    ).count()
-    
-    recent_resolved = findings_query.filter(
-        Finding.actual_remediation_date >= thirty_days_ago
-    ).count()
-    
     # Compliance Score (percentage of controls passing)
     compliance_score = 0
     if total_controls > 0:
@@ -189,6 +182,44 @@ async def get_dashboard_metrics(
     }
 
 
+def _control_counts(db: Session, agency_id: int) -> dict:
+    """
+    Every control counter used by the dashboard and testing stats, from one
+    conditional-aggregate query over the agency's controls
+    """
+    now = now_sgt()
+    (
+        total,
+        tested,
+        recently_tested,
+        tested_90_days,
+        passed,
+        failed,
+        needs_improvement
+    ) = db.query(
+        func.count(Control.id),
+        func.count(Control.last_tested_at),
+        func.count(case((Control.last_tested_at >= now - timedelta(days=30), 1))),
+        func.count(case((Control.last_tested_at >= now - timedelta(days=90), 1))),
+        func.count(case((Control.review_status == "passed", 1))),
+        func.count(case((Control.review_status == "failed", 1))),
+        func.count(case((Control.review_status == "needs_improvement", 1)))
+    ).filter(
+        Control.agency_id == agency_id
+    ).one()
+    
+    return {
+        "total": total,
+        "tested": tested,
+        "never_tested": total - tested,
+        "recently_tested": recently_tested,
+        "tested_90_days": tested_90_days,
+        "passed": passed,
+        "failed": failed,
+        "needs_improvement": needs_improvement
+    }
+
+
 @router.get("/assessments/trends")
 async def get_assessment_trends(
     days: int = Query(30, description="Number of days to analyze"),
@@ -273,13 +304,6 @@ async def get_findings_severity_breakdown(
     user = db.query(User).filter(User.id == current_user["id"]).first()
     agency_id = user.agency_id
     
-    query = db.query(Finding).join(Assessment).filter(
-        Assessment.agency_id == agency_id
-    )
-    
-    if assessment_id:
-        query = query.filter(Finding.assessment_id == assessment_id)
-    
     # Group by severity and resolution status
     results = db.query(
         Finding.severity,
@@ -294,19 +318,15 @@ async def get_findings_severity_breakdown(
     
     results = results.group_by(Finding.severity, Finding.status).all()
     
-    breakdown = {}
-    for severity in ["critical", "high", "medium", "low", "info"]:
-        breakdown[severity] = {
-            "open": 0,
-            "in_progress": 0,
-            "resolved": 0,
-            "validated": 0,
-            "closed": 0
-        }
+    breakdown = {
+        severity: dict.fromkeys(BREAKDOWN_STATUSES, 0)
+        for severity in BREAKDOWN_SEVERITIES
+    }
     
     for result in results:
-        if result.severity in breakdown and result.status in breakdown[result.severity]:
-            breakdown[result.severity][result.status] = result.count
+        counts = breakdown.get(result.severity)
+        if counts is not None and result.status in counts:
+            counts[result.status] = result.count
     
     return breakdown
 
@@ -320,56 +340,24 @@ async def get_control_testing_stats(
     user = db.query(User).filter(User.id == current_user["id"]).first()
     agency_id = user.agency_id
     
-    total = db.query(Control).filter(Control.agency_id == agency_id).count()
-    
-    # Never tested
-    never_tested = db.query(Control).filter(
-        Control.agency_id == agency_id,
-        Control.last_tested_at.is_(None)
-    ).count()
-    
-    # Tested in last 30 days
-    thirty_days_ago = now_sgt() - timedelta(days=30)
-    recently_tested = db.query(Control).filter(
-        Control.agency_id == agency_id,
-        Control.last_tested_at >= thirty_days_ago
-    ).count()
-    
-    # Tested in last 90 days
-    ninety_days_ago = now_sgt() - timedelta(days=90)
-    tested_90_days = db.query(Control).filter(
-        Control.agency_id == agency_id,
-        Control.last_tested_at >= ninety_days_ago
-    ).count()
-    
-    # By review status
-    passed = db.query(Control).filter(
-        Control.agency_id == agency_id,
-        Control.review_status == "passed"
-    ).count()
-    
-    failed = db.query(Control).filter(
-        Control.agency_id == agency_id,
-        Control.review_status == "failed"
-    ).count()
-    
-    needs_review = db.query(Control).filter(
-        Control.agency_id == agency_id,
-        Control.review_status == "needs_improvement"
-    ).count()
+    counts = _control_counts(db, agency_id)
+    total = counts["total"]
+    passed = counts["passed"]
+    failed = counts["failed"]
+    needs_review = counts["needs_improvement"]
     
     return {
         "total_controls": total,
-        "never_tested": never_tested,
-        "recently_tested": recently_tested,
-        "tested_90_days": tested_90_days,
+        "never_tested": counts["never_tested"],
+        "recently_tested": counts["recently_tested"],
+        "tested_90_days": counts["tested_90_days"],
         "by_status": {
             "passed": passed,
             "failed": failed,
             "needs_improvement": needs_review,
             "pending": total - passed - failed - needs_review
         },
-        "testing_coverage": round((tested_90_days / total * 100), 2) if total > 0 else 0
+        "testing_coverage": round((counts["tested_90_days"] / total * 100), 2) if total > 0 else 0
     }
 
 
@@ -380,33 +368,33 @@ async def get_my_workload(
 ):
     """Get current user's assigned workload"""
     user = db.query(User).filter(User.id == current_user["id"]).first()
+    today = now_sgt().date()
     
     # Assigned assessments
     my_assessments = db.query(Assessment).filter(
         Assessment.lead_assessor_user_id == current_user["id"],
-        Assessment.status.in_(["planning", "in_progress"])
+        Assessment.status.in_(ACTIVE_ASSESSMENT_STATUSES)
     ).count()
     
     # Assigned findings
     my_findings = db.query(Finding).join(Assessment).filter(
         Finding.assigned_to_user_id == current_user["id"],
-        Finding.status.in_(["open", "in_progress"])
+        Finding.status.in_(OPEN_FINDING_STATUSES)
     ).count()
     
     # Overdue findings
     my_overdue = db.query(Finding).join(Assessment).filter(
         Finding.assigned_to_user_id == current_user["id"],
-        Finding.target_remediation_date < now_sgt().date(),
-        Finding.status.in_(["open", "in_progress"])
+        Finding.target_remediation_date < today,
+        Finding.status.in_(OPEN_FINDING_STATUSES)
     ).count()
     
     # Findings due soon (next 7 days)
-    seven_days = now_sgt() + timedelta(days=7)
     due_soon = db.query(Finding).join(Assessment).filter(
         Finding.assigned_to_user_id == current_user["id"],
-        Finding.target_remediation_date <= seven_days.date(),
-        Finding.target_remediation_date >= now_sgt().date(),
-        Finding.status.in_(["open", "in_progress"])
+        Finding.target_remediation_date <= today + timedelta(days=7),
+        Finding.target_remediation_date >= today,
+        Finding.status.in_(OPEN_FINDING_STATUSES)
     ).count()
     
     return {
@@ -427,33 +415,45 @@ async def get_agency_comparison(
     """Get comparison metrics across all agencies (Admin only)"""
     
     agencies = db.query(Agency).filter(Agency.active == True).all()
+    agency_ids = [agency.id for agency in agencies]
+    
+    # One grouped query per table instead of four COUNTs per agency
+    assessment_counts = dict(db.query(
+        Assessment.agency_id,
+        func.count(Assessment.id)
+    ).filter(
+        Assessment.agency_id.in_(agency_ids)
+    ).group_by(Assessment.agency_id).all())
+    
+    finding_counts = {
+        agency_id: (total, open_count)
+        for agency_id, total, open_count in db.query(
+            Assessment.agency_id,
+            func.count(Finding.id),
+            func.count(case((Finding.status == "open", 1)))
+        ).select_from(Finding).join(Assessment).filter(
+            Assessment.agency_id.in_(agency_ids)
+        ).group_by(Assessment.agency_id).all()
+    }
+    
+    control_counts = dict(db.query(
+        Control.agency_id,
+        func.count(Control.id)
+    ).filter(
+        Control.agency_id.in_(agency_ids)
+    ).group_by(Control.agency_id).all())
     
     comparison = []
     for agency in agencies:
-        total_assessments = db.query(Assessment).filter(
-            Assessment.agency_id == agency.id
-        ).count()
-        
-        total_findings = db.query(Finding).join(Assessment).filter(
-            Assessment.agency_id == agency.id
-        ).count()
-        
-        open_findings = db.query(Finding).join(Assessment).filter(
-            Assessment.agency_id == agency.id,
-            Finding.status == "open"
-        ).count()
-        
-        total_controls = db.query(Control).filter(
-            Control.agency_id == agency.id
-        ).count()
+        total_findings, open_findings = finding_counts.get(agency.id, (0, 0))
         
         comparison.append({
             "agency_id": agency.id,
             "agency_name": agency.name,
-            "assessments": total_assessments,
+            "assessments": assessment_counts.get(agency.id, 0),
             "findings": total_findings,
             "open_findings": open_findings,
-            "controls": total_controls
+            "controls": control_counts.get(agency.id, 0)
         })
     
     return comparison
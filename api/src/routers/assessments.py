@@ -4,6 +4,7 @@ Endpoints for creating, managing, and tracking security assessments
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import datetime
@@ -96,17 +97,30 @@ async def list_assessments(
     status_filter: Optional[str] = Query(None, description="Filter by status"),
     assessment_type: Optional[str] = Query(None, description="Filter by type"),
     assigned_to_me: bool = Query(False, description="Show only my assignments"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Maximum assessments to return"),
+    before_created_at: Optional[datetime] = Query(None, description="Keyset cursor: created_at of the last assessment seen"),
+    before_id: Optional[int] = Query(None, description="Keyset cursor: id of the last assessment seen"),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    List all assessments for the user's agency
+    List all assessments for the user's agency, newest first
     
     Filters:
     - status: open, in_progress, completed, closed
     - assessment_type: vapt, infra_pt, compliance_audit
     - assigned_to_me: show only assessments assigned to current user
+    
+    Pagination (optional): pass limit, then the created_at and id of the last
+    assessment received as before_created_at/before_id to get the next page.
     """
+    # Half a cursor would silently return the first page again
+    if (before_created_at is None) != (before_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="before_created_at and before_id must be given together"
+        )
+    
     user = db.query(User).filter(User.id == current_user["id"]).first()
     
     query = db.query(Assessment).filter(Assessment.agency_id == user.agency_id)
@@ -121,23 +135,42 @@ async def list_assessments(
     if assigned_to_me:
         query = query.filter(Assessment.lead_assessor_user_id == current_user["id"])
     
+    # Keyset pagination: seek past the cursor instead of OFFSET-scanning earlier pages
+    if before_id is not None:
+        query = query.filter(
+            tuple_(Assessment.created_at, Assessment.id) < (before_created_at, before_id)
+        )
+    
     # Load relationships
     query = query.options(
         joinedload(Assessment.lead_assessor)
     )
     
-    assessments = query.order_by(Assessment.created_at.desc()).all()
+    query = query.order_by(Assessment.created_at.desc(), Assessment.id.desc())
+    if limit:
+        query = query.limit(limit)
+    assessments = query.all()
+    assessment_ids = [assessment.id for assessment in assessments]
+    
+    # Statistics for all listed assessments in one grouped query per table
+    findings_counts = dict(db.query(
+        Finding.assessment_id,
+        func.count(Finding.id)
+    ).filter(
+        Finding.assessment_id.in_(assessment_ids)
+    ).group_by(Finding.assessment_id).all())
+    
+    controls_counts = dict(db.query(
+        AssessmentControl.assessment_id,
+        func.count(AssessmentControl.id)
+    ).filter(
+        AssessmentControl.assessment_id.in_(assessment_ids)
+    ).group_by(AssessmentControl.assessment_id).all())
     
-    # Calculate statistics for each assessment
     result = []
     for assessment in assessments:
-        findings_count = db.query(Finding).filter(
-            Finding.assessment_id == assessment.id
-        ).count()
-        
-        controls_count = db.query(AssessmentControl).filter(
-            AssessmentControl.assessment_id == assessment.id
-        ).count()
+        findings_count = findings_counts.get(assessment.id, 0)
+        controls_count = controls_counts.get(assessment.id, 0)
         
         # DEBUG: Log project_id
         logger.info(f"Assessment {assessment.id} has project_id: {assessment.project_id}")
@@ -183,23 +216,28 @@ async def get_assessment(
             detail="Assessment not found"
         )
     
-    # Get related statistics
-    findings = db.query(Finding).filter(Finding.assessment_id == assessment_id).all()
-    controls = db.query(AssessmentControl).filter(
+    # Get related statistics as counts rather than loading the rows
+    finding_counts = db.query(
+        Finding.severity,
+        Finding.status,
+        func.count(Finding.id)
+    ).filter(
+        Finding.assessment_id == assessment_id
+    ).group_by(Finding.severity, Finding.status).all()
+    controls_count = db.query(func.count(AssessmentControl.id)).filter(
         AssessmentControl.assessment_id == assessment_id
-    ).all()
-    
-    # Calculate findings by severity
-    findings_by_severity = {
-        "critical": len([f for f in findings if f.severity == "critical"]),
-        "high": len([f for f in findings if f.severity == "high"]),
-        "medium": len([f for f in findings if f.severity == "medium"]),
-        "low": len([f for f in findings if f.severity == "low"]),
-        "info": len([f for f in findings if f.severity == "info"])
-    }
-    
-    # Calculate resolution status
-    resolved_findings = len([f for f in findings if f.status == "resolved"])
+    ).scalar()
+    
+    # Calculate findings by severity and resolution status
+    findings_by_severity = dict.fromkeys(["critical", "high", "medium", "low", "info"], 0)
+    findings_count = 0
+    resolved_findings = 0
+    for severity, finding_status, count in finding_counts:
+        findings_count += count
+        if severity in findings_by_severity:
+            findings_by_severity[severity] += count
+        if finding_status == "resolved":
+            resolved_findings += count
     
     return {
         "id": assessment.id,
@@ -218,10 +256,10 @@ async def get_assessment(
         "assessment_period_end": assessment.actual_end_date,
         "created_at": assessment.created_at,
         "updated_at": assessment.updated_at,
-        "findings_count": len(findings),
+        "findings_count": findings_count,
         "findings_resolved": resolved_findings,
         "findings_by_severity": findings_by_severity,
-        "controls_tested_count": len(controls)
+        "controls_tested_count": controls_count
     }
 
 
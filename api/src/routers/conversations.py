@@ -62,17 +62,15 @@ async def list_conversation_sessions(
     try:
         manager = ConversationManager(db, current_user["id"])
         
-        if active_only:
-            sessions = manager.get_active_sessions(limit=limit)
-        else:
-            sessions = manager.get_all_sessions(limit=limit)
+        # Header columns only; the message arrays stay in the database
+        sessions = manager.list_session_headers(active_only=active_only, limit=limit)
         
         return [
             ConversationSessionSummary(
                 id=s.id,
                 session_id=s.session_id,
                 title=s.title,
-                message_count=len(s.messages or []),
+                message_count=s.message_count,
                 created_at=s.created_at,
                 last_activity=s.last_activity,
                 active=s.active
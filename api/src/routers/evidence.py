@@ -1,10 +1,11 @@
 from pathlib import Path
 from typing import List, Optional
+from urllib.parse import quote
 from datetime import datetime
 import json
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
@@ -241,13 +242,29 @@ def download_evidence(
     if not check_agency_access(current_user, evidence.agency_id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
+    media_type = evidence.mime_type or "application/octet-stream"
+
+    # Blobs are streamed through chunk by chunk rather than buffered whole
+    if evidence_storage_service.backend == "azure":
+        try:
+            chunks = evidence_storage_service.iter_file(evidence.file_path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Evidence file not found") from None
+
+        filename = evidence.original_filename or Path(evidence.file_path).name
+        return StreamingResponse(
+            chunks,
+            media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}"}
+        )
+
     try:
         file_path = evidence_storage_service.resolve_file_path(evidence.file_path)
     except FileNotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Evidence file not found") from None
 
+    # FileResponse sends local files with sendfile where available
     filename = evidence.original_filename or Path(file_path).name
-    media_type = evidence.mime_type or "application/octet-stream"
     return FileResponse(path=file_path, media_type=media_type, filename=filename)
 
 
@@ -4,6 +4,7 @@ Endpoints for creating, managing, and tracking security findings through their l
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import datetime, timedelta
@@ -29,6 +30,38 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/findings", tags=["findings"])
 
+# Remediation priority: most severe first (unknown severities last)
+SEVERITY_RANK = case(
+    (Finding.severity == "critical", 0),
+    (Finding.severity == "high", 1),
+    (Finding.severity == "medium", 2),
+    (Finding.severity == "low", 3),
+    (Finding.severity == "info", 4),
+    else_=5
+)
+
+# Severities with a findings_count_* column on Assessment, in column order
+COUNTED_SEVERITIES = ("critical", "high", "medium", "low")
+
+
+def _refresh_severity_counts(db: Session, assessment: Assessment) -> None:
+    """
+    Recompute the assessment's cached findings_count_* columns from its findings
+    (one conditional-aggregate query). Call after flushing any finding insert,
+    delete or severity change so readers can trust the cached counts.
+    """
+    counts = db.query(
+        *(func.count(case((Finding.severity == severity, 1))) for severity in COUNTED_SEVERITIES)
+    ).filter(
+        Finding.assessment_id == assessment.id
+    ).one()
+    (
+        assessment.findings_count_critical,
+        assessment.findings_count_high,
+        assessment.findings_count_medium,
+        assessment.findings_count_low
+    ) = counts
+
 
 @router.post("/", response_model=FindingResponse, status_code=status.HTTP_201_CREATED)
 async def create_finding(
@@ -104,28 +137,14 @@ async def create_finding(
         created_by_user_id=current_user["id"]
     )
     
+    # Insert and recount in one transaction; the flush makes the new row visible to the count
     db.add(finding)
-    db.commit()
-    db.refresh(finding)
+    db.flush()
     
     # Update assessment findings count by severity
-    assessment.findings_count_critical = db.query(Finding).filter(
-        Finding.assessment_id == assessment.id,
-        Finding.severity == "critical"
-    ).count()
-    assessment.findings_count_high = db.query(Finding).filter(
-        Finding.assessment_id == assessment.id,
-        Finding.severity == "high"
-    ).count()
-    assessment.findings_count_medium = db.query(Finding).filter(
-        Finding.assessment_id == assessment.id,
-        Finding.severity == "medium"
-    ).count()
-    assessment.findings_count_low = db.query(Finding).filter(
-        Finding.assessment_id == assessment.id,
-        Finding.severity == "low"
-    ).count()
+    _refresh_severity_counts(db, assessment)
     db.commit()
+    db.refresh(finding)
     
     logger.info(f"Finding created: {finding.id} by user {current_user['id']}")
     
@@ -185,9 +204,12 @@ async def list_findings(
         joinedload(Finding.assessment)
     )
     
+    # Priority ordering is done by the database: severity rank, then nearest
+    # remediation deadline, then oldest first
     findings = query.order_by(
-        Finding.severity.desc(),
-        Finding.created_at.desc()
+        SEVERITY_RANK,
+        Finding.target_remediation_date.asc().nulls_last(),
+        Finding.created_at.asc()
     ).all()
     
     result = []
@@ -304,9 +326,15 @@ async def update_finding(
     
     # Update fields
     update_dict = update_data.dict(exclude_unset=True)
+    severity_changed = update_dict.get("severity", finding.severity) != finding.severity
     for key, value in update_dict.items():
         setattr(finding, key, value)
     
+    # Keep the assessment's cached severity counts in step
+    if severity_changed:
+        db.flush()
+        _refresh_severity_counts(db, finding.assessment)
+    
     db.commit()
     db.refresh(finding)
     
@@ -644,7 +672,10 @@ async def delete_finding(
             detail="Finding not found"
         )
     
+    assessment = finding.assessment
     db.delete(finding)
+    db.flush()
+    _refresh_severity_counts(db, assessment)
     db.commit()
     
     logger.info(f"Finding {finding_id} deleted by admin {current_user['id']}")
@@ -11,7 +11,7 @@ from api.src.rag.hybrid_rag import hybrid_rag
 from api.src.rag.im8_agent import im8_agent
 from api.src.services.ai_task_orchestrator import ai_task_orchestrator
 from api.src.services.conversation_manager import ConversationManager
-from api.src.services.agentic_assistant import AgenticAssistant
+from api.src.services.agentic_assistant import get_agentic_assistant
 from api.src.config import settings
 import os
 import tempfile
@@ -22,7 +22,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/rag", tags=["RAG System"])
 
 # Initialize assistants (both for feature flag support)
-agentic_assistant = AgenticAssistant()
+agentic_assistant = get_agentic_assistant()
 
 # Agent Framework assistant (lazy load based on feature flag)
 agent_framework_assistant = None
@@ -144,22 +144,23 @@ async def ask_question(
             # Task was created
             answer = task_result['message']
             
-            # Add assistant message to conversation
-            conv_manager.add_message(
-                session.session_id,
-                role="assistant",
-                content=answer,
-                task_id=task_result['task_id']
-            )
-            
-            # Update context with task info
-            conv_manager.update_context(
-                session.session_id,
-                {
-                    "last_task_id": task_result['task_id'],
-                    "last_task_type": task_result['task_type']
-                }
-            )
+            # Add assistant message and task context to conversation in one commit
+            with conv_manager.batch():
+                conv_manager.add_message(
+                    session.session_id,
+                    role="assistant",
+                    content=answer,
+                    task_id=task_result['task_id']
+                )
+                
+                # Update context with task info
+                conv_manager.update_context(
+                    session.session_id,
+                    {
+                        "last_task_id": task_result['task_id'],
+                        "last_task_type": task_result['task_type']
+                    }
+                )
             
             return {
                 "query": request.query,
@@ -645,22 +646,23 @@ async def ask_with_file(
         
         # If a task was created, return task creation response
         if task_result:
-            # Add assistant message to conversation
-            conv_manager.add_message(
-                session.session_id,
-                role="assistant",
-                content=task_result['message'],
-                task_id=task_result['task_id']
-            )
-            
-            # Update context with task info
-            conv_manager.update_context(
-                session.session_id,
-                {
-                    "last_task_id": task_result['task_id'],
-                    "last_task_type": task_result['task_type']
-                }
-            )
+            # Add assistant message and task context to conversation in one commit
+            with conv_manager.batch():
+                conv_manager.add_message(
+                    session.session_id,
+                    role="assistant",
+                    content=task_result['message'],
+                    task_id=task_result['task_id']
+                )
+                
+                # Update context with task info
+                conv_manager.update_context(
+                    session.session_id,
+                    {
+                        "last_task_id": task_result['task_id'],
+                        "last_task_type": task_result['task_type']
+                    }
+                )
             
             return {
                 "query": query,
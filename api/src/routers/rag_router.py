@@ -26,12 +26,7 @@ async def debug_evidence_path(evidence_id: int, db: Session = Depends(get_db)) -
         raise HTTPException(status_code=404, detail=f"Evidence {evidence_id} not found")
     
     # Check if blob exists with current path
-    current_blob_exists = False
-    try:
-        file_content = evidence_storage_service.download_file(evidence.file_path)
-        current_blob_exists = True
-    except Exception as e:
-        pass
+    current_blob_exists = evidence_storage_service.file_exists(evidence.file_path)
     
     # Try alternative path with control_id=0
     alt_path = None
@@ -40,11 +35,7 @@ async def debug_evidence_path(evidence_id: int, db: Session = Depends(get_db)) -
         parts = evidence.file_path.split('/')
         if len(parts) == 3:
             alt_path = f"{parts[0]}/0/{parts[2]}"
-            try:
-                file_content = evidence_storage_service.download_file(alt_path)
-                alt_blob_exists = True
-            except Exception as e:
-                pass
+            alt_blob_exists = evidence_storage_service.file_exists(alt_path)
     
     return {
         "evidence_id": evidence.id,
@@ -69,10 +60,8 @@ async def fix_evidence_path(evidence_id: int, new_path: str, db: Session = Depen
         raise HTTPException(status_code=404, detail=f"Evidence {evidence_id} not found")
     
     # Verify new path exists
-    try:
-        evidence_storage_service.download_file(new_path)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"New path doesn't exist: {e}")
+    if not evidence_storage_service.file_exists(new_path):
+        raise HTTPException(status_code=400, detail=f"New path doesn't exist: {new_path}")
     
     old_path = evidence.file_path
     evidence.file_path = new_path
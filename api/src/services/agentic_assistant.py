@@ -5,823 +5,902 @@ Supports: Groq, GitHub Models (OpenAI-compatible API)
 """
 
 import os
-import json
-from typing import Dict, Any, List, Optional
+import asyncio
+import concurrent.futures
+from dataclasses import dataclass
+from functools import partial
+from typing import AsyncIterator, Dict, Any, List, Optional
 from datetime import datetime
-from groq import Groq
-from openai import OpenAI
+import httpx
+import orjson
+from cachetools import TLRUCache
 import logging
 
+from api.src.models import AgentTask
 from api.src.services.conversation_manager import ConversationManager
-from api.src.services.ai_task_orchestrator import ai_task_orchestrator
 from api.src.services.evidence_storage import evidence_storage_service
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# Provider configuration, read once at import
+_LLM_PROVIDER = os.getenv("LLM_PROVIDER", "github")  # github, groq, openai
+_GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+_GITHUB_MODEL = os.getenv("GITHUB_MODEL", "gpt-4o-mini")
+_OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+_OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+_GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+_HTTPX_MAX_CONNECTIONS = int(os.getenv("AGENTIC_HTTPX_MAX_CONN", "200"))
 
-class AgenticAssistant:
-    """Agentic conversational agent with tool calling (supports multiple providers)"""
+# Async LLM clients shared across AgenticAssistant instances (one per provider)
+# so the underlying httpx connection pool is reused between requests
+_llm_clients: Dict[str, Any] = {}
+
+
+def _build_http_client(http2: bool) -> httpx.AsyncClient:
+    """Build an httpx client with a connection pool sized for concurrent chat sessions"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=_HTTPX_MAX_CONNECTIONS,
+            max_keepalive_connections=max(1, _HTTPX_MAX_CONNECTIONS // 2)
+        ),
+        http2=http2,
+        timeout=60.0
+    )
+
+
+def _get_llm_client(provider: str) -> Any:
+    """Get or create the async LLM client for a provider"""
+    client = _llm_clients.get(provider)
+    if client is not None:
+        return client
     
-    # Tool complexity configuration for dynamic LLM parameters
-    TOOL_COMPLEXITY = {
-        "upload_evidence": {"temperature": 0.2, "max_tokens": 400},
-        "search_documents": {"temperature": 0.3, "max_tokens": 800},  # RAG needs more space
-        "search_evidence_content": {"temperature": 0.3, "max_tokens": 800},  # Evidence content search
-        "analyze_evidence": {"temperature": 0.2, "max_tokens": 600},
-        "analyze_evidence_rag": {"temperature": 0.2, "max_tokens": 600},
-        "analyze_evidence_for_control": {"temperature": 0.3, "max_tokens": 1000},  # AI insights need more space
-        "submit_for_review": {"temperature": 0.1, "max_tokens": 300},
-        "submit_evidence_for_review": {"temperature": 0.1, "max_tokens": 300},
-        "request_evidence_upload": {"temperature": 0.2, "max_tokens": 400},
-        "suggest_related_controls": {"temperature": 0.3, "max_tokens": 700},
-        "fetch_evidence": {"temperature": 0.2, "max_tokens": 500},
-        "mcp_fetch_evidence": {"temperature": 0.2, "max_tokens": 500},
-        "mcp_analyze_compliance": {"temperature": 0.3, "max_tokens": 700},
-        "list_projects": {"temperature": 0.2, "max_tokens": 500},
-        # Default for unknown tools
-        "default": {"temperature": 0.2, "max_tokens": 500}
-    }
+    # SDKs are imported per branch so a deployment only loads the one it uses
+    if provider == "github":
+        from openai import AsyncOpenAI
+        # HTTP/2 multiplexes concurrent completions over a single connection
+        client = AsyncOpenAI(
+            base_url="https://models.inference.ai.azure.com",
+            api_key=_GITHUB_TOKEN,
+            http_client=_build_http_client(http2=True)
+        )
+    elif provider == "openai":
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(
+            api_key=_OPENAI_API_KEY,
+            http_client=_build_http_client(http2=True)
+        )
+    else:  # groq
+        from groq import AsyncGroq
+        client = AsyncGroq(
+            api_key=_GROQ_API_KEY,
+            http_client=_build_http_client(http2=False)
+        )
     
-    def __init__(self):
-        # Detect which provider to use (default to github for reliable tool calling)
-        self.provider = os.getenv("LLM_PROVIDER", "github")  # github, groq, openai
-        
-        if self.provider == "github":
-            # GitHub Models (free tier)
-            github_token = os.getenv("GITHUB_TOKEN")
-            if not github_token:
-                raise ValueError("GITHUB_TOKEN required for GitHub Models")
-            
-            self.client = OpenAI(
-                base_url="https://models.inference.ai.azure.com",
-                api_key=github_token
+    _llm_clients[provider] = client
+    return client
+
+
+async def close_llm_clients() -> None:
+    """Close shared LLM clients and their connection pools (call on app shutdown)"""
+    for provider, client in list(_llm_clients.items()):
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning("Failed to close %s LLM client: %s", provider, e)
+    _llm_clients.clear()
+
+
+# Side-effect-free tools whose results may be reused, with freshness (seconds)
+# per tool. Task-creating tools (fetch_evidence, analyze_compliance, ...) and
+# mutations (upload_evidence, submit_for_review, ...) must never be listed here.
+_CACHEABLE_TOOL_TTLS: Dict[str, float] = {
+    "search_documents": 60,
+    "search_evidence_content": 60,
+    "mcp_analyze_compliance": 300,
+}
+
+# Keys are (tool name, canonical JSON args, user id)
+_tool_result_cache: TLRUCache = TLRUCache(
+    maxsize=1024,
+    ttu=lambda key, value, now: now + _CACHEABLE_TOOL_TTLS[key[0]]
+)
+
+@dataclass(frozen=True, slots=True)
+class ToolTaskConfig:
+    """Background task created for a slow-path tool call"""
+    task_type: str
+    title: str = "AI Assistant Task"
+
+
+# Tools executed by the task worker rather than inline
+_TOOL_TASKS: Dict[str, ToolTaskConfig] = {
+    "create_project": ToolTaskConfig("create_project", "Create New Project"),
+    "create_controls": ToolTaskConfig("create_controls", "Create IM8 Controls"),
+    "fetch_evidence": ToolTaskConfig("fetch_evidence", "Fetch Evidence"),  # MCP-based fetch
+    "analyze_compliance": ToolTaskConfig("analyze_compliance", "Analyze Compliance"),
+    "generate_report": ToolTaskConfig("generate_report", "Generate Compliance Report"),
+    "submit_for_review": ToolTaskConfig("submit_for_review", "Submit for Review"),
+    "request_evidence_upload": ToolTaskConfig("request_evidence_upload"),
+    "analyze_evidence": ToolTaskConfig("analyze_evidence_rag"),  # Use RAG version
+    "suggest_related_controls": ToolTaskConfig("suggest_related_controls"),
+    "submit_evidence_for_review": ToolTaskConfig("submit_evidence_for_review"),
+}
+
+# Tools whose output is readable as-is; when enabled, turns that only call
+# these skip the second (synthesis) LLM round-trip
+_DISPLAY_TOOLS = frozenset({"fetch_evidence", "search_documents"})
+_SKIP_SYNTHESIS = os.getenv("AGENTIC_SKIP_SYNTHESIS", "0") == "1"
+
+# Token budget for conversation history sent with each turn (prefill cost is
+# linear in input tokens, so this caps per-call latency)
+_HISTORY_TOKEN_BUDGET = int(os.getenv("AGENTIC_HISTORY_TOKEN_BUDGET", "4000"))
+
+# Output budget for the tool-deciding first pass. Kept small because providers
+# reserve KV-cache per max_tokens; a truncated prose answer is retried once
+_TOOL_DECISION_MAX_TOKENS = 256
+_TOOL_DECISION_RETRY_MAX_TOKENS = 2000
+
+
+def _log_prompt_cache_usage(response: Any, stage: str) -> None:
+    """Log token usage, including prompt tokens served from the provider's prefix cache"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details else None
+    logger.info(
+        "LLM %s usage: prompt_tokens=%s, cached_tokens=%s, completion_tokens=%s",
+        stage, usage.prompt_tokens, cached if cached is not None else "n/a", usage.completion_tokens
+    )
+
+
+def _log_background_indexing(evidence_id: int, future: concurrent.futures.Future) -> None:
+    """Done-callback for background evidence indexing, so failures are not lost"""
+    if future.cancelled():
+        logger.warning("Background indexing of evidence %s was cancelled", evidence_id)
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error("Background indexing of evidence %s failed: %s", evidence_id, error, exc_info=error)
+        return
+    result = future.result()
+    if not result.get("success"):
+        logger.warning("Background indexing of evidence %s failed: %s", evidence_id, result.get("error"))
+
+
+def _format_tool_errors(failed_results: List[Dict[str, Any]]) -> str:
+    """Deterministic user-facing message for tool calls that returned success=False"""
+    return "\n".join(
+        f"⚠️ Tool {tr['tool']} failed: {tr['result'].get('error', 'Unknown error')}"
+        for tr in failed_results
+    )
+
+
+def _render_tool_results(tool_results: List[Dict[str, Any]]) -> str:
+    """Format display-tool results as markdown without another LLM call"""
+    lines = []
+    for tr in tool_results:
+        result = tr["result"] or {}
+        if result.get("error"):
+            lines.append(f"⚠️ {tr['tool']} failed: {result['error']}")
+            continue
+        if result.get("message"):
+            lines.append(result["message"])
+        sources = result.get("sources")
+        if sources:
+            lines.append(f"Found {len(sources)} relevant document(s):")
+            lines.extend(
+                f"- {src['document_name']} (score {src.get('score', 0.0):.2f})"
+                for src in sources
             )
-            # Available models: gpt-4o, gpt-4o-mini, Llama-3.1-70B-Instruct, Phi-3-medium-128k-instruct
-            self.model = os.getenv("GITHUB_MODEL", "gpt-4o-mini")
-            logger.info(f"Using GitHub Models with {self.model}")
-            
-        elif self.provider == "openai":
-            # OpenAI (paid)
-            self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-            logger.info(f"Using OpenAI with {self.model}")
-            
-        else:  # groq
-            self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-            # Use llama-3.3-70b-versatile - Production model with tool use support
-            self.model = "llama-3.3-70b-versatile"
-            logger.info(f"Using Groq with {self.model}")
-        
-        # Define ALL tools (will be filtered by role at runtime)
-        self.all_tools = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "upload_evidence",
-                    "description": "Upload compliance evidence document for a control. ONLY call this tool when: (1) User HAS explicitly provided title, description, and evidence_type, (2) User HAS attached a file or provided file_path, (3) User HAS confirmed to proceed. DO NOT call with placeholder values like 'path_to_your_file' or default descriptions. If user just says 'upload evidence' without details, ASK for details instead of calling this tool.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "control_id": {
-                                "type": "string",
-                                "description": "The ID of the control this evidence relates to (can be numeric)"
-                            },
-                            "file_path": {
-                                "type": "string",
-                                "description": "Path to the uploaded file"
-                            },
-                            "title": {
-                                "type": "string",
-                                "description": "Specific, descriptive title for the evidence (e.g., 'MFA Policy v2.1', 'Access Control Audit Report Q4 2025')"
-                            },
-                            "description": {
-                                "type": "string",
-                                "description": "Description of the evidence"
-                            },
-                            "evidence_type": {
-                                "type": "string",
-                                "enum": ["policy_document", "audit_report", "configuration_screenshot", "log_file", "certificate", "procedure", "test_result"],
-                                "description": "Type of evidence: policy_document, audit_report, configuration_screenshot, log_file, certificate, procedure, or test_result"
-                            }
-                        },
-                        "required": ["file_path", "title", "evidence_type"]
+        elif "sources" in result:
+            lines.append("No matching documents found.")
+    return "\n".join(lines)
+
+
+# Tool-calling JSON schema for ALL tools (filtered by role at runtime).
+# Built once at import and shared by every AgenticAssistant instance; the
+# LLM SDKs only read this structure.
+_TOOLS_SCHEMA: List[Dict[str, Any]] = [
+    {
+        "type": "function",
+        "function": {
+            "name": "upload_evidence",
+            "description": "Upload compliance evidence document for a control. ONLY call this tool when: (1) User HAS explicitly provided title, description, and evidence_type, (2) User HAS attached a file or provided file_path, (3) User HAS confirmed to proceed. DO NOT call with placeholder values like 'path_to_your_file' or default descriptions. If user just says 'upload evidence' without details, ASK for details instead of calling this tool.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "control_id": {
+                        "type": "string",
+                        "description": "The ID of the control this evidence relates to (can be numeric)"
+                    },
+                    "file_path": {
+                        "type": "string",
+                        "description": "Path to the uploaded file"
+                    },
+                    "title": {
+                        "type": "string",
+                        "description": "Specific, descriptive title for the evidence (e.g., 'MFA Policy v2.1', 'Access Control Audit Report Q4 2025')"
+                    },
+                    "description": {
+                        "type": "string",
+                        "description": "Description of the evidence"
+                    },
+                    "evidence_type": {
+                        "type": "string",
+                        "enum": ["policy_document", "audit_report", "configuration_screenshot", "log_file", "certificate", "procedure", "test_result"],
+                        "description": "Type of evidence: policy_document, audit_report, configuration_screenshot, log_file, certificate, procedure, or test_result"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "fetch_evidence",
-                    "description": "Retrieve compliance evidence for a specific control or project. Use when user wants to view or download evidence.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "control_id": {
-                                "type": "string",
-                                "description": "The control ID to fetch evidence for (can be numeric)"
-                            },
-                            "project_id": {
-                                "type": "string",
-                                "description": "The project ID to fetch evidence for (can be numeric)"
-                            }
-                        }
+                },
+                "required": ["file_path", "title", "evidence_type"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "fetch_evidence",
+            "description": "Retrieve compliance evidence for a specific control or project. Use when user wants to view or download evidence.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "control_id": {
+                        "type": "string",
+                        "description": "The control ID to fetch evidence for (can be numeric)"
+                    },
+                    "project_id": {
+                        "type": "string",
+                        "description": "The project ID to fetch evidence for (can be numeric)"
                     }
                 }
-            },
-            # DEPRECATED: Old analyze_compliance tool - use mcp_analyze_compliance instead
-            # {
-            #     "type": "function",
-            #     "function": {
-            #         "name": "analyze_compliance",
-            #         "description": "Analyze compliance status and generate insights. Use when user wants compliance analysis or assessment.",
-            #         "parameters": {
-            #             "type": "object",
-            #             "properties": {
-            #                 "control_id": {
-            #                     "type": "string",
-            #                     "description": "The control ID to analyze (can be numeric)"
-            #                 },
-            #                 "analysis_type": {
-            #                     "type": "string",
-            #                     "enum": ["gap", "status", "risk"],
-            #                     "description": "Type of compliance analysis"
-            #                 }
-            #             },
-            #             "required": ["control_id"]
-            #         }
-            #     }
-            # },
-            {
-                "type": "function",
-                "function": {
-                    "name": "generate_report",
-                    "description": "Generate compliance report for a framework or project. Use when user wants to create reports.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "framework": {
-                                "type": "string",
-                                "enum": ["IM8", "NIST", "ISO27001"],
-                                "description": "Compliance framework"
-                            },
-                            "project_id": {
-                                "type": "string",
-                                "description": "Project ID for the report (can be numeric)"
-                            },
-                            "report_type": {
-                                "type": "string",
-                                "enum": ["compliance", "gap", "executive"],
-                                "description": "Type of report to generate"
-                            }
-                        },
-                        "required": ["framework"]
+            }
+        }
+    },
+    # DEPRECATED: Old analyze_compliance tool - use mcp_analyze_compliance instead
+    # {
+    #     "type": "function",
+    #     "function": {
+    #         "name": "analyze_compliance",
+    #         "description": "Analyze compliance status and generate insights. Use when user wants compliance analysis or assessment.",
+    #         "parameters": {
+    #             "type": "object",
+    #             "properties": {
+    #                 "control_id": {
+    #                     "type": "string",
+    #                     "description": "The control ID to analyze (can be numeric)"
+    #                 },
+    #                 "analysis_type": {
+    #                     "type": "string",
+    #                     "enum": ["gap", "status", "risk"],
+    #                     "description": "Type of compliance analysis"
+    #                 }
+    #             },
+    #             "required": ["control_id"]
+    #         }
+    #     }
+    # },
+    {
+        "type": "function",
+        "function": {
+            "name": "generate_report",
+            "description": "Generate compliance report for a framework or project. Use when user wants to create reports.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "framework": {
+                        "type": "string",
+                        "enum": ["IM8", "NIST", "ISO27001"],
+                        "description": "Compliance framework"
+                    },
+                    "project_id": {
+                        "type": "string",
+                        "description": "Project ID for the report (can be numeric)"
+                    },
+                    "report_type": {
+                        "type": "string",
+                        "enum": ["compliance", "gap", "executive"],
+                        "description": "Type of report to generate"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "submit_for_review",
-                    "description": "Submit evidence for maker-checker review. Use when user wants to submit evidence to auditor.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "evidence_id": {
-                                "type": "string",
-                                "description": "The evidence ID to submit for review (can be numeric)"
-                            }
-                        },
-                        "required": ["evidence_id"]
+                },
+                "required": ["framework"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "submit_for_review",
+            "description": "Submit evidence for maker-checker review. Use when user wants to submit evidence to auditor.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "evidence_id": {
+                        "type": "string",
+                        "description": "The evidence ID to submit for review (can be numeric)"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "request_evidence_upload",
-                    "description": "Request evidence upload from analyst when NO file is attached. Creates a pending evidence record as placeholder. User must upload file separately. Use ONLY when user has NOT attached a file in chat. If file IS attached, use upload_evidence instead. After calling this tool successfully, DO NOT call it again even if user says 'yes' - the upload request is already created.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "control_id": {
-                                "type": "integer",
-                                "description": "Control ID this evidence relates to (required)"
-                            },
-                            "title": {
-                                "type": "string",
-                                "description": "Brief title for the evidence (e.g., 'Access Control Policy Document')"
-                            },
-                            "description": {
-                                "type": "string",
-                                "description": "Detailed description of what evidence will be provided"
-                            },
-                            "evidence_type": {
-                                "type": "string",
-                                "enum": [
-                                    "policy_document",
-                                    "procedure", 
-                                    "audit_report",
-                                    "configuration_screenshot",
-                                    "log_file",
-                                    "certificate",
-                                    "test_result",
-                                    "document",
-                                    "screenshot",
-                                    "configuration",
-                                    "log",
-                                    "report",
-                                    "other"
-                                ],
-                                "description": "Type of evidence - choose most specific type that matches",
-                                "default": "document"
-                            }
-                        },
-                        "required": ["control_id", "title"]
+                },
+                "required": ["evidence_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "request_evidence_upload",
+            "description": "Request evidence upload from analyst when NO file is attached. Creates a pending evidence record as placeholder. User must upload file separately. Use ONLY when user has NOT attached a file in chat. If file IS attached, use upload_evidence instead. After calling this tool successfully, DO NOT call it again even if user says 'yes' - the upload request is already created.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "control_id": {
+                        "type": "integer",
+                        "description": "Control ID this evidence relates to (required)"
+                    },
+                    "title": {
+                        "type": "string",
+                        "description": "Brief title for the evidence (e.g., 'Access Control Policy Document')"
+                    },
+                    "description": {
+                        "type": "string",
+                        "description": "Detailed description of what evidence will be provided"
+                    },
+                    "evidence_type": {
+                        "type": "string",
+                        "enum": [
+                            "policy_document",
+                            "procedure", 
+                            "audit_report",
+                            "configuration_screenshot",
+                            "log_file",
+                            "certificate",
+                            "test_result",
+                            "document",
+                            "screenshot",
+                            "configuration",
+                            "log",
+                            "report",
+                            "other"
+                        ],
+                        "description": "Type of evidence - choose most specific type that matches",
+                        "default": "document"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "analyze_evidence",
-                    "description": "Analyze uploaded evidence against control requirements using RAG. Validates if evidence satisfies control acceptance criteria and suggests improvements. ONLY use when you have a valid numeric evidence_id from a previous upload or query.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "evidence_id": {
-                                "type": "integer",
-                                "description": "Evidence ID to analyze - must be a valid numeric ID from uploaded evidence"
-                            },
-                            "control_id": {
-                                "type": "integer",
-                                "description": "Control ID the evidence relates to (optional, can be inferred from evidence)"
-                            }
-                        },
-                        "required": ["evidence_id"]
+                },
+                "required": ["control_id", "title"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "analyze_evidence",
+            "description": "Analyze uploaded evidence against control requirements using RAG. Validates if evidence satisfies control acceptance criteria and suggests improvements. ONLY use when you have a valid numeric evidence_id from a previous upload or query.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "evidence_id": {
+                        "type": "integer",
+                        "description": "Evidence ID to analyze - must be a valid numeric ID from uploaded evidence"
+                    },
+                    "control_id": {
+                        "type": "integer",
+                        "description": "Control ID the evidence relates to (optional, can be inferred from evidence)"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "suggest_related_controls",
-                    "description": "ONLY use AFTER evidence has been uploaded. Suggest other controls that the uploaded evidence might also satisfy. This is for evidence reuse workflow, NOT for general questions about controls. If user asks about control requirements or policies without uploading evidence first, use search_documents instead. Requires valid evidence_id from a recent upload.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "evidence_id": {
-                                "type": "integer",
-                                "description": "Evidence ID to analyze (required) - must be from a recent upload"
-                            },
-                            "control_id": {
-                                "type": "integer",
-                                "description": "Primary control ID (required) - the control this evidence was uploaded for"
-                            },
-                            "max_suggestions": {
-                                "type": "integer",
-                                "description": "Maximum number of suggestions to return",
-                                "default": 5
-                            }
-                        },
-                        "required": ["evidence_id", "control_id"]
+                },
+                "required": ["evidence_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "suggest_related_controls",
+            "description": "ONLY use AFTER evidence has been uploaded. Suggest other controls that the uploaded evidence might also satisfy. This is for evidence reuse workflow, NOT for general questions about controls. If user asks about control requirements or policies without uploading evidence first, use search_documents instead. Requires valid evidence_id from a recent upload.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "evidence_id": {
+                        "type": "integer",
+                        "description": "Evidence ID to analyze (required) - must be from a recent upload"
+                    },
+                    "control_id": {
+                        "type": "integer",
+                        "description": "Primary control ID (required) - the control this evidence was uploaded for"
+                    },
+                    "max_suggestions": {
+                        "type": "integer",
+                        "description": "Maximum number of suggestions to return",
+                        "default": 5
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "submit_evidence_for_review",
-                    "description": "Submit evidence for auditor review and approval. Updates evidence status from 'pending' to 'under_review'. Use when analyst confirms they want to submit evidence after reviewing AI analysis.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "evidence_id": {
-                                "type": "integer",
-                                "description": "Evidence ID to submit (required)"
-                            },
-                            "comments": {
-                                "type": "string",
-                                "description": "Optional comments for the auditor"
-                            }
-                        },
-                        "required": ["evidence_id"]
+                },
+                "required": ["evidence_id", "control_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "submit_evidence_for_review",
+            "description": "Submit evidence for auditor review and approval. Updates evidence status from 'pending' to 'under_review'. Use when analyst confirms they want to submit evidence after reviewing AI analysis.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "evidence_id": {
+                        "type": "integer",
+                        "description": "Evidence ID to submit (required)"
+                    },
+                    "comments": {
+                        "type": "string",
+                        "description": "Optional comments for the auditor"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "analyze_evidence_for_control",
-                    "description": "AI-powered analysis of evidence quality and coverage for a control. Provides insights on: evidence completeness, quality scoring, gaps identified, recommendations for improvement. Use when user asks: 'analyze evidence for control X', 'how good is our evidence for control Y', 'what's missing for control Z', 'assess evidence quality for control'. DO NOT use for simple listing - use get_evidence_by_control instead.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "control_id": {
-                                "type": "integer",
-                                "description": "The control ID to analyze evidence for"
-                            }
-                        },
-                        "required": ["control_id"]
+                },
+                "required": ["evidence_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "analyze_evidence_for_control",
+            "description": "AI-powered analysis of evidence quality and coverage for a control. Provides insights on: evidence completeness, quality scoring, gaps identified, recommendations for improvement. Use when user asks: 'analyze evidence for control X', 'how good is our evidence for control Y', 'what's missing for control Z', 'assess evidence quality for control'. DO NOT use for simple listing - use get_evidence_by_control instead.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "control_id": {
+                        "type": "integer",
+                        "description": "The control ID to analyze evidence for"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_evidence_by_control",
-                    "description": "Retrieve all evidence documents for a specific control. Returns evidence ID, title, file name, type, upload date, status, and download link. Use when user asks: 'show evidence for control X', 'what evidence do we have for control Y', 'list all evidence for control Z'. This is for LISTING only - for AI analysis use analyze_evidence_for_control instead.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "control_id": {
-                                "type": "integer",
-                                "description": "The control ID to retrieve evidence for"
-                            }
-                        },
-                        "required": ["control_id"]
+                },
+                "required": ["control_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_evidence_by_control",
+            "description": "Retrieve all evidence documents for a specific control. Returns evidence ID, title, file name, type, upload date, status, and download link. Use when user asks: 'show evidence for control X', 'what evidence do we have for control Y', 'list all evidence for control Z'. This is for LISTING only - for AI analysis use analyze_evidence_for_control instead.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "control_id": {
+                        "type": "integer",
+                        "description": "The control ID to retrieve evidence for"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_recent_evidence",
-                    "description": "Retrieve recently uploaded evidence documents. Returns evidence ID, title, control ID, file name, upload date, and download link. Use when user asks: 'show my recent uploads', 'what did I just upload', 'list recent evidence'.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "limit": {
-                                "type": "integer",
-                                "description": "Number of recent evidence items to return (default: 10)",
-                                "default": 10
-                            },
-                            "user_id": {
-                                "type": "integer",
-                                "description": "Filter by user ID (optional - defaults to current user)"
-                            }
-                        },
-                        "required": []
+                },
+                "required": ["control_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_recent_evidence",
+            "description": "Retrieve recently uploaded evidence documents. Returns evidence ID, title, control ID, file name, upload date, and download link. Use when user asks: 'show my recent uploads', 'what did I just upload', 'list recent evidence'.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "limit": {
+                        "type": "integer",
+                        "description": "Number of recent evidence items to return (default: 10)",
+                        "default": 10
+                    },
+                    "user_id": {
+                        "type": "integer",
+                        "description": "Filter by user ID (optional - defaults to current user)"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_project",
-                    "description": "Create a new compliance or security project. Use when auditor wants to set up a new project for IM8 controls, security audit, risk assessment, etc. IMPORTANT: After successful creation, you MUST explicitly tell the user the project_id in your response (e.g., 'Project created successfully with ID: 11').",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "name": {
-                                "type": "string",
-                                "description": "Project name (required). Example: 'Health Sciences IM8 Compliance 2025'"
-                            },
-                            "description": {
-                                "type": "string",
-                                "description": "Project description. Example: 'Annual IM8 compliance assessment for Health Sciences division'"
-                            },
-                            "project_type": {
-                                "type": "string",
-                                "enum": ["compliance_assessment", "security_audit", "risk_management", "penetration_test"],
-                                "description": "Type of project (default: compliance_assessment)"
-                            },
-                            "start_date": {
-                                "type": "string",
-                                "description": "Project start date in YYYY-MM-DD format. Example: '2025-01-15'"
-                            }
-                        },
-                        "required": ["name"]
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_project",
+            "description": "Create a new compliance or security project. Use when auditor wants to set up a new project for IM8 controls, security audit, risk assessment, etc. IMPORTANT: After successful creation, you MUST explicitly tell the user the project_id in your response (e.g., 'Project created successfully with ID: 11').",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "Project name (required). Example: 'Health Sciences IM8 Compliance 2025'"
+                    },
+                    "description": {
+                        "type": "string",
+                        "description": "Project description. Example: 'Annual IM8 compliance assessment for Health Sciences division'"
+                    },
+                    "project_type": {
+                        "type": "string",
+                        "enum": ["compliance_assessment", "security_audit", "risk_management", "penetration_test"],
+                        "description": "Type of project (default: compliance_assessment)"
+                    },
+                    "start_date": {
+                        "type": "string",
+                        "description": "Project start date in YYYY-MM-DD format. Example: '2025-01-15'"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "list_projects",
-                    "description": "List all projects for the user's agency. Shows project ID, name, type, status, and control count. Use when user asks to see projects, recent projects, available projects, or 'show me projects'.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "limit": {
-                                "type": "integer",
-                                "description": "Number of recent projects to return (default: 10)",
-                                "default": 10
-                            },
-                            "status": {
-                                "type": "string",
-                                "enum": ["active", "completed", "archived", "all"],
-                                "description": "Filter by project status (default: all)",
-                                "default": "all"
-                            }
-                        },
-                        "required": []
+                },
+                "required": ["name"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_projects",
+            "description": "List all projects for the user's agency. Shows project ID, name, type, status, and control count. Use when user asks to see projects, recent projects, available projects, or 'show me projects'.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "limit": {
+                        "type": "integer",
+                        "description": "Number of recent projects to return (default: 10)",
+                        "default": 10
+                    },
+                    "status": {
+                        "type": "string",
+                        "enum": ["active", "completed", "archived", "all"],
+                        "description": "Filter by project status (default: all)",
+                        "default": "all"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_controls",
-                    "description": "Create IM8 compliance controls for a project. IMPORTANT: Before calling this tool, you MUST ask the user which project_id to use. Never assume or guess the project_id. Use when auditor wants to set up IM8 controls by selecting domains (1-10). Creates multiple controls based on selected domains.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "project_id": {
-                                "type": "integer",
-                                "description": "Project ID to add controls to (REQUIRED - must ask user if not provided)"
-                            },
-                            "domains": {
-                                "type": "array",
-                                "items": {
-                                    "type": "integer",
-                                    "minimum": 1,
-                                    "maximum": 10
-                                },
-                                "description": "IM8 domain numbers to include. Domains: 1=Identity/Access, 2=Awareness/Training, 3=Data Protection, 4=Incident Response, 5=IT Security Operations, 6=Network Security, 7=System Security, 8=Application Security, 9=Mobile Device, 10=Cloud Security"
-                            },
-                            "framework": {
-                                "type": "string",
-                                "enum": ["IM8", "NIST", "ISO27001"],
-                                "description": "Compliance framework (default: IM8)"
-                            }
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_controls",
+            "description": "Create IM8 compliance controls for a project. IMPORTANT: Before calling this tool, you MUST ask the user which project_id to use. Never assume or guess the project_id. Use when auditor wants to set up IM8 controls by selecting domains (1-10). Creates multiple controls based on selected domains.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "project_id": {
+                        "type": "integer",
+                        "description": "Project ID to add controls to (REQUIRED - must ask user if not provided)"
+                    },
+                    "domains": {
+                        "type": "array",
+                        "items": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 10
                         },
-                        "required": ["project_id", "domains"]
+                        "description": "IM8 domain numbers to include. Domains: 1=Identity/Access, 2=Awareness/Training, 3=Data Protection, 4=Incident Response, 5=IT Security Operations, 6=Network Security, 7=System Security, 8=Application Security, 9=Mobile Device, 10=Cloud Security"
+                    },
+                    "framework": {
+                        "type": "string",
+                        "enum": ["IM8", "NIST", "ISO27001"],
+                        "description": "Compliance framework (default: IM8)"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "mcp_fetch_evidence",
-                    "description": "Fetch evidence from URLs or local filesystem using MCP server. Automatically downloads files, calculates SHA256 checksums, and stores in database with maker-checker workflow. Use when user provides URLs to download compliance evidence.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "sources": {
-                                "type": "array",
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "type": {
-                                            "type": "string",
-                                            "enum": ["url", "file"],
-                                            "description": "Source type"
-                                        },
-                                        "location": {
-                                            "type": "string",
-                                            "description": "URL or file path"
-                                        },
-                                        "description": {
-                                            "type": "string",
-                                            "description": "Description of evidence"
-                                        },
-                                        "control_id": {
-                                            "type": "integer",
-                                            "description": "Control ID this evidence relates to"
-                                        }
-                                    },
-                                    "required": ["type", "location", "control_id"]
+                },
+                "required": ["project_id", "domains"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "mcp_fetch_evidence",
+            "description": "Fetch evidence from URLs or local filesystem using MCP server. Automatically downloads files, calculates SHA256 checksums, and stores in database with maker-checker workflow. Use when user provides URLs to download compliance evidence.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "sources": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "type": {
+                                    "type": "string",
+                                    "enum": ["url", "file"],
+                                    "description": "Source type"
                                 },
-                                "description": "List of evidence sources to fetch"
-                            },
-                            "project_id": {
-                                "type": "integer",
-                                "description": "Project ID for evidence storage"
+                                "location": {
+                                    "type": "string",
+                                    "description": "URL or file path"
+                                },
+                                "description": {
+                                    "type": "string",
+                                    "description": "Description of evidence"
+                                },
+                                "control_id": {
+                                    "type": "integer",
+                                    "description": "Control ID this evidence relates to"
+                                }
                             },
-                            "created_by": {
-                                "type": "integer",
-                                "description": "User ID who initiated the fetch"
-                            }
+                            "required": ["type", "location", "control_id"]
                         },
-                        "required": ["sources", "project_id", "created_by"]
+                        "description": "List of evidence sources to fetch"
+                    },
+                    "project_id": {
+                        "type": "integer",
+                        "description": "Project ID for evidence storage"
+                    },
+                    "created_by": {
+                        "type": "integer",
+                        "description": "User ID who initiated the fetch"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "mcp_analyze_compliance",
-                    "description": "Comprehensive compliance analysis using MCP server. Calculates overall compliance score (0-100), identifies gaps, assesses each control's implementation status, counts evidence, and generates AI-powered recommendations. Use when user requests full compliance analysis or assessment report.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "project_id": {
-                                "type": "integer",
-                                "description": "Project ID to analyze"
-                            },
-                            "framework": {
-                                "type": "string",
-                                "enum": ["IM8", "ISO27001", "NIST"],
-                                "description": "Compliance framework",
-                                "default": "IM8"
-                            },
-                            "include_evidence": {
-                                "type": "boolean",
-                                "description": "Include evidence analysis in assessment",
-                                "default": True
-                            },
-                            "generate_recommendations": {
-                                "type": "boolean",
-                                "description": "Generate AI recommendations for gaps",
-                                "default": True
-                            }
-                        },
-                        "required": ["project_id"]
+                },
+                "required": ["sources", "project_id", "created_by"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "mcp_analyze_compliance",
+            "description": "Comprehensive compliance analysis using MCP server. Calculates overall compliance score (0-100), identifies gaps, assesses each control's implementation status, counts evidence, and generates AI-powered recommendations. Use when user requests full compliance analysis or assessment report.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "project_id": {
+                        "type": "integer",
+                        "description": "Project ID to analyze"
+                    },
+                    "framework": {
+                        "type": "string",
+                        "enum": ["IM8", "ISO27001", "NIST"],
+                        "description": "Compliance framework",
+                        "default": "IM8"
+                    },
+                    "include_evidence": {
+                        "type": "boolean",
+                        "description": "Include evidence analysis in assessment",
+                        "default": True
+                    },
+                    "generate_recommendations": {
+                        "type": "boolean",
+                        "description": "Generate AI recommendations for gaps",
+                        "default": True
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_assessment",
-                    "description": "Create a comprehensive security or compliance assessment. Use when user wants to initiate a formal assessment (e.g., 'Create an IM8 assessment for HSA', 'Start a penetration test assessment'). Captures full assessment scope, schedule, team, and deliverables.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "project_id": {
-                                "type": "integer",
-                                "description": "Project ID this assessment belongs to"
-                            },
-                            "name": {
-                                "type": "string",
-                                "description": "Assessment name (e.g., 'Q4 2025 IM8 Compliance Assessment')"
-                            },
-                            "assessment_type": {
-                                "type": "string",
-                                "enum": ["compliance", "risk", "security_audit", "penetration_test", "gap_analysis"],
-                                "description": "Type of assessment"
-                            },
-                            "framework": {
-                                "type": "string",
-                                "enum": ["IM8", "ISO27001", "NIST", "SOC2", "FISMA"],
-                                "description": "Compliance framework"
-                            },
-                            "scope_description": {
-                                "type": "string",
-                                "description": "Detailed scope and boundaries of assessment"
-                            },
-                            "lead_assessor_user_id": {
-                                "type": "integer",
-                                "description": "User ID of the lead assessor"
-                            },
-                            "team_members": {
-                                "type": "array",
-                                "items": {"type": "integer"},
-                                "description": "Array of team member user IDs"
-                            },
-                            "planned_start_date": {
-                                "type": "string",
-                                "format": "date",
-                                "description": "Planned start date (YYYY-MM-DD)"
-                            },
-                            "planned_end_date": {
-                                "type": "string",
-                                "format": "date",
-                                "description": "Planned end date (YYYY-MM-DD)"
-                            }
-                        },
-                        "required": ["project_id", "name", "assessment_type", "framework", "lead_assessor_user_id"]
+                },
+                "required": ["project_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_assessment",
+            "description": "Create a comprehensive security or compliance assessment. Use when user wants to initiate a formal assessment (e.g., 'Create an IM8 assessment for HSA', 'Start a penetration test assessment'). Captures full assessment scope, schedule, team, and deliverables.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "project_id": {
+                        "type": "integer",
+                        "description": "Project ID this assessment belongs to"
+                    },
+                    "name": {
+                        "type": "string",
+                        "description": "Assessment name (e.g., 'Q4 2025 IM8 Compliance Assessment')"
+                    },
+                    "assessment_type": {
+                        "type": "string",
+                        "enum": ["compliance", "risk", "security_audit", "penetration_test", "gap_analysis"],
+                        "description": "Type of assessment"
+                    },
+                    "framework": {
+                        "type": "string",
+                        "enum": ["IM8", "ISO27001", "NIST", "SOC2", "FISMA"],
+                        "description": "Compliance framework"
+                    },
+                    "scope_description": {
+                        "type": "string",
+                        "description": "Detailed scope and boundaries of assessment"
+                    },
+                    "lead_assessor_user_id": {
+                        "type": "integer",
+                        "description": "User ID of the lead assessor"
+                    },
+                    "team_members": {
+                        "type": "array",
+                        "items": {"type": "integer"},
+                        "description": "Array of team member user IDs"
+                    },
+                    "planned_start_date": {
+                        "type": "string",
+                        "format": "date",
+                        "description": "Planned start date (YYYY-MM-DD)"
+                    },
+                    "planned_end_date": {
+                        "type": "string",
+                        "format": "date",
+                        "description": "Planned end date (YYYY-MM-DD)"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_finding",
-                    "description": "Create a comprehensive security finding or compliance gap. Use when user reports vulnerabilities, non-compliance issues, or security concerns (e.g., 'Create a finding for weak password policy', 'Log this SQL injection vulnerability'). Captures technical details, impact, and remediation guidance.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "assessment_id": {
-                                "type": "integer",
-                                "description": "Assessment ID this finding belongs to"
-                            },
-                            "project_id": {
-                                "type": "integer",
-                                "description": "Project ID this finding belongs to"
-                            },
-                            "title": {
-                                "type": "string",
-                                "description": "Clear, concise finding title (e.g., 'Weak Password Policy - No Complexity Requirements')"
-                            },
-                            "description": {
-                                "type": "string",
-                                "description": "Detailed description of the finding, including what was observed"
-                            },
-                            "severity": {
-                                "type": "string",
-                                "enum": ["critical", "high", "medium", "low", "info"],
-                                "description": "Severity level"
-                            },
-                            "cvss_score": {
-                                "type": "number",
-                                "minimum": 0.0,
-                                "maximum": 10.0,
-                                "description": "CVSS score (0.0-10.0)"
-                            },
-                            "category": {
-                                "type": "string",
-                                "enum": ["injection", "broken_auth", "sensitive_data", "xxe", "access_control", "security_misconfiguration", "xss", "insecure_deserialization", "logging", "ssrf"],
-                                "description": "OWASP category"
-                            },
-                            "affected_asset": {
-                                "type": "string",
-                                "description": "Affected system/asset name"
-                            },
-                            "reproduction_steps": {
-                                "type": "string",
-                                "description": "Step-by-step reproduction instructions"
-                            },
-                            "remediation_recommendation": {
-                                "type": "string",
-                                "description": "Recommended remediation actions"
-                            },
-                            "business_impact": {
-                                "type": "string",
-                                "description": "Business impact analysis"
-                            },
-                            "control_id": {
-                                "type": "integer",
-                                "description": "Related control ID (optional)"
-                            }
-                        },
-                        "required": ["assessment_id", "project_id", "title", "description", "severity"]
+                },
+                "required": ["project_id", "name", "assessment_type", "framework", "lead_assessor_user_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_finding",
+            "description": "Create a comprehensive security finding or compliance gap. Use when user reports vulnerabilities, non-compliance issues, or security concerns (e.g., 'Create a finding for weak password policy', 'Log this SQL injection vulnerability'). Captures technical details, impact, and remediation guidance.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "assessment_id": {
+                        "type": "integer",
+                        "description": "Assessment ID this finding belongs to"
+                    },
+                    "project_id": {
+                        "type": "integer",
+                        "description": "Project ID this finding belongs to"
+                    },
+                    "title": {
+                        "type": "string",
+                        "description": "Clear, concise finding title (e.g., 'Weak Password Policy - No Complexity Requirements')"
+                    },
+                    "description": {
+                        "type": "string",
+                        "description": "Detailed description of the finding, including what was observed"
+                    },
+                    "severity": {
+                        "type": "string",
+                        "enum": ["critical", "high", "medium", "low", "info"],
+                        "description": "Severity level"
+                    },
+                    "cvss_score": {
+                        "type": "number",
+                        "minimum": 0.0,
+                        "maximum": 10.0,
+                        "description": "CVSS score (0.0-10.0)"
+                    },
+                    "category": {
+                        "type": "string",
+                        "enum": ["injection", "broken_auth", "sensitive_data", "xxe", "access_control", "security_misconfiguration", "xss", "insecure_deserialization", "logging", "ssrf"],
+                        "description": "OWASP category"
+                    },
+                    "affected_asset": {
+                        "type": "string",
+                        "description": "Affected system/asset name"
+                    },
+                    "reproduction_steps": {
+                        "type": "string",
+                        "description": "Step-by-step reproduction instructions"
+                    },
+                    "remediation_recommendation": {
+                        "type": "string",
+                        "description": "Recommended remediation actions"
+                    },
+                    "business_impact": {
+                        "type": "string",
+                        "description": "Business impact analysis"
+                    },
+                    "control_id": {
+                        "type": "integer",
+                        "description": "Related control ID (optional)"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "resolve_control_to_evidence",
-                    "description": "Resolve Control ID to available evidence that can be submitted. Use when user mentions 'submit Control [X]' or 'Control [X] for review' to find which evidence records are available. Returns list of pending/rejected evidence for that control. ALWAYS call this tool first before responding to 'submit Control X' requests.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "control_id": {
-                                "type": "integer",
-                                "description": "Control ID to find evidence for"
-                            }
-                        },
-                        "required": ["control_id"]
+                },
+                "required": ["assessment_id", "project_id", "title", "description", "severity"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "resolve_control_to_evidence",
+            "description": "Resolve Control ID to available evidence that can be submitted. Use when user mentions 'submit Control [X]' or 'Control [X] for review' to find which evidence records are available. Returns list of pending/rejected evidence for that control. ALWAYS call this tool first before responding to 'submit Control X' requests.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "control_id": {
+                        "type": "integer",
+                        "description": "Control ID to find evidence for"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "search_documents",
-                    "description": "Search compliance knowledge base for control requirements, policies, best practices, and standards. Use this tool when user asks: 'What are the requirements for Control X?', 'Tell me about password policies', 'What does Control Y require?', 'Show me MFA requirements', etc. This searches the compliance document library, NOT uploaded evidence. Returns relevant excerpts with source citations.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "query": {
-                                "type": "string",
-                                "description": "Natural language search query about control requirements or policies"
-                            },
-                            "control_id": {
-                                "type": "integer",
-                                "description": "Filter by specific control ID (optional)"
-                            },
-                            "top_k": {
-                                "type": "integer",
-                                "description": "Number of results to return",
-                                "default": 5
-                            }
-                        },
-                        "required": ["query"]
+                },
+                "required": ["control_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_documents",
+            "description": "Search compliance knowledge base for control requirements, policies, best practices, and standards. Use this tool when user asks: 'What are the requirements for Control X?', 'Tell me about password policies', 'What does Control Y require?', 'Show me MFA requirements', etc. This searches the compliance document library, NOT uploaded evidence. Returns relevant excerpts with source citations.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Natural language search query about control requirements or policies"
+                    },
+                    "control_id": {
+                        "type": "integer",
+                        "description": "Filter by specific control ID (optional)"
+                    },
+                    "top_k": {
+                        "type": "integer",
+                        "description": "Number of results to return",
+                        "default": 5
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "search_evidence_content",
-                    "description": "Search INSIDE uploaded evidence documents (PDFs, Word docs, etc.) for specific content. Use this tool when user asks: 'Find evidence mentioning password policy', 'Which documents talk about MFA?', 'Search uploaded files for audit logs', 'What evidence discusses encryption?'. This searches the CONTENT of uploaded files, not just metadata. Different from search_documents which searches the compliance knowledge base.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "query": {
-                                "type": "string",
-                                "description": "Natural language search query to find inside evidence documents"
-                            },
-                            "control_id": {
-                                "type": "integer",
-                                "description": "Filter by specific control ID (optional)"
-                            },
-                            "project_id": {
-                                "type": "integer",
-                                "description": "Filter by specific project ID (optional)"
-                            },
-                            "top_k": {
-                                "type": "integer",
-                                "description": "Number of results to return",
-                                "default": 5
-                            }
-                        },
-                        "required": ["query"]
+                },
+                "required": ["query"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_evidence_content",
+            "description": "Search INSIDE uploaded evidence documents (PDFs, Word docs, etc.) for specific content. Use this tool when user asks: 'Find evidence mentioning password policy', 'Which documents talk about MFA?', 'Search uploaded files for audit logs', 'What evidence discusses encryption?'. This searches the CONTENT of uploaded files, not just metadata. Different from search_documents which searches the compliance knowledge base.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Natural language search query to find inside evidence documents"
+                    },
+                    "control_id": {
+                        "type": "integer",
+                        "description": "Filter by specific control ID (optional)"
+                    },
+                    "project_id": {
+                        "type": "integer",
+                        "description": "Filter by specific project ID (optional)"
+                    },
+                    "top_k": {
+                        "type": "integer",
+                        "description": "Number of results to return",
+                        "default": 5
                     }
-                }
+                },
+                "required": ["query"]
             }
-        ]
-        
-        # Streamlined base system prompt
-        self.base_system_prompt = """You are an AI compliance assistant for Singapore IM8 compliance tasks.
-
-Available Controls: 1 (Test), 3 (Network segmentation), 4 (Data encryption), 5 (MFA for privileged accounts)
-
-ROLE CAPABILITIES:
-- ANALYST: Upload evidence, analyze compliance, submit for review
-- AUDITOR: Create controls/projects, review evidence, generate reports  
-- VIEWER: Read-only access
-
-EVIDENCE BUSINESS RULES:
-- Evidence is PERMANENTLY BOUND to one Control (immutable binding)
-- Evidence CANNOT be reassigned to a different Control or Project
-- Analyst can submit MULTIPLE evidences per Control until audit closes
-- If user asks to "move" or "reassign" evidence: Explain it's not allowed, guide them to upload NEW evidence for the target Control instead
-
-EVIDENCE PRESENTATION RULES:
-- When showing evidence details, ALWAYS include the download link if available
-- Format download links as: "You can download this file: [download_url]"
-- If download_url field is provided in tool results, present it to the user
-- Example: "Evidence 24: New Evidence for Control 3 (access_control_policy.txt, Procedure, Pending). You can download this file: /api/v1/evidence/24/download"
+        }
+    }
+]
 
-TOOL SELECTION RULES:
-- When user asks "What are the requirements for Control X?" or "Tell me about Control X" → USE search_documents tool
-- When user asks about policies, standards, best practices → USE search_documents tool
-- NEVER use suggest_related_controls unless you have a valid evidence_id from a recent evidence upload
-- suggest_related_controls is ONLY for evidence reuse workflow after evidence upload
 
-CORE RULES:
-1. Ask ONE question at a time
-2. Only ask if information is missing AND cannot be obtained from context or tools
-3. Stay focused on user's current request
-4. Be concise - use minimum words needed
-5. Execute tools immediately when all required fields are collected"""
+class AgenticAssistant:
+    """Agentic conversational agent with tool calling (supports multiple providers)"""
     
-    def _get_tools_for_role(self, user_role: str) -> list:
-        """
-        Filter tools based on user role to enforce RBAC
-        
-        Role Permissions:
-        - auditor: Can create projects, create controls, generate reports (NO evidence upload)
-        - analyst: Can upload evidence, submit for review (NO project/control creation)
-        - viewer: Can only view (NO tool access)
-        - super_admin: Full access to all tools
-        """
-        # Define role-specific tool permissions
-        AUDITOR_ONLY_TOOLS = ['create_project', 'create_controls']
-        ANALYST_ONLY_TOOLS = [
-            'upload_evidence', 
-            'submit_for_review', 
-            'request_evidence_upload', 
-            'submit_evidence_for_review'
-        ]
-        EVIDENCE_QUERY_TOOLS = [
-            'analyze_evidence',  # Auditors can query evidence analysis
-            'analyze_evidence_for_control',  # AI-powered evidence quality analysis
-            'suggest_related_controls',  # Auditors can use Graph RAG for relationships
-            'get_evidence_by_control',  # Query evidence for specific control
-            'get_recent_evidence',  # View recently uploaded evidence
-            'resolve_control_to_evidence'  # Resolve control ID to available evidence
-        ]
-        ASSESSMENT_FINDING_TOOLS = [
-            'create_assessment',  # Create comprehensive security/compliance assessments
-            'create_finding'  # Create security findings and compliance gaps
-        ]
-        COMMON_TOOLS = ['mcp_fetch_evidence', 'mcp_analyze_compliance', 'generate_report', 'search_documents', 'search_evidence_content', 'list_projects']
-        
-        user_role_lower = user_role.lower()
-        
-        if user_role_lower == 'super_admin':
-            # Super admin has access to all tools
-            logger.info(f"Role '{user_role}': Granting access to ALL tools")
-            return self.all_tools
-        
-        elif user_role_lower == 'auditor':
-            # Auditor: project/control creation + assessment/finding creation + evidence queries + common tools (NO evidence upload)
-            allowed_tools = AUDITOR_ONLY_TOOLS + ASSESSMENT_FINDING_TOOLS + EVIDENCE_QUERY_TOOLS + COMMON_TOOLS
-            filtered_tools = [t for t in self.all_tools if t['function']['name'] in allowed_tools]
-            logger.info(f"Role '{user_role}': Granting access to {len(filtered_tools)} tools: {allowed_tools}")
-            return filtered_tools
-        
-        elif user_role_lower == 'analyst':
-            # Analyst: evidence upload/submit + assessment/finding creation + evidence queries + common tools (NO project/control creation)
-            allowed_tools = ANALYST_ONLY_TOOLS + ASSESSMENT_FINDING_TOOLS + EVIDENCE_QUERY_TOOLS + COMMON_TOOLS
-            filtered_tools = [t for t in self.all_tools if t['function']['name'] in allowed_tools]
-            logger.info(f"Role '{user_role}': Granting access to {len(filtered_tools)} tools: {allowed_tools}")
-            return filtered_tools
-        
-        else:
-            # Viewer or unknown: No tool access
-            logger.info(f"Role '{user_role}': NO tool access granted (read-only)")
-            return []
+    # Tool complexity configuration for dynamic LLM parameters
+    TOOL_COMPLEXITY = {
+        "upload_evidence": {"temperature": 0.2, "max_tokens": 400},
+        "search_documents": {"temperature": 0.3, "max_tokens": 800},  # RAG needs more space
+        "search_evidence_content": {"temperature": 0.3, "max_tokens": 800},  # Evidence content search
+        "analyze_evidence": {"temperature": 0.2, "max_tokens": 600},
+        "analyze_evidence_rag": {"temperature": 0.2, "max_tokens": 600},
+        "analyze_evidence_for_control": {"temperature": 0.3, "max_tokens": 1000},  # AI insights need more space
+        "submit_for_review": {"temperature": 0.1, "max_tokens": 300},
+        "submit_evidence_for_review": {"temperature": 0.1, "max_tokens": 300},
+        "request_evidence_upload": {"temperature": 0.2, "max_tokens": 400},
+        "suggest_related_controls": {"temperature": 0.3, "max_tokens": 700},
+        "fetch_evidence": {"temperature": 0.2, "max_tokens": 500},
+        "mcp_fetch_evidence": {"temperature": 0.2, "max_tokens": 500},
+        "mcp_analyze_compliance": {"temperature": 0.3, "max_tokens": 700},
+        "list_projects": {"temperature": 0.2, "max_tokens": 500},
+        # Default for unknown tools
+        "default": {"temperature": 0.2, "max_tokens": 500}
+    }
     
-    def _build_role_specific_prompt(self, user_role: str) -> str:
-        """Build concise role-specific system prompt"""
-        role_prompts = {
-            "auditor": """
+    # Integer-typed tool arguments the LLM sometimes sends as strings
+    INTEGER_FIELDS = {
+        name: frozenset(fields) for name, fields in {
+            "upload_evidence": ["control_id", "project_id"],
+            "fetch_evidence": ["control_id", "project_id"],
+            "analyze_compliance": ["control_id", "project_id"],
+            "generate_report": ["project_id"],
+            "submit_for_review": ["evidence_id"],
+            "submit_evidence_for_review": ["evidence_id"],
+            "request_evidence_upload": ["control_id"],
+            "create_project": ["agency_id"],
+            "create_controls": ["project_id"],
+            "analyze_evidence": ["evidence_id", "control_id"],
+            "analyze_evidence_for_control": ["control_id"],
+            "suggest_related_controls": ["evidence_id", "control_id"],
+            "get_evidence_by_control": ["control_id"],
+            "get_recent_evidence": ["limit", "user_id"]
+        }.items()
+    }
+    
+    # Role-specific additions appended to the base system prompt
+    ROLE_PROMPTS = {
+        "auditor": """
 
 AUDITOR ACTIONS:
 - View available projects (list_projects tool)
@@ -850,8 +929,8 @@ EXAMPLES:
 ❌ WRONG: User: "Set up controls for Government Portal" → AI: "What's the project name?"
 ✅ RIGHT: User: "Set up controls for Government Portal" → AI: [Calls create_controls with project_name="Government Portal"]
 """,
-            
-            "analyst": """
+        
+        "analyst": """
 
 ANALYST ACTIONS:
 - View available projects (list_projects tool)
@@ -1028,19 +1107,361 @@ EXAMPLES:
 ❌ User: "Upload evidence"
    AI: "Let me explain the IM8 workflow..." [NO - just ask for control]
 """,
-            
-            "viewer": """
+        
+        "viewer": """
 
 VIEWER ACTIONS:
 - View compliance status
 - View reports
 - No tool access (read-only)
 
-Answer questions about current compliance state using available data.
+Answer questions about current compliance state using available data.
+"""
+    }
+    
+    def __init__(self):
+        # Detect which provider to use (default to github for reliable tool calling)
+        self.provider = _LLM_PROVIDER
+        
+        if self.provider == "github":
+            # GitHub Models (free tier)
+            if not _GITHUB_TOKEN:
+                raise ValueError("GITHUB_TOKEN required for GitHub Models")
+            
+            self.client = _get_llm_client(self.provider)
+            # Available models: gpt-4o, gpt-4o-mini, Llama-3.1-70B-Instruct, Phi-3-medium-128k-instruct
+            self.model = _GITHUB_MODEL
+            logger.info("Using GitHub Models with %s", self.model)
+            
+        elif self.provider == "openai":
+            # OpenAI (paid)
+            self.client = _get_llm_client(self.provider)
+            self.model = _OPENAI_MODEL
+            logger.info("Using OpenAI with %s", self.model)
+            
+        else:  # groq
+            self.client = _get_llm_client(self.provider)
+            # Use llama-3.3-70b-versatile - Production model with tool use support
+            self.model = "llama-3.3-70b-versatile"
+            logger.info("Using Groq with %s", self.model)
+        
+        # ALL tools (filtered by role at runtime); shared module-level schema
+        self.all_tools = _TOOLS_SCHEMA
+        
+        # Streamlined base system prompt
+        self.base_system_prompt = """You are an AI compliance assistant for Singapore IM8 compliance tasks.
+
+Available Controls: 1 (Test), 3 (Network segmentation), 4 (Data encryption), 5 (MFA for privileged accounts)
+
+ROLE CAPABILITIES:
+- ANALYST: Upload evidence, analyze compliance, submit for review
+- AUDITOR: Create controls/projects, review evidence, generate reports  
+- VIEWER: Read-only access
+
+EVIDENCE BUSINESS RULES:
+- Evidence is PERMANENTLY BOUND to one Control (immutable binding)
+- Evidence CANNOT be reassigned to a different Control or Project
+- Analyst can submit MULTIPLE evidences per Control until audit closes
+- If user asks to "move" or "reassign" evidence: Explain it's not allowed, guide them to upload NEW evidence for the target Control instead
+
+EVIDENCE PRESENTATION RULES:
+- When showing evidence details, ALWAYS include the download link if available
+- Format download links as: "You can download this file: [download_url]"
+- If download_url field is provided in tool results, present it to the user
+- Example: "Evidence 24: New Evidence for Control 3 (access_control_policy.txt, Procedure, Pending). You can download this file: /api/v1/evidence/24/download"
+
+TOOL SELECTION RULES:
+- When user asks "What are the requirements for Control X?" or "Tell me about Control X" → USE search_documents tool
+- When user asks about policies, standards, best practices → USE search_documents tool
+- NEVER use suggest_related_controls unless you have a valid evidence_id from a recent evidence upload
+- suggest_related_controls is ONLY for evidence reuse workflow after evidence upload
+
+CORE RULES:
+1. Ask ONE question at a time
+2. Only ask if information is missing AND cannot be obtained from context or tools
+3. Stay focused on user's current request
+4. Be concise - use minimum words needed
+5. Execute tools immediately when all required fields are collected"""
+        
+        # Precompute full system prompt per role (base + role suffix) once
+        self._role_prompts = {
+            role: self.base_system_prompt + suffix
+            for role, suffix in self.ROLE_PROMPTS.items()
+        }
+    
+    def _get_tools_for_role(self, user_role: str) -> list:
+        """
+        Filter tools based on user role to enforce RBAC
+        
+        Role Permissions:
+        - auditor: Can create projects, create controls, generate reports (NO evidence upload)
+        - analyst: Can upload evidence, submit for review (NO project/control creation)
+        - viewer: Can only view (NO tool access)
+        - super_admin: Full access to all tools
+        """
+        # Define role-specific tool permissions
+        AUDITOR_ONLY_TOOLS = ['create_project', 'create_controls']
+        ANALYST_ONLY_TOOLS = [
+            'upload_evidence', 
+            'submit_for_review', 
+            'request_evidence_upload', 
+            'submit_evidence_for_review'
+        ]
+        EVIDENCE_QUERY_TOOLS = [
+            'analyze_evidence',  # Auditors can query evidence analysis
+            'analyze_evidence_for_control',  # AI-powered evidence quality analysis
+            'suggest_related_controls',  # Auditors can use Graph RAG for relationships
+            'get_evidence_by_control',  # Query evidence for specific control
+            'get_recent_evidence',  # View recently uploaded evidence
+            'resolve_control_to_evidence'  # Resolve control ID to available evidence
+        ]
+        ASSESSMENT_FINDING_TOOLS = [
+            'create_assessment',  # Create comprehensive security/compliance assessments
+            'create_finding'  # Create security findings and compliance gaps
+        ]
+        COMMON_TOOLS = ['mcp_fetch_evidence', 'mcp_analyze_compliance', 'generate_report', 'search_documents', 'search_evidence_content', 'list_projects']
+        
+        user_role_lower = user_role.lower()
+        
+        if user_role_lower == 'super_admin':
+            # Super admin has access to all tools
+            logger.info("Role '%s': Granting access to ALL tools", user_role)
+            return self.all_tools
+        
+        elif user_role_lower == 'auditor':
+            # Auditor: project/control creation + assessment/finding creation + evidence queries + common tools (NO evidence upload)
+            allowed_tools = AUDITOR_ONLY_TOOLS + ASSESSMENT_FINDING_TOOLS + EVIDENCE_QUERY_TOOLS + COMMON_TOOLS
+            filtered_tools = [t for t in self.all_tools if t['function']['name'] in allowed_tools]
+            logger.info("Role '%s': Granting access to %s tools: %s", user_role, len(filtered_tools), allowed_tools)
+            return filtered_tools
+        
+        elif user_role_lower == 'analyst':
+            # Analyst: evidence upload/submit + assessment/finding creation + evidence queries + common tools (NO project/control creation)
+            allowed_tools = ANALYST_ONLY_TOOLS + ASSESSMENT_FINDING_TOOLS + EVIDENCE_QUERY_TOOLS + COMMON_TOOLS
+            filtered_tools = [t for t in self.all_tools if t['function']['name'] in allowed_tools]
+            logger.info("Role '%s': Granting access to %s tools: %s", user_role, len(filtered_tools), allowed_tools)
+            return filtered_tools
+        
+        else:
+            # Viewer or unknown: No tool access
+            logger.info("Role '%s': NO tool access granted (read-only)", user_role)
+            return []
+    
+    def _build_role_specific_prompt(self, user_role: str) -> str:
+        """Return the concise role-specific system prompt (precomputed in __init__)"""
+        return self._role_prompts.get(user_role.lower(), self.base_system_prompt)
+    
+    async def _prepare_turn(
+        self,
+        message: str,
+        conversation_manager: ConversationManager,
+        session_id: str,
+        db: Session,
+        current_user: Dict[str, Any],
+        file_path: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the tool-deciding first pass and execute any requested tools.
+        
+        The first pass is never streamed: tool arguments must be complete
+        before they can be dispatched.
+        
+        Returns:
+            Dict with the LLM ``messages`` (including tool results), the first-pass
+            ``assistant_message``, its ``tool_calls`` and executed ``tool_results``
+        """
+        # Get conversation history
+        # Prior turns only: the current user message was just added by the caller
+        history = conversation_manager.get_conversation_history(
+            session_id, max_tokens=_HISTORY_TOKEN_BUDGET, exclude_last=True
+        )
+        
+        # Get user's agency name
+        from api.src.models import Agency
+        agency_name = "Unknown Agency"
+        if current_user.get("agency_id"):
+            agency = db.query(Agency).filter(Agency.id == current_user["agency_id"]).first()
+            if agency:
+                agency_name = agency.name
+        
+        # Role prompt is byte-identical for every user of a role, so it (with the
+        # tools) forms a prefix the provider's KV-cache can reuse across sessions
+        user_role = current_user.get("role", "viewer")
+        system_prompt = self._build_role_specific_prompt(user_role)
+        
+        # Per-user context goes in its own message after the shared prefix
+        user_context = f"""CURRENT USER CONTEXT:
+- Username: {current_user.get('username', 'Unknown')}
+- Role: {user_role.upper()}
+- Agency: {agency_name} (ID: {current_user.get('agency_id', 'N/A')})
+
+You are currently assisting {current_user.get('username', 'the user')} from {agency_name}.
 """
+        
+        # Get role-specific tools (RBAC enforcement)
+        filtered_tools = self._get_tools_for_role(user_role)
+        
+        # Add current user message
+        user_content = message
+        if file_path:
+            user_content += f"\n[File uploaded: {os.path.basename(file_path)}]"
+        
+        # Build messages for LLM. Keep this order stable (shared role prompt, user
+        # context, append-only history, new message) so cached prefixes stay valid
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": user_context},
+            *({"role": msg["role"], "content": msg["content"]} for msg in history),
+            {"role": "user", "content": user_content}
+        ]
+        
+        # Call Groq with tool calling (using filtered tools)
+        # Use tight constraints for initial tool decision
+        logger.info("Calling Groq LLM for session %s with %s role-filtered tools", session_id, len(filtered_tools))
+        decision_params = dict(
+            model=self.model,
+            messages=messages,
+            tools=filtered_tools if filtered_tools else None,  # Pass None if no tools
+            tool_choice="auto" if filtered_tools else "none",
+            temperature=0.2
+        )
+        response = await self.client.chat.completions.create(
+            max_tokens=_TOOL_DECISION_MAX_TOKENS,  # Tool-call JSON plus a short preamble
+            **decision_params
+        )
+        _log_prompt_cache_usage(response, "tool decision")
+        
+        if response.choices[0].finish_reason == "length":
+            # Model chose to answer in prose and ran out of room; retry once with full budget
+            logger.info("Tool decision truncated at %s tokens, retrying with %s", _TOOL_DECISION_MAX_TOKENS, _TOOL_DECISION_RETRY_MAX_TOKENS)
+            response = await self.client.chat.completions.create(
+                max_tokens=_TOOL_DECISION_RETRY_MAX_TOKENS,
+                **decision_params
+            )
+            _log_prompt_cache_usage(response, "tool decision retry")
+        
+        assistant_message = response.choices[0].message
+        tool_calls = assistant_message.tool_calls
+        
+        # Process tool calls if any
+        tool_results = []
+        if tool_calls:
+            logger.info("Agent wants to call %s tool(s)", len(tool_calls))
+            
+            parsed_calls = [
+                (tool_call.function.name, orjson.loads(tool_call.function.arguments))
+                for tool_call in tool_calls
+            ]
+            batched_results = await self._run_mcp_batches(parsed_calls)
+            
+            for index, (function_name, function_args) in enumerate(parsed_calls):
+                logger.info("Executing tool: %s with args: %s", function_name, function_args)
+                
+                if index in batched_results:
+                    tool_result = batched_results[index]
+                else:
+                    tool_result = await self._run_tool(
+                        function_name=function_name,
+                        function_args=function_args,
+                        db=db,
+                        current_user=current_user,
+                        session_id=session_id,
+                        file_path=file_path
+                    )
+                
+                tool_results.append({
+                    "tool": function_name,
+                    "arguments": function_args,
+                    "result": tool_result
+                })
+            
+            # Add tool results back to conversation for final response
+            messages.append({
+                "role": "assistant",
+                "content": assistant_message.content or "",
+                "tool_calls": [tc.model_dump(exclude_none=True) for tc in tool_calls]
+            })
+            
+            # Add tool results (tool_results is in tool_calls order)
+            messages.extend(
+                {
+                    "role": "tool",
+                    "tool_call_id": tc.id,
+                    "content": orjson.dumps(tr["result"], default=str).decode()
+                }
+                for tc, tr in zip(tool_calls, tool_results)
+            )
+        
+        return {
+            "messages": messages,
+            "assistant_message": assistant_message,
+            "tool_calls": tool_calls,
+            "tool_results": tool_results
+        }
+    
+    def _final_response_params(self, tool_calls) -> Dict[str, Any]:
+        """Pick temperature/max_tokens for the synthesis call based on the first tool called"""
+        tool_name = tool_calls[0].function.name
+        params = self.TOOL_COMPLEXITY.get(tool_name, self.TOOL_COMPLEXITY["default"])
+        logger.info("Using dynamic params for %s: temp=%s, max_tokens=%s", tool_name, params['temperature'], params['max_tokens'])
+        return params
+    
+    def _synthesis_shortcut(self, turn: Dict[str, Any]) -> Optional[str]:
+        """Return a templated answer when the synthesis call can be skipped, else None"""
+        # A failed tool ends the turn: report it directly instead of paying for
+        # an LLM call to narrate the error, along with what the tools that did
+        # succeed in the same turn returned
+        failed, succeeded = [], []
+        for tr in turn["tool_results"]:
+            (failed if (tr["result"] or {}).get("success") is False else succeeded).append(tr)
+        if failed:
+            logger.info("metric=agentic.tool_error_shortcircuit tools=%s", [tr['tool'] for tr in failed])
+            completed = [
+                _render_tool_results([tr]) or f"✅ Tool {tr['tool']} completed"
+                for tr in succeeded
+            ]
+            return "\n".join(completed + [_format_tool_errors(failed)])
+        
+        if not _SKIP_SYNTHESIS:
+            return None
+        preamble = turn["assistant_message"].content
+        if not preamble or not all(tr["tool"] in _DISPLAY_TOOLS for tr in turn["tool_results"]):
+            return None
+        logger.info("Skipping synthesis call for display-only tool results")
+        return preamble + "\n\n" + _render_tool_results(turn["tool_results"])
+    
+    def _finish_turn(
+        self,
+        final_answer: str,
+        tool_results: List[Dict[str, Any]],
+        conversation_manager: ConversationManager,
+        session_id: str
+    ) -> Dict[str, Any]:
+        """Persist the assistant reply and build the chat result payload"""
+        # Detect rich UI opportunities
+        conversation_history = conversation_manager.get_conversation_history(session_id)
+        rich_ui = self._detect_rich_ui_opportunity(final_answer, conversation_history)
+        
+        # Save assistant response to conversation
+        conversation_manager.add_message(
+            session_id,
+            role="assistant",
+            content=final_answer,
+            tool_calls=tool_results if tool_results else None
+        )
+        
+        result = {
+            "answer": final_answer,
+            "tool_calls": tool_results,
+            "session_id": session_id
         }
         
-        return self.base_system_prompt + role_prompts.get(user_role.lower(), "")
+        # Add rich UI component if detected
+        if rich_ui:
+            result["rich_ui"] = rich_ui
+            logger.info("Rich UI component detected: %s - %s", rich_ui['type'], rich_ui.get('form_type', 'unknown'))
+        
+        return result
     
     async def chat(
         self,
@@ -1066,209 +1487,197 @@ Answer questions about current compliance state using available data.
             Response dictionary with answer and tool execution results
         """
         try:
-            # Get conversation history
-            history = conversation_manager.get_conversation_history(session_id, limit=10)
-            
-            # Get user's agency name
-            from api.src.models import Agency
-            agency_name = "Unknown Agency"
-            if current_user.get("agency_id"):
-                agency = db.query(Agency).filter(Agency.id == current_user["agency_id"]).first()
-                if agency:
-                    agency_name = agency.name
-            
-            # Build role-specific system prompt with user context
-            user_role = current_user.get("role", "viewer")
-            system_prompt = self._build_role_specific_prompt(user_role)
-            
-            # Add user context to system prompt
-            user_context = f"""
-
-CURRENT USER CONTEXT:
-- Username: {current_user.get('username', 'Unknown')}
-- Role: {user_role.upper()}
-- Agency: {agency_name} (ID: {current_user.get('agency_id', 'N/A')})
-
-You are currently assisting {current_user.get('username', 'the user')} from {agency_name}.
-"""
-            system_prompt += user_context
-            
-            # Get role-specific tools (RBAC enforcement)
-            filtered_tools = self._get_tools_for_role(user_role)
-            
-            # Build messages for LLM
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Add conversation history
-            for msg in history[:-1]:  # Exclude the last message (just added user message)
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-            
-            # Add current user message
-            user_content = message
-            if file_path:
-                user_content += f"\n[File uploaded: {os.path.basename(file_path)}]"
-            
-            messages.append({
-                "role": "user",
-                "content": user_content
-            })
-            
-            # Call Groq with tool calling (using filtered tools)
-            # Use tight constraints for initial tool decision
-            logger.info(f"Calling Groq LLM for session {session_id} with {len(filtered_tools)} role-filtered tools")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                tools=filtered_tools if filtered_tools else None,  # Pass None if no tools
-                tool_choice="auto" if filtered_tools else "none",
-                max_tokens=150,  # Reduced: just enough to decide tool calls
-                temperature=0.2
+            turn = await self._prepare_turn(
+                message, conversation_manager, session_id, db, current_user, file_path
             )
+            tool_calls = turn["tool_calls"]
+            shortcut = self._synthesis_shortcut(turn) if tool_calls else None
             
-            assistant_message = response.choices[0].message
-            tool_calls = assistant_message.tool_calls
-            
-            # Process tool calls if any
-            tool_results = []
-            if tool_calls:
-                logger.info(f"Agent wants to call {len(tool_calls)} tool(s)")
-                
-                for tool_call in tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-                    
-                    logger.info(f"Executing tool: {function_name} with args: {function_args}")
-                    
-                    # Route to appropriate handler
-                    if function_name.startswith("mcp_"):
-                        # MCP Server tools
-                        tool_result = await self.handle_mcp_tool_call(function_name, function_args)
-                    elif function_name == "search_documents":
-                        # RAG document search
-                        tool_result = await self.handle_search_documents(
-                            query=function_args.get("query"),
-                            control_id=function_args.get("control_id"),
-                            top_k=function_args.get("top_k", 5),
-                            db=db,
-                            current_user=current_user
-                        )
-                    elif function_name == "search_evidence_content":
-                        # Search inside uploaded evidence documents
-                        tool_result = await self.handle_search_evidence_content(
-                            query=function_args.get("query"),
-                            control_id=function_args.get("control_id"),
-                            project_id=function_args.get("project_id"),
-                            top_k=function_args.get("top_k", 5),
-                            db=db,
-                            current_user=current_user
-                        )
-                    elif function_name == "list_projects":
-                        # List projects
-                        tool_result = await self.handle_list_projects(
-                            user_id=current_user["id"],
-                            limit=function_args.get("limit", 10),
-                            status=function_args.get("status", "all"),
-                            db=db
-                        )
-                    elif function_name == "resolve_control_to_evidence":
-                        # Resolve control ID to available evidence
-                        tool_result = await self.handle_resolve_control_to_evidence(
-                            control_id=function_args.get("control_id"),
-                            db=db,
-                            current_user=current_user
-                        )
-                    else:
-                        # Existing tools via AI Task Orchestrator
-                        tool_result = await self._execute_tool(
-                            function_name=function_name,
-                            function_args=function_args,
-                            db=db,
-                            current_user=current_user,
-                            session_id=session_id,
-                            file_path=file_path
-                        )
-                    
-                    tool_results.append({
-                        "tool": function_name,
-                        "arguments": function_args,
-                        "result": tool_result
-                    })
-                
-                # Add tool results back to conversation for final response
-                messages.append({
-                    "role": "assistant",
-                    "content": assistant_message.content or "",
-                    "tool_calls": [
-                        {
-                            "id": tc.id,
-                            "type": "function",
-                            "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments
-                            }
-                        }
-                        for tc in tool_calls
-                    ]
-                })
-                
-                # Add tool results
-                for tool_call, tool_result in zip(tool_calls, tool_results):
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": json.dumps(tool_result["result"])
-                    })
-                
+            if shortcut is not None:
+                final_answer = shortcut
+            elif tool_calls:
                 # Get final response with dynamic parameters based on tool complexity
-                # Determine parameters based on first tool called
-                tool_name = tool_calls[0].function.name
-                params = self.TOOL_COMPLEXITY.get(tool_name, self.TOOL_COMPLEXITY["default"])
-                logger.info(f"Using dynamic params for {tool_name}: temp={params['temperature']}, max_tokens={params['max_tokens']}")
+                params = self._final_response_params(tool_calls)
                 
-                final_response = self.client.chat.completions.create(
+                final_response = await self.client.chat.completions.create(
                     model=self.model,
-                    messages=messages,
+                    messages=turn["messages"],
                     max_tokens=params["max_tokens"],
                     temperature=params["temperature"]
                 )
+                _log_prompt_cache_usage(final_response, "synthesis")
                 
                 final_answer = final_response.choices[0].message.content
             else:
                 # No tool calls, just use assistant's response
-                final_answer = assistant_message.content
-            
-            # Detect rich UI opportunities
-            conversation_history = conversation_manager.get_conversation_history(session_id)
-            rich_ui = self._detect_rich_ui_opportunity(final_answer, conversation_history)
-            
-            # Save assistant response to conversation
-            conversation_manager.add_message(
-                session_id,
-                role="assistant",
-                content=final_answer,
-                tool_calls=tool_results if tool_results else None
-            )
+                final_answer = turn["assistant_message"].content
             
-            result = {
-                "answer": final_answer,
-                "tool_calls": tool_results,
-                "session_id": session_id
-            }
+            return self._finish_turn(final_answer, turn["tool_results"], conversation_manager, session_id)
+            
+        except Exception as e:
+            logger.error("Error in agentic chat: %s", str(e), exc_info=True)
+            raise
+    
+    async def chat_stream(
+        self,
+        message: str,
+        conversation_manager: ConversationManager,
+        session_id: str,
+        db: Session,
+        current_user: Dict[str, Any],
+        file_path: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of chat().
+        
+        Yields ``{"type": "token", "content": ...}`` events as the final answer is
+        generated, followed by a single ``{"type": "done", ...}`` event carrying the
+        same payload chat() returns. The full answer is still saved to the
+        conversation once the stream ends.
+        """
+        try:
+            turn = await self._prepare_turn(
+                message, conversation_manager, session_id, db, current_user, file_path
+            )
+            tool_calls = turn["tool_calls"]
+            shortcut = self._synthesis_shortcut(turn) if tool_calls else None
             
-            # Add rich UI component if detected
-            if rich_ui:
-                result["rich_ui"] = rich_ui
-                logger.info(f"Rich UI component detected: {rich_ui['type']} - {rich_ui.get('form_type', 'unknown')}")
+            if shortcut is not None:
+                final_answer = shortcut
+                yield {"type": "token", "content": final_answer}
+            elif tool_calls:
+                params = self._final_response_params(tool_calls)
+                
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=turn["messages"],
+                    max_tokens=params["max_tokens"],
+                    temperature=params["temperature"],
+                    stream=True
+                )
+                
+                parts = []
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield {"type": "token", "content": delta}
+                final_answer = "".join(parts)
+            else:
+                # No tool calls: the first pass already holds the whole answer
+                final_answer = turn["assistant_message"].content or ""
+                if final_answer:
+                    yield {"type": "token", "content": final_answer}
             
-            return result
+            result = self._finish_turn(final_answer, turn["tool_results"], conversation_manager, session_id)
+            yield {"type": "done", **result}
             
         except Exception as e:
-            logger.error(f"Error in agentic chat: {str(e)}", exc_info=True)
+            logger.error("Error in agentic chat stream: %s", str(e), exc_info=True)
             raise
     
+    async def _run_tool(
+        self,
+        function_name: str,
+        function_args: Dict[str, Any],
+        db: Session,
+        current_user: Dict[str, Any],
+        session_id: Optional[str] = None,
+        file_path: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Run a tool call, serving read-only tools from the result cache when possible
+        
+        Only side-effect-free tools (see _CACHEABLE_TOOL_TTLS) are cached, keyed by
+        (tool name, canonical JSON args, user id). Failed results are never cached.
+        """
+        cache_key = None
+        if function_name in _CACHEABLE_TOOL_TTLS:
+            cache_key = (
+                function_name,
+                orjson.dumps(function_args, option=orjson.OPT_SORT_KEYS, default=str),
+                current_user.get("id")
+            )
+            cached_result = _tool_result_cache.get(cache_key)
+            if cached_result is not None:
+                logger.info("Tool result cache hit for %s", function_name)
+                return cached_result
+        
+        tool_result = await self._dispatch_tool(
+            function_name=function_name,
+            function_args=function_args,
+            db=db,
+            current_user=current_user,
+            session_id=session_id,
+            file_path=file_path
+        )
+        
+        if cache_key is not None and isinstance(tool_result, dict) and tool_result.get("success"):
+            _tool_result_cache[cache_key] = tool_result
+        
+        return tool_result
+    
+    async def _dispatch_tool(
+        self,
+        function_name: str,
+        function_args: Dict[str, Any],
+        db: Session,
+        current_user: Dict[str, Any],
+        session_id: Optional[str] = None,
+        file_path: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Route a tool call to the appropriate handler"""
+        # Route to appropriate handler
+        if function_name.startswith("mcp_"):
+            # MCP Server tools
+            return await self.handle_mcp_tool_call(function_name, function_args)
+        elif function_name == "search_documents":
+            # RAG document search
+            return await self.handle_search_documents(
+                query=function_args.get("query"),
+                control_id=function_args.get("control_id"),
+                top_k=function_args.get("top_k", 5),
+                db=db,
+                current_user=current_user
+            )
+        elif function_name == "search_evidence_content":
+            # Search inside uploaded evidence documents
+            return await self.handle_search_evidence_content(
+                query=function_args.get("query"),
+                control_id=function_args.get("control_id"),
+                project_id=function_args.get("project_id"),
+                top_k=function_args.get("top_k", 5),
+                db=db,
+                current_user=current_user
+            )
+        elif function_name == "list_projects":
+            # List projects
+            return await self.handle_list_projects(
+                user_id=current_user["id"],
+                limit=function_args.get("limit", 10),
+                status=function_args.get("status", "all"),
+                db=db
+            )
+        elif function_name == "resolve_control_to_evidence":
+            # Resolve control ID to available evidence
+            return await self.handle_resolve_control_to_evidence(
+                control_id=function_args.get("control_id"),
+                db=db,
+                current_user=current_user
+            )
+        else:
+            # Existing tools via AI Task Orchestrator
+            return await self._execute_tool(
+                function_name=function_name,
+                function_args=function_args,
+                db=db,
+                current_user=current_user,
+                session_id=session_id,
+                file_path=file_path
+            )
+    
     async def handle_mcp_tool_call(
         self,
         tool_name: str,
@@ -1290,26 +1699,86 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
             # Remove 'mcp_' prefix to get actual tool name
             actual_tool_name = tool_name.replace("mcp_", "")
             
-            logger.info(f"Calling MCP tool: {actual_tool_name}")
-            logger.debug(f"MCP tool arguments: {arguments}")
+            logger.info("Calling MCP tool: %s", actual_tool_name)
+            logger.debug("MCP tool arguments: %s", arguments)
             
             # Call MCP server
             result = await mcp_client.call_tool(actual_tool_name, arguments)
             
-            logger.info(f"MCP tool {actual_tool_name} completed successfully")
+            logger.info("MCP tool %s completed successfully", actual_tool_name)
             
             return {
                 "success": True,
                 "result": result
             }
         except Exception as e:
-            logger.error(f"MCP tool call failed: {e}", exc_info=True)
+            logger.error("MCP tool call failed: %s", e, exc_info=True)
             return {
                 "success": False,
                 "error": str(e),
                 "tool_name": tool_name
             }
     
+    async def _run_mcp_batches(self, parsed_calls: List[tuple]) -> Dict[int, Dict[str, Any]]:
+        """
+        Collapse repeated calls to the same MCP tool into one batched request
+        
+        Args:
+            parsed_calls: (tool name, arguments) pairs in tool_call order
+            
+        Returns:
+            Results keyed by position in parsed_calls; tools called once are omitted
+        """
+        groups: Dict[str, List[int]] = {}
+        for index, (function_name, _) in enumerate(parsed_calls):
+            if function_name.startswith("mcp_"):
+                groups.setdefault(function_name, []).append(index)
+        
+        results: Dict[int, Dict[str, Any]] = {}
+        for function_name, indices in groups.items():
+            if len(indices) < 2:
+                continue
+            batch = await self.handle_mcp_tool_batch(
+                function_name, [parsed_calls[i][1] for i in indices]
+            )
+            results.update(zip(indices, batch))
+        return results
+    
+    async def handle_mcp_tool_batch(
+        self,
+        tool_name: str,
+        calls: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Run several calls of one MCP tool in a single round-trip
+        
+        Falls back to one request per call if the server has no batch handler.
+        
+        Args:
+            tool_name: MCP tool name (e.g. mcp_fetch_evidence)
+            calls: Argument dicts, one per tool call
+            
+        Returns:
+            Per-call results in the same shape as handle_mcp_tool_call
+        """
+        from ..mcp.client import mcp_client
+        
+        actual_tool_name = tool_name.replace("mcp_", "")
+        
+        try:
+            logger.info("Calling MCP tool: %s_batch (%s calls)", actual_tool_name, len(calls))
+            result = await mcp_client.call_tool(f"{actual_tool_name}_batch", {"calls": calls})
+        except Exception as e:
+            logger.warning("MCP batch call failed, falling back to individual calls: %s", e)
+            return [await self.handle_mcp_tool_call(tool_name, arguments) for arguments in calls]
+        
+        return [
+            {"success": True, "result": item.get("result", {})}
+            if item.get("success")
+            else {"success": False, "error": item.get("error", "Unknown error"), "tool_name": tool_name}
+            for item in result.get("results", [])
+        ]
+    
     async def handle_list_projects(
         self,
         user_id: int,
@@ -1330,9 +1799,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
             List of projects with details
         """
         try:
-            from sqlalchemy import text
-            
-            logger.info(f"Listing projects for user {user_id}, status={status}, limit={limit}")
+            logger.info("Listing projects for user %s, status=%s, limit=%s", user_id, status, limit)
             
             # Get user's agency_id
             user_query = text("SELECT agency_id FROM users WHERE id = :user_id")
@@ -1397,7 +1864,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
             }
             
         except Exception as e:
-            logger.error(f"List projects failed: {e}", exc_info=True)
+            logger.error("List projects failed: %s", e, exc_info=True)
             return {
                 "success": False,
                 "error": str(e)
@@ -1427,7 +1894,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
         try:
             from ..rag.vector_search import unified_search
             
-            logger.info(f"Searching documents: {query} (backend: {'Azure AI Search' if unified_search.backend else 'In-Memory'})")
+            logger.info("Searching documents: %s (backend: %s)", query, 'Azure AI Search' if unified_search.backend else 'In-Memory')
             
             # Perform vector search using unified interface (routes to Azure Search when enabled)
             search_results = await unified_search.search(
@@ -1476,7 +1943,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
             }
             
         except Exception as e:
-            logger.error(f"Document search failed: {e}", exc_info=True)
+            logger.error("Document search failed: %s", e, exc_info=True)
             return {
                 "success": False,
                 "error": str(e),
@@ -1513,7 +1980,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
             from ..rag.llm_service import LLMService
             from ..config import settings
             
-            logger.info(f"Searching evidence content: '{query}' (control_id={control_id}, project_id={project_id})")
+            logger.info("Searching evidence content: '%s' (control_id=%s, project_id=%s)", query, control_id, project_id)
             
             # Check if Azure Search is enabled
             if not settings.AZURE_SEARCH_ENABLED:
@@ -1579,7 +2046,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
             }
             
         except Exception as e:
-            logger.error(f"Evidence content search failed: {e}", exc_info=True)
+            logger.error("Evidence content search failed: %s", e, exc_info=True)
             return {
                 "success": False,
                 "error": str(e),
@@ -1608,7 +2075,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
         try:
             from api.src.models import Evidence, Control
             
-            logger.info(f"Resolving Control {control_id} to available evidence for user {current_user.get('id')}")
+            logger.info("Resolving Control %s to available evidence for user %s", control_id, current_user.get('id'))
             
             # Query evidence for this control that can be submitted
             # Only pending or rejected status can be submitted
@@ -1648,7 +2115,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
             }
             
         except Exception as e:
-            logger.error(f"Resolve control to evidence failed: {e}", exc_info=True)
+            logger.error("Resolve control to evidence failed: %s", e, exc_info=True)
             return {
                 "success": False,
                 "count": 0,
@@ -1855,39 +2322,28 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
         return {"valid": True}
     
     def _coerce_argument_types(self, function_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
-        """Coerce argument types to match expected schema (fixes LLM string->int issues)"""
-        # Define integer fields for each function
-        integer_fields = {
-            "upload_evidence": ["control_id", "project_id"],
-            "fetch_evidence": ["control_id", "project_id"],
-            "analyze_compliance": ["control_id", "project_id"],
-            "generate_report": ["project_id"],
-            "submit_for_review": ["evidence_id"],
-            "submit_evidence_for_review": ["evidence_id"],
-            "request_evidence_upload": ["control_id"],
-            "create_project": ["agency_id"],
-            "create_controls": ["project_id"],
-            "analyze_evidence": ["evidence_id", "control_id"],
-            "analyze_evidence_for_control": ["control_id"],
-            "suggest_related_controls": ["evidence_id", "control_id"],
-            "get_evidence_by_control": ["control_id"],
-            "get_recent_evidence": ["limit", "user_id"]
-        }
+        """Coerce argument types to match expected schema (fixes LLM string->int issues)
         
-        coerced = args.copy()
-        int_fields = integer_fields.get(function_name, [])
+        Returns ``args`` itself when nothing needs coercing.
+        """
+        int_fields = self.INTEGER_FIELDS.get(function_name)
+        if not int_fields:
+            return args
         
-        for field in int_fields:
-            if field in coerced and coerced[field] is not None:
-                try:
-                    # Convert to int if it's a string representation
-                    if isinstance(coerced[field], str):
-                        coerced[field] = int(coerced[field])
-                        logger.info(f"Coerced {field} from string to int: {coerced[field]}")
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Failed to coerce {field} to int: {e}")
-        
-        return coerced
+        needs = [field for field in int_fields if isinstance(args.get(field), str)]
+        if not needs:
+            return args
+        
+        coerced = {}
+        for field in needs:
+            try:
+                coerced[field] = int(args[field])
+            except (ValueError, TypeError) as e:
+                logger.warning("Failed to coerce %s to int: %s", field, e)
+        
+        if coerced:
+            logger.debug("Coerced %s from string to int", list(coerced))
+        return {**args, **coerced}
     
     def _detect_rich_ui_opportunity(self, message: str, conversation_history: list) -> Optional[Dict[str, Any]]:
         """
@@ -2032,7 +2488,33 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
         session_id: Optional[str] = None,
         file_path: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Execute a tool via AI Task Orchestrator"""
+        """Execute a tool via AI Task Orchestrator
+        
+        The tool bodies are blocking SQLAlchemy work, so they run in a worker
+        thread to keep concurrent chat sessions from queueing on the event loop.
+        """
+        return await asyncio.to_thread(
+            self._execute_tool_sync,
+            function_name,
+            function_args,
+            db,
+            current_user,
+            session_id,
+            file_path,
+            asyncio.get_running_loop()
+        )
+    
+    def _execute_tool_sync(
+        self,
+        function_name: str,
+        function_args: Dict[str, Any],
+        db: Session,
+        current_user: Dict[str, Any],
+        session_id: Optional[str],
+        file_path: Optional[str],
+        loop: asyncio.AbstractEventLoop
+    ) -> Dict[str, Any]:
+        """Blocking body of _execute_tool; ``loop`` is used to schedule background coroutines"""
         
         # RBAC: Check role permissions before execution
         user_role = current_user.get("role", "").lower()
@@ -2050,7 +2532,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
         # Enforce role-based tool access
         if function_name in AUDITOR_ONLY_TOOLS:
             if user_role not in ['auditor', 'super_admin']:
-                logger.error(f"RBAC violation: User role '{user_role}' attempted to use auditor-only tool '{function_name}'")
+                logger.error("RBAC violation: User role '%s' attempted to use auditor-only tool '%s'", user_role, function_name)
                 return {
                     "error": "Access denied",
                     "status": "forbidden",
@@ -2059,7 +2541,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
         
         if function_name in ANALYST_ONLY_TOOLS:
             if user_role not in ['analyst', 'super_admin']:
-                logger.error(f"RBAC violation: User role '{user_role}' attempted to use analyst tool '{function_name}'")
+                logger.error("RBAC violation: User role '%s' attempted to use analyst tool '%s'", user_role, function_name)
                 return {
                     "error": "Access denied",
                     "status": "forbidden",
@@ -2070,7 +2552,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
         # Pass file_path to validation so it can properly validate upload_evidence
         validation_result = self._validate_tool_parameters(function_name, function_args, db, current_user, file_path)
         if not validation_result["valid"]:
-            logger.error(f"Tool validation failed for {function_name}: {validation_result['error']}")
+            logger.error("Tool validation failed for %s: %s", function_name, validation_result['error'])
             return {
                 "error": validation_result["error"],
                 "status": "validation_failed",
@@ -2079,7 +2561,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
         
         # FAST PATH: Execute upload_evidence synchronously (no async task)
         if function_name == "upload_evidence":
-            logger.info(f"Executing upload_evidence synchronously (fast path)")
+            logger.info("Executing upload_evidence synchronously (fast path)")
             
             # Coerce argument types
             function_args = self._coerce_argument_types(function_name, function_args)
@@ -2090,7 +2572,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
             # Add file_path - override LLM's suggestion with actual file
             if file_path:
                 payload["file_path"] = file_path
-                logger.info(f"Using actual file path for upload: {file_path}")
+                logger.info("Using actual file path for upload: %s", file_path)
             
             # Add current user ID and agency_id
             payload["current_user_id"] = current_user.get("id")
@@ -2128,7 +2610,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                 ).first()
                 
                 if existing:
-                    logger.info(f"Evidence already exists with ID {existing.id}")
+                    logger.info("Evidence already exists with ID %s", existing.id)
                     return {
                         "status": "success",
                         "message": f"Evidence '{existing.title}' already uploaded. Evidence ID: {existing.id}",
@@ -2158,7 +2640,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                 db.commit()
                 db.refresh(evidence)
                 
-                logger.info(f"✅ Synchronous upload completed: Evidence {evidence.id} created for control {control_id}")
+                logger.info("✅ Synchronous upload completed: Evidence %s created for control %s", evidence.id, control_id)
                 
                 # Index evidence content for semantic search (async in background)
                 try:
@@ -2176,18 +2658,19 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                             "file_name": file_path.split('/')[-1] if '/' in file_path else file_path.split('\\')[-1],
                             "evidence_type": evidence_type
                         }
-                        # Run indexing in background (don't block response)
-                        import asyncio
-                        asyncio.create_task(indexer.index_evidence(
+                        # Run indexing in background on the event loop (don't block response).
+                        # No db is passed: the request session is not thread-safe and is
+                        # closed before indexing finishes, so the indexer opens its own.
+                        future = asyncio.run_coroutine_threadsafe(indexer.index_evidence(
                             evidence_id=evidence.id,
                             file_path=file_path,
-                            evidence_metadata=evidence_metadata,
-                            db=db
-                        ))
-                        logger.info(f"📚 Queued evidence {evidence.id} for content indexing")
+                            evidence_metadata=evidence_metadata
+                        ), loop)
+                        future.add_done_callback(partial(_log_background_indexing, evidence.id))
+                        logger.info("📚 Queued evidence %s for content indexing", evidence.id)
                 except Exception as indexing_error:
                     # Don't fail the upload if indexing fails
-                    logger.warning(f"Evidence indexing queued but may fail: {indexing_error}")
+                    logger.warning("Evidence indexing queued but may fail: %s", indexing_error)
                 
                 return {
                     "status": "success",
@@ -2198,7 +2681,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                 }
                 
             except Exception as e:
-                logger.error(f"Synchronous upload failed: {e}", exc_info=True)
+                logger.error("Synchronous upload failed: %s", e, exc_info=True)
                 return {
                     "error": str(e),
                     "status": "error",
@@ -2207,7 +2690,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
         
         # FAST PATH: Execute evidence query tools synchronously
         if function_name == "get_evidence_by_control":
-            logger.info(f"Executing get_evidence_by_control synchronously (fast path)")
+            logger.info("Executing get_evidence_by_control synchronously (fast path)")
             
             from api.src import models
             
@@ -2239,7 +2722,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                         try:
                             download_url = f"/api/v1/evidence/{ev.id}/download"
                         except Exception as e:
-                            logger.warning(f"Could not generate download URL for evidence {ev.id}: {e}")
+                            logger.warning("Could not generate download URL for evidence %s: %s", ev.id, e)
                     
                     evidence_data.append({
                         "id": ev.id,
@@ -2252,7 +2735,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                         "download_url": download_url
                     })
                 
-                logger.info(f"✅ Found {len(evidence_data)} evidence items for control {control_id}")
+                logger.info("✅ Found %s evidence items for control %s", len(evidence_data), control_id)
                 
                 return {
                     "status": "success",
@@ -2262,11 +2745,11 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                 }
                 
             except Exception as e:
-                logger.error(f"get_evidence_by_control failed: {e}", exc_info=True)
+                logger.error("get_evidence_by_control failed: %s", e, exc_info=True)
                 return {"error": str(e), "status": "error"}
         
         if function_name == "get_recent_evidence":
-            logger.info(f"Executing get_recent_evidence synchronously (fast path)")
+            logger.info("Executing get_recent_evidence synchronously (fast path)")
             
             from api.src import models
             
@@ -2298,7 +2781,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                         try:
                             download_url = f"/api/v1/evidence/{ev.id}/download"
                         except Exception as e:
-                            logger.warning(f"Could not generate download URL for evidence {ev.id}: {e}")
+                            logger.warning("Could not generate download URL for evidence %s: %s", ev.id, e)
                     
                     evidence_data.append({
                         "id": ev.id,
@@ -2311,7 +2794,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                         "download_url": download_url
                     })
                 
-                logger.info(f"✅ Found {len(evidence_data)} recent evidence items")
+                logger.info("✅ Found %s recent evidence items", len(evidence_data))
                 
                 return {
                     "status": "success",
@@ -2321,12 +2804,12 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                 }
                 
             except Exception as e:
-                logger.error(f"get_recent_evidence failed: {e}", exc_info=True)
+                logger.error("get_recent_evidence failed: %s", e, exc_info=True)
                 return {"error": str(e), "status": "error"}
         
         # FAST PATH: AI-powered evidence analysis for control
         if function_name == "analyze_evidence_for_control":
-            logger.info(f"Executing analyze_evidence_for_control synchronously (fast path)")
+            logger.info("Executing analyze_evidence_for_control synchronously (fast path)")
             
             from api.src import models
             
@@ -2436,7 +2919,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                 summary_parts.append(f"{verified_count} verified, {total_evidence - verified_count} pending verification.")
                 summary_parts.append(f"Overall quality: {completeness} ({quality_score}%).")
                 
-                logger.info(f"✅ Analyzed evidence for control {control_id}: {quality_score}% quality, {completeness} completeness")
+                logger.info("✅ Analyzed evidence for control %s: %s%% quality, %s completeness", control_id, quality_score, completeness)
                 
                 return {
                     "status": "success",
@@ -2456,12 +2939,12 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                 }
                 
             except Exception as e:
-                logger.error(f"analyze_evidence_for_control failed: {e}", exc_info=True)
+                logger.error("analyze_evidence_for_control failed: %s", e, exc_info=True)
                 return {"error": str(e), "status": "error"}
         
         # FAST PATH: Create assessment synchronously
         if function_name == "create_assessment":
-            logger.info(f"Executing create_assessment synchronously (fast path)")
+            logger.info("Executing create_assessment synchronously (fast path)")
             
             from api.src import models
             from datetime import datetime
@@ -2502,7 +2985,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                 db.commit()
                 db.refresh(assessment)
                 
-                logger.info(f"✅ Assessment created: ID {assessment.id}")
+                logger.info("✅ Assessment created: ID %s", assessment.id)
                 
                 return {
                     "status": "success",
@@ -2518,12 +3001,12 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                 }
                 
             except Exception as e:
-                logger.error(f"create_assessment failed: {e}", exc_info=True)
+                logger.error("create_assessment failed: %s", e, exc_info=True)
                 return {"error": str(e), "status": "error"}
         
         # FAST PATH: Create finding synchronously
         if function_name == "create_finding":
-            logger.info(f"Executing create_finding synchronously (fast path)")
+            logger.info("Executing create_finding synchronously (fast path)")
             
             from api.src import models
             from datetime import datetime, timedelta
@@ -2575,7 +3058,7 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                         assessment.findings_count_low = (assessment.findings_count_low or 0) + 1
                     db.commit()
                 
-                logger.info(f"✅ Finding created: ID {finding.id}")
+                logger.info("✅ Finding created: ID %s", finding.id)
                 
                 return {
                     "status": "success",
@@ -2591,27 +3074,15 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
                 }
                 
             except Exception as e:
-                logger.error(f"create_finding failed: {e}", exc_info=True)
+                logger.error("create_finding failed: %s", e, exc_info=True)
                 return {"error": str(e), "status": "error"}
         
         # SLOW PATH: All other tools use async worker
         # Map tool to task type
-        task_type_map = {
-            "create_project": "create_project",
-            "create_controls": "create_controls",
-            "fetch_evidence": "fetch_evidence",  # MCP-based fetch
-            "analyze_compliance": "analyze_compliance",
-            "generate_report": "generate_report",
-            "submit_for_review": "submit_for_review",
-            "request_evidence_upload": "request_evidence_upload",
-            "analyze_evidence": "analyze_evidence_rag",  # Use RAG version
-            "suggest_related_controls": "suggest_related_controls",
-            "submit_evidence_for_review": "submit_evidence_for_review"
-        }
-        
-        task_type = task_type_map.get(function_name)
-        if not task_type:
+        task_config = _TOOL_TASKS.get(function_name)
+        if not task_config:
             return {"error": f"Unknown tool: {function_name}"}
+        task_type = task_config.task_type
         
         # Coerce argument types (fix LLM returning strings for integers)
         function_args = self._coerce_argument_types(function_name, function_args)
@@ -2626,16 +3097,16 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
             payload["domain_areas"] = [f"IM8-{d:02d}" for d in domains]
             # Calculate count (3 controls per domain for IM8)
             payload["count"] = len(domains) * 3
-            logger.info(f"Converted domains {domains} to domain_areas {payload['domain_areas']}, count={payload['count']}")
+            logger.info("Converted domains %s to domain_areas %s, count=%s", domains, payload['domain_areas'], payload['count'])
         
         # Add file_path for upload operations - override LLM's suggestion with actual file
         if function_name == "fetch_evidence":
             if file_path:
                 payload["file_path"] = file_path
-                logger.info(f"Using actual file path for fetch: {file_path}")
+                logger.info("Using actual file path for fetch: %s", file_path)
             elif "file_path" in payload and not payload["file_path"].startswith("/app/storage"):
                 # LLM provided relative path, make it absolute
-                logger.warning(f"LLM provided relative path: {payload['file_path']}, need actual file")
+                logger.warning("LLM provided relative path: %s, need actual file", payload['file_path'])
         
         # Add current user ID, agency_id, and session_id
         payload["current_user_id"] = current_user.get("id")
@@ -2644,25 +3115,10 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
             payload["session_id"] = session_id
         
         # Generate title and description for the task
-        title_map = {
-            "create_project": "Create New Project",
-            "create_controls": "Create IM8 Controls",
-            "upload_evidence": "Upload Evidence Document",
-            "fetch_evidence": "Fetch Evidence",
-            "analyze_compliance": "Analyze Compliance",
-            "generate_report": "Generate Compliance Report",
-            "submit_for_review": "Submit for Review"
-        }
-        
-        
-        title = title_map.get(function_name, "AI Assistant Task")
+        title = task_config.title
         description = f"Task created by AI Assistant: {function_name}"
         
         # Create and execute task
-        from api.src.models import AgentTask
-        from api.src.workers.task_worker import get_worker
-        import time
-        
         task = AgentTask(
             task_type=task_type,
             status="pending",
@@ -2678,18 +3134,17 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
         
         # Send notification to task worker for immediate processing
         try:
-            from sqlalchemy import text
             db.execute(text(f"NOTIFY new_task, '{task.id}'"))
             db.commit()
-            logger.info(f"Sent NOTIFY for task {task.id}")
+            logger.info("Sent NOTIFY for task %s", task.id)
         except Exception as e:
-            logger.warning(f"Failed to send NOTIFY for task {task.id}: {e}")
+            logger.warning("Failed to send NOTIFY for task %s: %s", task.id, e)
         
-        logger.info(f"Created task {task.id} for tool {function_name}")
+        logger.info("Created task %s for tool %s", task.id, function_name)
         
         # Return task ID immediately for SSE streaming (no waiting)
         # The client will receive real-time updates via SSE when task completes
-        logger.info(f"Task {task.id} created, returning immediately for SSE streaming")
+        logger.info("Task %s created, returning immediately for SSE streaming", task.id)
         
         return {
             "task_id": task.id,
@@ -2699,3 +3154,12 @@ You are currently assisting {current_user.get('username', 'the user')} from {age
         }
 
 
+# Singleton instance: the assistant holds no per-request state, so one per worker
+_agentic_assistant = None
+
+def get_agentic_assistant() -> AgenticAssistant:
+    """Get or create AgenticAssistant singleton"""
+    global _agentic_assistant
+    if _agentic_assistant is None:
+        _agentic_assistant = AgenticAssistant()
+    return _agentic_assistant
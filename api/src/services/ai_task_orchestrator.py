@@ -5,61 +5,481 @@ This service allows the AI assistant to automatically create and execute
 agent tasks based on natural language user requests.
 """
 
+import asyncio
+import functools
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List
+import re
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Any, FrozenSet, Optional, List, Tuple
+import ahocorasick
+from cachetools import LRUCache
+from sqlalchemy import event
 from sqlalchemy.orm import Session
-from api.src.models import AgentTask, User
+from api.src.models import AgentTask, Control, User
 from api.src.agent_schemas import AgentTaskCreate
+from api.src.config import settings
+from api.src.mcp.client import mcp_client
+from api.src.rag.llm_service import llm_service
+from api.src.rag.vector_search import unified_search
 
 logger = logging.getLogger(__name__)
 
 
+def _build_automaton(entries: Dict[str, Any]) -> ahocorasick.Automaton:
+    """Build an Aho-Corasick automaton mapping each pattern string to its value"""
+    automaton = ahocorasick.Automaton()
+    for pattern, value in entries.items():
+        automaton.add_word(pattern, (pattern, value))
+    automaton.make_automaton()
+    return automaton
+
+
+@dataclass(frozen=True, slots=True)
+class IntentConfig:
+    """Everything needed to turn a detected intent into a task and a reply"""
+    task_type: str
+    title: str
+    description_tpl: str
+    response_tpl: str
+
+
+_EVIDENCE_INTENT_CONFIG = IntentConfig(
+    # upload_evidence and fetch_evidence share the fetch_evidence handler, which
+    # can both fetch remote evidence and process uploaded files
+    task_type='fetch_evidence',
+    title="",
+    description_tpl="AI-initiated evidence upload for control {control_id}",
+    response_tpl="✅ I've created an evidence collection task (ID: {task_id}) for control {control_id}. The agent will process and verify your document with SHA-256 checksums for integrity verification. The evidence will be securely stored and linked to the control. You can track the progress in Agent Tasks."
+)
+
+_INTENT_CONFIG: Dict[str, IntentConfig] = {
+    'analyze_compliance': IntentConfig(
+        task_type='analyze_compliance',
+        title="AI Assistant: Analyze Compliance",
+        description_tpl="AI-initiated compliance analysis for project {project_id} using {framework} framework",
+        response_tpl="✅ I've created a compliance analysis task (ID: {task_id}) for project {project_id} using the {framework} framework. The agent will analyze all controls and provide a detailed compliance score with recommendations. You can monitor the task progress in the Agent Tasks section."
+    ),
+    'fetch_evidence': replace(_EVIDENCE_INTENT_CONFIG, title="AI Assistant: Fetch Evidence"),
+    'upload_evidence': replace(_EVIDENCE_INTENT_CONFIG, title="AI Assistant: Upload Evidence"),
+    'generate_report': IntentConfig(
+        task_type='generate_report',
+        title="AI Assistant: Generate Report",
+        description_tpl="AI-initiated compliance report generation",
+        response_tpl="✅ I've created a report generation task (ID: {task_id}). The agent will compile a comprehensive compliance report. Check Agent Tasks for progress."
+    ),
+}
+
+_DEFAULT_INTENT_CONFIG = IntentConfig(
+    task_type='',
+    title="",
+    description_tpl="AI-initiated task",
+    response_tpl="✅ Task {task_id} created and queued for execution."
+)
+
+
+def _intent_config(intent: str) -> IntentConfig:
+    """Config for an intent; unknown intents keep their own name as task type"""
+    config = _INTENT_CONFIG.get(intent)
+    if config is None:
+        config = replace(
+            _DEFAULT_INTENT_CONFIG,
+            task_type=intent,
+            title=f"AI Assistant: {intent.replace('_', ' ').title()}"
+        )
+    return config
+
+
+def _user_id(current_user: Any) -> Optional[int]:
+    """ID of the current user, given the auth dict or a User row"""
+    return current_user.get("id") if isinstance(current_user, dict) else current_user.id
+
+
+def _template_fields(entities: Dict[str, Any], task_id: Optional[int] = None) -> Dict[str, Any]:
+    """Values available to IntentConfig description/response templates"""
+    return {
+        'framework': entities.get('framework', 'IM8'),
+        'project_id': entities.get('project_id', 1),
+        'control_id': entities.get('control_id', 1),
+        'task_id': task_id,
+    }
+
+
+# Payload defaults, shared by every task instead of rebuilt per call
+_DEFAULT_FRAMEWORK = 'IM8'
+_DEFAULT_REPORT_TYPE = 'compliance'
+_UPLOADED_EVIDENCE_DESCRIPTION = 'Evidence uploaded via AI assistant'
+_DEFAULT_EVIDENCE_FILE = '/app/storage/test_evidence/test_doc.txt'
+_DEFAULT_EVIDENCE_DESCRIPTION = 'Default test evidence'
+
+
+def _analysis_payload(
+    entities: Dict[str, Any], file_path: Optional[str], current_user_id: Optional[int]
+) -> Dict[str, Any]:
+    return {
+        'project_id': entities.get('project_id', 1),
+        'framework': entities.get('framework', _DEFAULT_FRAMEWORK),
+        'include_evidence': entities.get('include_evidence', True),
+        'generate_recommendations': entities.get('generate_recommendations', True)
+    }
+
+
+def _evidence_payload(
+    entities: Dict[str, Any], file_path: Optional[str], current_user_id: Optional[int]
+) -> Dict[str, Any]:
+    """Shared by fetch_evidence and upload_evidence"""
+    if file_path:
+        source = {
+            'type': 'file',
+            'location': file_path,
+            'description': entities.get('description', _UPLOADED_EVIDENCE_DESCRIPTION),
+            'control_id': entities.get('control_id', 1)
+        }
+    else:
+        # Use default test file
+        source = {
+            'type': 'file',
+            'location': _DEFAULT_EVIDENCE_FILE,
+            'description': _DEFAULT_EVIDENCE_DESCRIPTION,
+            'control_id': entities.get('control_id', 1)
+        }
+    
+    return {
+        'sources': [source],
+        'project_id': entities.get('project_id', 1),
+        # Use actual user ID for maker-checker attribution
+        'created_by': current_user_id or entities.get('created_by', 1)
+    }
+
+
+def _report_payload(
+    entities: Dict[str, Any], file_path: Optional[str], current_user_id: Optional[int]
+) -> Dict[str, Any]:
+    return {
+        'project_id': entities.get('project_id', 1),
+        'report_type': entities.get('report_type', _DEFAULT_REPORT_TYPE),
+        'framework': entities.get('framework', _DEFAULT_FRAMEWORK)
+    }
+
+
+def _empty_payload(
+    entities: Dict[str, Any], file_path: Optional[str], current_user_id: Optional[int]
+) -> Dict[str, Any]:
+    return {}
+
+
+_PAYLOAD_BUILDERS = {
+    'analyze_compliance': _analysis_payload,
+    'fetch_evidence': _evidence_payload,
+    'upload_evidence': _evidence_payload,
+    'generate_report': _report_payload,
+}
+
+_IM8_PATTERN = re.compile(r'im8[- ]?(\d{2})[- ]?(\d{2})')
+_DIGIT = re.compile(r'\d')
+# "project 5", "project_id 5", "proj 5", "control 12", "control_id 12"
+_ID_PATTERN = re.compile(r'\b(project|proj|control)(?:_id)?\s+(\d+)\b')
+_ID_ENTITIES = {'project': 'project_id', 'proj': 'project_id', 'control': 'control_id'}
+# Matched as substrings in this order so forms like 'im8-01-03' still count
+_FRAMEWORKS = (('im8', 'IM8'), ('iso27001', 'ISO27001'), ('iso', 'ISO27001'), ('nist', 'NIST'))
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_entities(message_lower: str) -> Tuple[Tuple[Tuple[str, Any], ...], Optional[str]]:
+    """
+    Extract the entities that depend only on the message text
+    
+    Returns:
+        (entity items, IM8 code or None) - items are a tuple so the cached
+        value cannot be mutated by callers
+    """
+    entities = {}
+    im8_code = None
+    
+    # Project/control ids and IM8 codes all need a digit; most chat has none
+    if _DIGIT.search(message_lower):
+        # Extract project and control IDs in one sweep (the last mention wins)
+        # Simple pattern matching - in production, use NER
+        for match in _ID_PATTERN.finditer(message_lower):
+            entities[_ID_ENTITIES[match.group(1)]] = int(match.group(2))
+        
+        # Extract IM8 control format (e.g., IM8-01-03, IM8-02-01)
+        im8_match = _IM8_PATTERN.search(message_lower)
+        if im8_match and 'control_id' not in entities:
+            im8_code = f"IM8-{im8_match.group(1)}-{im8_match.group(2)}"
+    
+    # Extract framework
+    for framework, name in _FRAMEWORKS:
+        if framework in message_lower:
+            entities['framework'] = name
+            break
+    
+    return tuple(entities.items()), im8_code
+
+
+_INTENT_PATTERNS: Dict[str, List[str]] = {
+    'upload_evidence': [
+        'upload evidence',
+        'add evidence',
+        'submit evidence',
+        'attach evidence',
+        'provide evidence',
+        'evidence for',
+        'uploading an evidence',
+        'attached file',
+        'upload document',
+        'submit document',
+        'upload file',
+        'attach file',
+        'submit file',
+        'im8-'  # IM8 control format (e.g., IM8-01-03)
+    ],
+    'fetch_evidence': [
+        'fetch evidence',
+        'download evidence',
+        'get evidence',
+        'retrieve evidence',
+        'collect evidence'
+    ],
+    'analyze_compliance': [
+        'analyze compliance',
+        'check compliance',
+        'compliance analysis',
+        'compliance status',
+        'how compliant',
+        'compliance score'
+    ],
+    'generate_report': [
+        'generate report',
+        'create report',
+        'compliance report',
+        # Removed 'audit report' to avoid conflict with evidence uploads
+        'assessment report',
+        'generate compliance report',
+        'create compliance report'
+    ]
+}
+
+# Keyword groups used to match a message to a control
+_CONTROL_KEYWORDS: Dict[str, List[str]] = {
+    'mfa': ['mfa', 'multi-factor', 'multi factor', '2fa', 'two-factor', 'authentication'],
+    'network': ['network', 'segmentation', 'firewall', 'network security'],
+    'encryption': ['encrypt', 'encryption', 'crypto', 'data at rest', 'encrypted'],
+    'access': ['access control', 'access management', 'identity', 'iam'],
+}
+
+# Words that, with an attached file, mean the user is uploading evidence
+_UPLOAD_INDICATORS = ['evidence', 'document', 'report', 'audit', 'assessment', 'upload', 'attach']
+
+
+def _has_match(automaton: ahocorasick.Automaton, text: str) -> bool:
+    """True if any automaton pattern occurs in text"""
+    return next(automaton.iter(text), None) is not None
+
+
+def _build_intent_automaton(intent_patterns: Dict[str, List[str]]) -> ahocorasick.Automaton:
+    """Automaton whose values are (priority, intent); earlier intents have higher priority"""
+    entries: Dict[str, Tuple[int, str]] = {}
+    for priority, (intent, patterns) in enumerate(intent_patterns.items()):
+        for pattern in patterns:
+            entries.setdefault(pattern, (priority, intent))
+    return _build_automaton(entries)
+
+
+def _build_keyword_automaton(keyword_groups: Dict[str, List[str]]) -> ahocorasick.Automaton:
+    """Automaton whose values are the set of groups each keyword belongs to"""
+    entries: Dict[str, set] = {}
+    for group, keywords in keyword_groups.items():
+        for keyword in keywords:
+            entries.setdefault(keyword, set()).add(group)
+    return _build_automaton(entries)
+
+
+# Single-pass matchers, built once at import and shared by every orchestrator:
+# every pattern is found in one O(len(message)) scan
+_INTENT_AUTOMATON = _build_intent_automaton(_INTENT_PATTERNS)
+_UPLOAD_AUTOMATON = _build_automaton({word: True for word in _UPLOAD_INDICATORS})
+_CONTROL_KEYWORD_AUTOMATON = _build_keyword_automaton(_CONTROL_KEYWORDS)
+
+# Messages shorter than every pattern ("ok", "yes", "1") cannot match an intent
+_MIN_INTENT_MESSAGE_LEN = min(
+    len(pattern)
+    for pattern in (*_UPLOAD_INDICATORS, *(p for patterns in _INTENT_PATTERNS.values() for p in patterns))
+)
+
+
+# Quick replies and button macros resend the same text; remember the scan per
+# (message_lower, has_file). Call cache_clear() if _INTENT_PATTERNS is edited.
+@functools.lru_cache(maxsize=4096)
+def _detect_intent_cached(message_lower: str, has_file: bool) -> Tuple[Optional[str], Optional[str]]:
+    """Scan for an intent; returns (intent, matched pattern) or (None, None)"""
+    # If a file is uploaded, prioritize upload_evidence intent
+    if has_file:
+        # Check if message contains evidence/document upload keywords
+        if _has_match(_UPLOAD_AUTOMATON, message_lower):
+            return 'upload_evidence', None
+    
+    # Highest-priority intent among all patterns present in the message
+    best = min(_INTENT_AUTOMATON.iter(message_lower), key=lambda match: match[1][1][0], default=None)
+    if best is None:
+        return None, None
+    
+    pattern, (_, intent) = best[1]
+    return intent, pattern
+
+
+# Query embeddings keyed by a hash of the text: chat retries and UI refreshes
+# repeat the same search, and each embedding is a paid, slow model call
+_embedding_cache: LRUCache = LRUCache(maxsize=10_000)
+_embedding_inflight: Dict[str, asyncio.Future] = {}
+
+
+async def _get_query_embedding(text: str) -> List[float]:
+    """Embedding for a search query, cached and shared between concurrent identical requests"""
+    key = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+    embedding = _embedding_cache.get(key)
+    if embedding is not None:
+        return embedding
+    
+    pending = _embedding_inflight.get(key)
+    if pending is None:
+        pending = asyncio.ensure_future(llm_service.get_embedding(text))
+        _embedding_inflight[key] = pending
+        pending.add_done_callback(lambda _: _embedding_inflight.pop(key, None))
+    
+    # Shielded so one caller being cancelled doesn't cancel the shared request
+    embedding = await asyncio.shield(pending)
+    _embedding_cache[key] = embedding
+    return embedding
+
+
+# Seconds the active-control list is reused between chat messages
+_CONTROLS_CACHE_TTL = 30.0
+
+# IM8 codes as they appear in control names and descriptions
+_IM8_CODE_PATTERN = re.compile(r'im8-\d{2}-\d{2}')
+
+# (id, name, keyword groups)
+_ActiveControl = Tuple[int, str, FrozenSet[str]]
+# (rows, name-word automaton, lowercased IM8 code -> control id)
+_ActiveControls = Tuple[List[_ActiveControl], Optional[ahocorasick.Automaton], Dict[str, int]]
+
+# (monotonic timestamp, _ActiveControls) for _get_active_controls
+_controls_cache: Tuple[float, Optional[_ActiveControls]] = (0.0, None)
+
+
+def _get_active_controls(db: Session) -> _ActiveControls:
+    """
+    Active controls as (id, name, keyword groups the name belongs to), plus an
+    automaton mapping each lowercased name word to the first control using it
+    (None when there are no words) and a dict mapping each IM8 code found in a
+    name or description to the first control mentioning it. Cached for
+    _CONTROLS_CACHE_TTL seconds and cleared whenever a Control row is written
+    through the ORM
+    """
+    global _controls_cache
+    cached_at, cached = _controls_cache
+    if cached is not None and time.monotonic() - cached_at < _CONTROLS_CACHE_TTL:
+        return cached
+    
+    controls: List[_ActiveControl] = []
+    name_word_entries: Dict[str, int] = {}
+    im8_index: Dict[str, int] = {}
+    rows = db.query(Control.id, Control.name, Control.description).filter(Control.status == 'active').all()
+    for control_id, name, description in rows:
+        name_lower = (name or '').lower()
+        name_groups = frozenset(
+            group for group, keywords in _CONTROL_KEYWORDS.items()
+            if group in name_lower or any(kw in name_lower for kw in keywords)
+        )
+        for word in name_lower.split():
+            name_word_entries.setdefault(word, len(controls))
+        for text in (name_lower, (description or '').lower()):
+            for code in _IM8_CODE_PATTERN.findall(text):
+                im8_index.setdefault(code, control_id)
+        controls.append((control_id, name, name_groups))
+    
+    name_automaton = _build_automaton(name_word_entries) if name_word_entries else None
+    _controls_cache = (time.monotonic(), (controls, name_automaton, im8_index))
+    return controls, name_automaton, im8_index
+
+
+def _invalidate_controls_cache(mapper, connection, target) -> None:
+    """SQLAlchemy mapper event hook: drop cached controls after a Control write"""
+    global _controls_cache
+    _controls_cache = (0.0, None)
+
+
+event.listen(Control, 'after_insert', _invalidate_controls_cache)
+event.listen(Control, 'after_update', _invalidate_controls_cache)
+event.listen(Control, 'after_delete', _invalidate_controls_cache)
+
+
+def _match_control(message_lower: str, active: _ActiveControls) -> Optional[int]:
+    """First active control whose name word or keyword group appears in the message"""
+    controls, name_automaton, _ = active
+    
+    # Keyword groups mentioned in the message, found in a single pass
+    message_groups = set()
+    for _, (_, groups) in _CONTROL_KEYWORD_AUTOMATON.iter(message_lower):
+        message_groups.update(groups)
+    
+    # Position of the first control with a name word in the message, also a single pass
+    name_hit = None
+    if name_automaton is not None:
+        name_hit = min((index for _, (_, index) in name_automaton.iter(message_lower)), default=None)
+    
+    # Try to match control by keywords, in control order
+    for index, (control_id, name, name_groups) in enumerate(controls):
+        # Direct name match
+        if index == name_hit:
+            logger.debug("Matched control by name: %s (ID: %s)", name, control_id)
+            return control_id
+        
+        # Keyword matching
+        if name_groups & message_groups:
+            logger.debug("Matched control by keywords: %s (ID: %s)", name, control_id)
+            return control_id
+    
+    return None
+
+
+def _resolve_control_id(
+    db: Session, message_lower: str, im8_code: Optional[str], match_keywords: bool
+) -> Optional[int]:
+    """
+    Resolve the control a message refers to from a single read of the active
+    controls: an IM8 code mentioned in a control's name or description wins,
+    then (when match_keywords) name/keyword matching
+    """
+    active = _get_active_controls(db)
+    
+    if im8_code:
+        control_id = active[2].get(im8_code.lower())
+        if control_id is not None:
+            logger.debug("Matched %s to control_id %s by name/description", im8_code, control_id)
+            return control_id
+        logger.debug("IM8 code %s detected but not matched to specific control - will proceed with intent", im8_code)
+    
+    if match_keywords:
+        return _match_control(message_lower, active)
+    return None
+
+
 class AITaskOrchestrator:
-    """Orchestrates AI-driven agent task creation and execution"""
+    """
+    Orchestrates AI-driven agent task creation and execution
     
-    def __init__(self):
-        self.intent_patterns = {
-            'upload_evidence': [
-                'upload evidence',
-                'add evidence',
-                'submit evidence',
-                'attach evidence',
-                'provide evidence',
-                'evidence for',
-                'uploading an evidence',
-                'attached file',
-                'upload document',
-                'submit document',
-                'upload file',
-                'attach file',
-                'submit file',
-                'im8-'  # IM8 control format (e.g., IM8-01-03)
-            ],
-            'fetch_evidence': [
-                'fetch evidence',
-                'download evidence',
-                'get evidence',
-                'retrieve evidence',
-                'collect evidence'
-            ],
-            'analyze_compliance': [
-                'analyze compliance',
-                'check compliance',
-                'compliance analysis',
-                'compliance status',
-                'how compliant',
-                'compliance score'
-            ],
-            'generate_report': [
-                'generate report',
-                'create report',
-                'compliance report',
-                # Removed 'audit report' to avoid conflict with evidence uploads
-                'assessment report',
-                'generate compliance report',
-                'create compliance report'
-            ]
-        }
+    Holds no per-instance state: pattern tables, automatons and the control
+    cache are module-level, so any instance shares them.
+    """
+    
+    # Module-level tables, exposed read-only for callers that inspect them
+    intent_patterns = _INTENT_PATTERNS
+    control_keywords = _CONTROL_KEYWORDS
+    upload_indicators = _UPLOAD_INDICATORS
+    CONTROLS_CACHE_TTL = _CONTROLS_CACHE_TTL
     
     def detect_intent(self, user_message: str, has_file: bool = False) -> Optional[str]:
         """
@@ -73,22 +493,16 @@ class AITaskOrchestrator:
             Detected intent (task_type) or None
         """
         message_lower = user_message.lower()
+        if len(message_lower) < _MIN_INTENT_MESSAGE_LEN:
+            # Too short for any pattern; also keeps one-word replies out of the cache
+            return None
         
-        # If a file is uploaded, prioritize upload_evidence intent
-        if has_file:
-            # Check if message contains evidence/document upload keywords
-            upload_indicators = ['evidence', 'document', 'report', 'audit', 'assessment', 'upload', 'attach']
-            if any(indicator in message_lower for indicator in upload_indicators):
-                logger.info(f"Detected intent 'upload_evidence' due to file upload with keywords")
-                return 'upload_evidence'
-        
-        for intent, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                if pattern in message_lower:
-                    logger.info(f"Detected intent '{intent}' from pattern '{pattern}'")
-                    return intent
-        
-        return None
+        intent, pattern = _detect_intent_cached(message_lower, has_file)
+        if intent == 'upload_evidence' and pattern is None:
+            logger.debug("Detected intent 'upload_evidence' due to file upload with keywords")
+        elif intent:
+            logger.debug("Detected intent '%s' from pattern '%s'", intent, pattern)
+        return intent
     
     def extract_control_from_message(self, user_message: str, db: Session) -> Optional[int]:
         """
@@ -101,38 +515,8 @@ class AITaskOrchestrator:
         Returns:
             Control ID if matched, None otherwise
         """
-        from api.src.models import Control
-        
         message_lower = user_message.lower()
-        
-        # Get all active controls
-        controls = db.query(Control).filter(Control.status == 'active').all()
-        
-        # Control keyword matching patterns
-        control_keywords = {
-            'mfa': ['mfa', 'multi-factor', 'multi factor', '2fa', 'two-factor', 'authentication'],
-            'network': ['network', 'segmentation', 'firewall', 'network security'],
-            'encryption': ['encrypt', 'encryption', 'crypto', 'data at rest', 'encrypted'],
-            'access': ['access control', 'access management', 'identity', 'iam'],
-        }
-        
-        # Try to match control by keywords
-        for control in controls:
-            control_name_lower = control.name.lower()
-            
-            # Direct name match
-            if any(word in message_lower for word in control_name_lower.split()):
-                logger.info(f"Matched control by name: {control.name} (ID: {control.id})")
-                return control.id
-            
-            # Keyword matching
-            for keyword_group, keywords in control_keywords.items():
-                if keyword_group in control_name_lower or any(kw in control_name_lower for kw in keywords):
-                    if any(kw in message_lower for kw in keywords):
-                        logger.info(f"Matched control by keywords: {control.name} (ID: {control.id})")
-                        return control.id
-        
-        return None
+        return _match_control(message_lower, _get_active_controls(db))
     
     def extract_entities(self, user_message: str, intent: str, db: Session = None) -> Dict[str, Any]:
         """
@@ -146,70 +530,19 @@ class AITaskOrchestrator:
         Returns:
             Dictionary of extracted parameters
         """
-        entities = {}
         message_lower = user_message.lower()
+        items, im8_code = _parse_entities(message_lower)
+        entities = dict(items)
         
-        # Extract project ID
-        if 'project' in message_lower:
-            # Simple pattern matching - in production, use NER
-            words = message_lower.split()
-            for i, word in enumerate(words):
-                if word in ['project', 'project_id', 'proj']:
-                    if i + 1 < len(words) and words[i + 1].isdigit():
-                        entities['project_id'] = int(words[i + 1])
-        
-        # Extract control ID (explicit)
-        if 'control' in message_lower:
-            words = message_lower.split()
-            for i, word in enumerate(words):
-                if word in ['control', 'control_id']:
-                    if i + 1 < len(words) and words[i + 1].isdigit():
-                        entities['control_id'] = int(words[i + 1])
-        
-        # Extract IM8 control format (e.g., IM8-01-03, IM8-02-01)
-        import re
-        im8_pattern = r'im8[- ]?(\d{2})[- ]?(\d{2})'
-        im8_match = re.search(im8_pattern, message_lower)
-        if im8_match and 'control_id' not in entities:
-            domain_num = im8_match.group(1)
-            control_num = im8_match.group(2)
-            im8_code = f"IM8-{domain_num}-{control_num}"
-            logger.info(f"Detected IM8 control format: {im8_code}")
-            
-            # Map IM8 code to control using name matching and domain
-            if db:
-                from api.src.models import Control
-                # Try to find control by searching for IM8 reference in name or description
-                # Since controls don't have a control_number field, we use keyword matching
-                controls = db.query(Control).filter(Control.status == 'active').all()
-                
-                # Try direct IM8 code match in name or description
-                for control in controls:
-                    control_name = (control.name or '').lower()
-                    control_desc = (control.description or '').lower()
-                    if im8_code.lower() in control_name or im8_code.lower() in control_desc:
-                        entities['control_id'] = control.id
-                        logger.info(f"Matched {im8_code} to control_id {control.id} by name/description")
-                        break
-                
-                if 'control_id' not in entities:
-                    logger.info(f"IM8 code {im8_code} detected but not matched to specific control - will proceed with intent")
-        
-        # Intelligent control matching (if db provided and control_id not explicitly set)
-        if db and 'control_id' not in entities and intent in ['fetch_evidence', 'upload_evidence']:
-            matched_control_id = self.extract_control_from_message(user_message, db)
-            if matched_control_id:
-                entities['control_id'] = matched_control_id
+        if im8_code:
+            logger.debug("Detected IM8 control format: %s", im8_code)
         
-        # Extract framework
-        frameworks = ['im8', 'iso27001', 'iso', 'nist']
-        for framework in frameworks:
-            if framework in message_lower:
-                if framework == 'iso':
-                    entities['framework'] = 'ISO27001'
-                else:
-                    entities['framework'] = framework.upper()
-                break
+        # Map an IM8 code, then keywords (evidence intents only), to a control
+        match_keywords = 'control_id' not in entities and intent in ('fetch_evidence', 'upload_evidence')
+        if db and (im8_code or match_keywords):
+            control_id = _resolve_control_id(db, message_lower, im8_code, match_keywords)
+            if control_id is not None:
+                entities['control_id'] = control_id
         
         # Set defaults based on intent
         if intent == 'analyze_compliance':
@@ -244,53 +577,8 @@ class AITaskOrchestrator:
         Returns:
             Task payload dictionary
         """
-        if intent == 'analyze_compliance':
-            return {
-                'project_id': entities.get('project_id', 1),
-                'framework': entities.get('framework', 'IM8'),
-                'include_evidence': entities.get('include_evidence', True),
-                'generate_recommendations': entities.get('generate_recommendations', True)
-            }
-        
-        elif intent in ['fetch_evidence', 'upload_evidence']:
-            # Both fetch_evidence and upload_evidence use the same payload structure
-            sources = []
-            
-            # Use current_user_id for proper maker-checker attribution
-            creator_id = current_user_id or entities.get('created_by', 1)
-            
-            # If file path provided, use it
-            if file_path:
-                sources.append({
-                    'type': 'file',
-                    'location': file_path,
-                    'description': entities.get('description', 'Evidence uploaded via AI assistant'),
-                    'control_id': entities.get('control_id', 1)
-                })
-            else:
-                # Use default test file
-                sources.append({
-                    'type': 'file',
-                    'location': '/app/storage/test_evidence/test_doc.txt',
-                    'description': 'Default test evidence',
-                    'control_id': entities.get('control_id', 1)
-                })
-            
-            return {
-                'sources': sources,
-                'project_id': entities.get('project_id', 1),
-                'created_by': creator_id  # Use actual user ID for maker-checker
-            }
-        
-        elif intent == 'generate_report':
-            return {
-                'project_id': entities.get('project_id', 1),
-                'report_type': entities.get('report_type', 'compliance'),
-                'framework': entities.get('framework', 'IM8')
-            }
-        
-        else:
-            return {}
+        builder = _PAYLOAD_BUILDERS.get(intent, _empty_payload)
+        return builder(entities, file_path, current_user_id)
     
     def generate_task_description(self, intent: str, entities: Dict[str, Any]) -> str:
         """
@@ -303,20 +591,7 @@ class AITaskOrchestrator:
         Returns:
             Task description string
         """
-        if intent == 'analyze_compliance':
-            framework = entities.get('framework', 'IM8')
-            project_id = entities.get('project_id', 1)
-            return f"AI-initiated compliance analysis for project {project_id} using {framework} framework"
-        
-        elif intent in ['fetch_evidence', 'upload_evidence']:
-            control_id = entities.get('control_id', 1)
-            return f"AI-initiated evidence upload for control {control_id}"
-        
-        elif intent == 'generate_report':
-            return "AI-initiated compliance report generation"
-        
-        else:
-            return "AI-initiated task"
+        return _intent_config(intent).description_tpl.format(**_template_fields(entities))
     
     async def create_task_from_message(
         self,
@@ -335,62 +610,143 @@ class AITaskOrchestrator:
             file_path: Optional file path for evidence uploads
             
         Returns:
-            Dictionary with task info and response message, or None if no intent detected
+            Dictionary with task info (the task itself as a plain dict) and response
+            message, or None if no intent detected
         """
+        # Lower-case once for every scan below
+        message_lower = user_message.lower()
+        
         # Detect intent (pass has_file flag)
         has_file = file_path is not None
-        intent = self.detect_intent(user_message, has_file=has_file)
+        intent = self.detect_intent(message_lower, has_file=has_file)
         if not intent:
             return None
         
-        # Map upload_evidence to fetch_evidence (they use the same handler)
-        # The fetch_evidence handler can handle both fetching remote evidence
-        # and processing uploaded evidence files
-        task_type = 'fetch_evidence' if intent == 'upload_evidence' else intent
-        
         # Extract entities (pass db for intelligent control matching)
-        entities = self.extract_entities(user_message, intent, db=db)
+        entities = self.extract_entities(message_lower, intent, db=db)
+        logger.debug(
+            "Parse caches: intent %s, entities %s",
+            _detect_intent_cached.cache_info(), _parse_entities.cache_info()
+        )
+        
+        db_task = self._build_task(intent, entities, _user_id(current_user), file_path)
+        task = self._task_fields(db_task)  # read before commit expires the instance
+        
+        # The session is synchronous; keep the commit round-trip off the event loop
+        (task['id'],) = await asyncio.to_thread(self._persist_tasks, db, [db_task])
+        
+        logger.info("Created task %s from AI message: %s (task_type: %s)", task['id'], intent, task['task_type'])
+        
+        return {
+            'task_id': task['id'],
+            'task_type': task['task_type'],  # Return the mapped task_type
+            'message': self._generate_response_message(intent, task['id'], entities),
+            'task': task
+        }
+    
+    async def create_tasks_from_message(
+        self,
+        intents: List[Tuple[str, Dict[str, Any]]],
+        db: Session,
+        current_user: Dict[str, Any],
+        file_path: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Create one task per (intent, entities) pair in a single transaction
+        
+        For multi-intent messages ("analyze compliance and then generate a
+        report"); ids come back from one flush instead of a commit per task.
+        
+        Returns:
+            One result per intent, shaped like create_task_from_message's
+        """
+        if not intents:
+            return []
+        
+        current_user_id = _user_id(current_user)
+        db_tasks = [
+            self._build_task(intent, entities, current_user_id, file_path)
+            for intent, entities in intents
+        ]
+        tasks = [self._task_fields(db_task) for db_task in db_tasks]  # read before commit expires them
+        task_ids = await asyncio.to_thread(self._persist_tasks, db, db_tasks)
+        
+        results = []
+        for (intent, entities), task, task_id in zip(intents, tasks, task_ids):
+            task['id'] = task_id
+            logger.info("Created task %s from AI message: %s (task_type: %s)", task_id, intent, task['task_type'])
+            results.append({
+                'task_id': task_id,
+                'task_type': task['task_type'],
+                'message': self._generate_response_message(intent, task_id, entities),
+                'task': task
+            })
+        return results
+    
+    def _build_task(
+        self,
+        intent: str,
+        entities: Dict[str, Any],
+        current_user_id: Optional[int],
+        file_path: Optional[str] = None
+    ) -> AgentTask:
+        """Build an unsaved pending AgentTask for an intent"""
+        # upload_evidence maps to fetch_evidence (they use the same handler)
+        config = _intent_config(intent)
         
         # Create payload with current user ID for maker-checker
         payload = self.create_task_payload(
             intent, 
             entities, 
             file_path,
-            current_user_id=current_user.get("id") if isinstance(current_user, dict) else current_user.id
+            current_user_id=current_user_id
         )
         
         # Create task
         task_create = AgentTaskCreate(
-            task_type=task_type,  # Use mapped task_type
-            title=f"AI Assistant: {intent.replace('_', ' ').title()}",
+            task_type=config.task_type,  # Use mapped task_type
+            title=config.title,
             description=self.generate_task_description(intent, entities),
             payload=payload
         )
         
-        # Save to database
-        db_task = AgentTask(
+        return AgentTask(
             task_type=task_create.task_type,
             title=task_create.title,
             description=task_create.description,
             payload=task_create.payload,
             status="pending",
             progress=0,
-            created_by=current_user.get("id") if isinstance(current_user, dict) else current_user.id
+            created_by=current_user_id
         )
-        
-        db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
-        
-        logger.info(f"Created task {db_task.id} from AI message: {intent} (task_type: {task_type})")
-        
+    
+    @staticmethod
+    def _task_fields(task: AgentTask) -> Dict[str, Any]:
+        """Plain copy of a new task's columns, so results don't hold the ORM instance"""
         return {
-            'task_id': db_task.id,
-            'task_type': task_type,  # Return the mapped task_type
-            'message': self._generate_response_message(intent, db_task.id, entities),
-            'task': db_task
+            'id': None,
+            'task_type': task.task_type,
+            'title': task.title,
+            'description': task.description,
+            'payload': task.payload,
+            'status': task.status,
+            'progress': task.progress,
+            'created_by': task.created_by,
         }
     
+    @staticmethod
+    def _persist_tasks(db: Session, tasks: List[AgentTask]) -> List[int]:
+        """
+        Insert tasks in one transaction and return their ids (blocking; run via
+        asyncio.to_thread). The flush's INSERT ... RETURNING supplies the ids,
+        so no refresh SELECT follows the commit.
+        """
+        db.add_all(tasks)
+        db.flush()
+        task_ids = [task.id for task in tasks]
+        db.commit()
+        return task_ids
+    
     def _generate_response_message(
         self, 
         intent: str, 
@@ -398,21 +754,7 @@ class AITaskOrchestrator:
         entities: Dict[str, Any]
     ) -> str:
         """Generate AI assistant response message"""
-        
-        if intent == 'analyze_compliance':
-            framework = entities.get('framework', 'IM8')
-            project_id = entities.get('project_id', 1)
-            return f"✅ I've created a compliance analysis task (ID: {task_id}) for project {project_id} using the {framework} framework. The agent will analyze all controls and provide a detailed compliance score with recommendations. You can monitor the task progress in the Agent Tasks section."
-        
-        elif intent == 'fetch_evidence' or intent == 'upload_evidence':
-            control_id = entities.get('control_id', 1)
-            return f"✅ I've created an evidence collection task (ID: {task_id}) for control {control_id}. The agent will process and verify your document with SHA-256 checksums for integrity verification. The evidence will be securely stored and linked to the control. You can track the progress in Agent Tasks."
-        
-        elif intent == 'generate_report':
-            return f"✅ I've created a report generation task (ID: {task_id}). The agent will compile a comprehensive compliance report. Check Agent Tasks for progress."
-        
-        else:
-            return f"✅ Task {task_id} created and queued for execution."
+        return _intent_config(intent).response_tpl.format(**_template_fields(entities, task_id))
     
     async def execute_tool(
         self,
@@ -430,13 +772,10 @@ class AITaskOrchestrator:
         Returns:
             Tool execution result
         """
-        logger.info(f"Executing tool via orchestrator: {tool_name}")
+        logger.info("Executing tool via orchestrator: %s", tool_name)
         
         try:
-            # Import handlers as needed
             if tool_name == "search_documents":
-                from ..rag.vector_search import unified_search
-                
                 search_results = await unified_search.search(
                     query=arguments.get("query"),
                     top_k=arguments.get("top_k", 5),
@@ -451,20 +790,21 @@ class AITaskOrchestrator:
                 }
             
             elif tool_name == "search_evidence_content":
-                from ..rag.azure_search import AzureSearchVectorStore
-                from ..rag.llm_service import LLMService
-                from ..config import settings
-                
                 if not settings.AZURE_SEARCH_ENABLED:
                     return {
                         "success": False,
                         "error": "Evidence content search requires Azure AI Search"
                     }
                 
-                evidence_search = AzureSearchVectorStore(index_name="evidence-content")
-                llm_service = LLMService()
+                # Azure Search SDK is only loaded by deployments that enable it
+                from api.src.rag.azure_search import AzureSearchVectorStore
                 
-                query_embedding = await llm_service.get_embedding(arguments.get("query"))
+                # The embedding call dominates; build the search clients in a
+                # worker thread meanwhile instead of one after the other
+                evidence_search, query_embedding = await asyncio.gather(
+                    asyncio.to_thread(AzureSearchVectorStore, index_name="evidence-content"),
+                    _get_query_embedding(arguments.get("query") or "")
+                )
                 
                 filters = []
                 if arguments.get("control_id"):
@@ -488,8 +828,6 @@ class AITaskOrchestrator:
                 }
             
             elif tool_name == "mcp_analyze_compliance":
-                from ..mcp.client import mcp_client
-                
                 result = await mcp_client.call_tool("analyze_compliance", arguments)
                 return {"success": True, "result": result}
             
@@ -502,14 +840,14 @@ class AITaskOrchestrator:
             
             else:
                 # For other tools, log and return error
-                logger.warning(f"Tool {tool_name} not implemented in orchestrator execute_tool")
+                logger.warning("Tool %s not implemented in orchestrator execute_tool", tool_name)
                 return {
                     "success": False,
                     "error": f"Tool {tool_name} not yet implemented in orchestrator"
                 }
                 
         except Exception as e:
-            logger.error(f"Tool execution failed: {tool_name} - {e}", exc_info=True)
+            logger.error("Tool execution failed: %s - %s", tool_name, e, exc_info=True)
             return {
                 "success": False,
                 "error": str(e)
@@ -3,12 +3,14 @@ Handles multi-turn conversation state and context management
 """
 
 import uuid
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
 from api.src.utils.datetime_utils import now_sgt
 from sqlalchemy.orm.attributes import flag_modified
-from sqlalchemy import desc
+from sqlalchemy import JSON, cast, desc, func
+from sqlalchemy.exc import IntegrityError
 
 from api.src.models import ConversationSession, User
 from api.src.schemas import ConversationMessage
@@ -16,6 +18,38 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Lazily-loaded tiktoken encoding (False when tiktoken is unavailable)
+_encoding = None
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Count tokens in a message body, approximating by words if tiktoken is unavailable"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable ({e}); approximating token counts by words")
+            _encoding = False
+    
+    text = text or ""
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return int(len(text.split()) * 1.3)
+
+
+def _violates_session_id_unique(error: IntegrityError) -> bool:
+    """Whether an IntegrityError comes from the unique index on session_id
+    (rather than e.g. the user_id foreign key)"""
+    diag = getattr(error.orig, "diag", None)
+    constraint = getattr(diag, "constraint_name", None)
+    if constraint:
+        # ix_conversation_sessions_session_id, or *_session_id_key on older schemas
+        return "session_id" in constraint
+    # Drivers without diagnostics name the column in the message instead
+    return "session_id" in str(error.orig)
+
 
 class ConversationManager:
     """Manages conversation sessions and message history"""
@@ -23,6 +57,48 @@ class ConversationManager:
     def __init__(self, db: Session, user_id: int):
         self.db = db
         self.user_id = user_id
+        # Nesting depth of batch() blocks; commits are deferred while > 0
+        self._batch_depth = 0
+        # Sessions already loaded by this manager, by session_id
+        self._sessions: Dict[str, ConversationSession] = {}
+    
+    @contextmanager
+    def batch(self):
+        """Defer the commits of add_message/update_context/close_session/update_title
+        
+        Changes made inside the block are committed once when the outermost
+        block exits. If it raises, they are rolled back so that a later commit
+        on the same request session cannot persist a half-applied batch.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            if self._batch_depth == 1:
+                self.db.rollback()
+            raise
+        finally:
+            self._batch_depth -= 1
+        if not self._batch_depth:
+            self._commit_keeping_state()
+    
+    def _commit(self, session: ConversationSession) -> None:
+        """Commit a session change, unless inside batch()"""
+        if not self._batch_depth:
+            self._commit_keeping_state()
+    
+    def _commit_keeping_state(self) -> None:
+        """
+        Commit without expiring loaded objects. Every session column we write
+        is set in Python, so the objects already hold what was committed and
+        refreshing them would only re-SELECT the same row.
+        """
+        expire_on_commit = self.db.expire_on_commit
+        self.db.expire_on_commit = False
+        try:
+            self.db.commit()
+        finally:
+            self.db.expire_on_commit = expire_on_commit
     
     def create_session(self, title: Optional[str] = None, session_id: Optional[str] = None) -> ConversationSession:
         """Create a new conversation session
@@ -41,14 +117,6 @@ class ConversationManager:
         if not session_id:
             session_id = str(uuid.uuid4())
         
-        # Check if session_id already exists
-        existing = self.db.query(ConversationSession).filter(
-            ConversationSession.session_id == session_id
-        ).first()
-        
-        if existing:
-            raise ValueError(f"Session ID {session_id} already exists")
-        
         # Generate default title if not provided
         if not title:
             title = f"Conversation {now_sgt().strftime('%Y-%m-%d %H:%M')}"
@@ -62,19 +130,31 @@ class ConversationManager:
             active=True
         )
         
+        # session_id is UNIQUE, so a duplicate is detected by the insert itself
         self.db.add(db_session)
-        self.db.commit()
-        self.db.refresh(db_session)
+        try:
+            self._commit_keeping_state()
+        except IntegrityError as e:
+            self.db.rollback()
+            if _violates_session_id_unique(e):
+                raise ValueError(f"Session ID {session_id} already exists") from e
+            raise
+        self._sessions[session_id] = db_session
         
         logger.info(f"Created conversation session {session_id} for user {self.user_id}")
         return db_session
     
     def get_session(self, session_id: str) -> Optional[ConversationSession]:
-        """Get conversation session by ID"""
-        return self.db.query(ConversationSession).filter(
-            ConversationSession.session_id == session_id,
-            ConversationSession.user_id == self.user_id
-        ).first()
+        """Get conversation session by ID (queried once per manager)"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self.db.query(ConversationSession).filter(
+                ConversationSession.session_id == session_id,
+                ConversationSession.user_id == self.user_id
+            ).first()
+            if session is not None:
+                self._sessions[session_id] = session
+        return session
     
     def get_active_sessions(self, limit: int = 10) -> List[ConversationSession]:
         """Get active conversation sessions for user"""
@@ -89,6 +169,30 @@ class ConversationManager:
             ConversationSession.user_id == self.user_id
         ).order_by(desc(ConversationSession.last_activity)).limit(limit).all()
     
+    def list_session_headers(self, active_only: bool = True, limit: int = 50) -> List[Any]:
+        """List sessions for user without loading message bodies
+        
+        Returns rows with id, session_id, title, message_count, created_at,
+        last_activity and active; message_count is computed by the database.
+        """
+        query = self.db.query(
+            ConversationSession.id,
+            ConversationSession.session_id,
+            ConversationSession.title,
+            # Cast so older databases with a JSONB column work too
+            func.coalesce(
+                func.json_array_length(cast(ConversationSession.messages, JSON)), 0
+            ).label("message_count"),
+            ConversationSession.created_at,
+            ConversationSession.last_activity,
+            ConversationSession.active
+        ).filter(
+            ConversationSession.user_id == self.user_id
+        )
+        if active_only:
+            query = query.filter(ConversationSession.active == True)
+        return query.order_by(desc(ConversationSession.last_activity)).limit(limit).all()
+    
     def add_message(
         self, 
         session_id: str, 
@@ -102,15 +206,17 @@ class ConversationManager:
         if not session:
             raise ValueError(f"Session {session_id} not found")
         
+        # One clock read shared by the message timestamp and last_activity
+        now = now_sgt()
+        
         # Create message
-        # CRITICAL: Use datetime.now(timezone.utc) for proper timezone-aware timestamp
-        # This ensures ISO format includes 'Z' suffix for unambiguous UTC time
         message = {
             "role": role,
             "content": content,
-            "timestamp": now_sgt().isoformat(),
+            "timestamp": now.isoformat(),
             "task_id": task_id,
-            "tool_calls": tool_calls
+            "tool_calls": tool_calls,
+            "tokens": count_tokens(content)  # Cached for token-budgeted history
         }
         
         # Append to messages
@@ -120,10 +226,9 @@ class ConversationManager:
         # Update session - IMPORTANT: flag_modified needed for JSONB updates
         session.messages = messages
         flag_modified(session, "messages")
-        session.last_activity = now_sgt()
+        session.last_activity = now
         
-        self.db.commit()
-        self.db.refresh(session)
+        self._commit(session)
         
         logger.info(f"Added {role} message to session {session_id}")
         return session
@@ -146,8 +251,7 @@ class ConversationManager:
         flag_modified(session, "context")
         session.last_activity = now_sgt()
         
-        self.db.commit()
-        self.db.refresh(session)
+        self._commit(session)
         
         logger.info(f"Updated context for session {session_id}: {context_updates}")
         return session
@@ -161,8 +265,8 @@ class ConversationManager:
         session.active = False
         session.last_activity = now_sgt()
         
-        self.db.commit()
-        self.db.refresh(session)
+        self._commit(session)
+        self._sessions.pop(session_id, None)
         
         logger.info(f"Closed session {session_id}")
         return session
@@ -170,19 +274,46 @@ class ConversationManager:
     def get_conversation_history(
         self, 
         session_id: str, 
-        limit: Optional[int] = None
+        limit: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        exclude_last: bool = False
     ) -> List[Dict[str, Any]]:
-        """Get conversation history for a session"""
+        """Get conversation history for a session
+        
+        Args:
+            session_id: Session to read
+            limit: Keep at most this many of the most recent messages
+            max_tokens: Keep the most recent messages whose content fits in this
+                token budget (the newest message is always kept)
+            exclude_last: Drop the newest message (e.g. the user turn just added)
+        """
         session = self.get_session(session_id)
         if not session:
             return []
         
         messages = session.messages or []
         
-        if limit:
-            messages = messages[-limit:]
+        # Work out the window with index arithmetic so only one slice is made
+        end = len(messages) - 1 if exclude_last and messages else len(messages)
+        start = max(0, end - limit) if limit else 0
+        
+        if max_tokens:
+            used = 0
+            first = end
+            while first > start:
+                msg = messages[first - 1]
+                tokens = msg.get("tokens")
+                if tokens is None:
+                    tokens = count_tokens(msg.get("content"))
+                if used + tokens > max_tokens and first < end:
+                    break
+                used += tokens
+                first -= 1
+            start = first
         
-        return messages
+        if start == 0 and end == len(messages):
+            return messages
+        return messages[start:end]
     
     def get_context(self, session_id: str) -> Dict[str, Any]:
         """Get current conversation context"""
@@ -199,7 +330,6 @@ class ConversationManager:
             raise ValueError(f"Session {session_id} not found")
         
         session.title = title
-        self.db.commit()
-        self.db.refresh(session)
+        self._commit(session)
         
         return session
@@ -1,26 +1,47 @@
+import asyncio
+import base64
 import hashlib
+import os
 import secrets
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterator, Optional
+
+import aiofiles
 from fastapi import HTTPException, UploadFile, status
 from api.src.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Uploads written at once; further ones wait their turn instead of piling
+# more chunk writes and hash jobs onto the shared thread pool
+MAX_CONCURRENT_UPLOADS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def _new_sha256() -> "hashlib._Hash":
+    """SHA-256 hasher for evidence checksums.
+
+    hashlib.sha256 is OpenSSL's EVP implementation, which already uses the
+    CPU's SHA extensions (SHA-NI / ARMv8 SHA2) when present.
+    """
+    return hashlib.sha256()
+
 
 class EvidenceStorageService:
     """Handle evidence file persistence for the compliance platform."""
 
     def __init__(self) -> None:
         self.backend = settings.EVIDENCE_STORAGE_BACKEND.lower()
-        self.allowed_extensions = {ext.lower() for ext in settings.EVIDENCE_ALLOWED_EXTENSIONS}
+        self.allowed_extensions = frozenset(ext.lower() for ext in settings.EVIDENCE_ALLOWED_EXTENSIONS)
         self.max_file_size_bytes = settings.EVIDENCE_MAX_FILE_SIZE_MB * 1024 * 1024
+        self._upload_sem = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
         
         if self.backend == "local":
             self.base_path = Path(settings.EVIDENCE_STORAGE_PATH)
             self.base_path.mkdir(parents=True, exist_ok=True)
             self.blob_service_client = None
+            # (agency_id, control_id) directories already created by this process
+            self._created_dirs = set()
         elif self.backend == "azure":
             self._init_azure_storage()
             self.base_path = None
@@ -57,17 +78,27 @@ class EvidenceStorageService:
             logger.error(f"Failed to initialize Azure Blob Storage: {e}")
             raise
 
-    def _validate_extension(self, filename: str) -> None:
+    def _validate_extension(self, filename: str) -> str:
+        """Return the lowercased extension of filename, rejecting unsupported types."""
         extension = Path(filename).suffix.lower()
         if extension not in self.allowed_extensions:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"File type '{extension}' is not supported"
             )
+        return extension
+
+    @staticmethod
+    def _mint_filename(extension: str) -> str:
+        """Random 128-bit stored filename; unguessable, so evidence URLs cannot be enumerated."""
+        return f"{secrets.token_hex(16)}{extension}"
 
     def _build_target_dir(self, agency_id: int, control_id: int) -> Path:
         target_dir = self.base_path / str(agency_id) / str(control_id)
-        target_dir.mkdir(parents=True, exist_ok=True)
+        # Evidence directories are never removed, so each is created at most once
+        if (agency_id, control_id) not in self._created_dirs:
+            target_dir.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add((agency_id, control_id))
         return target_dir
 
     async def save_file(
@@ -81,31 +112,33 @@ class EvidenceStorageService:
         if not upload_file.filename:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing filename")
 
-        self._validate_extension(upload_file.filename)
+        extension = self._validate_extension(upload_file.filename)
 
-        if self.backend == "local":
-            return await self._save_file_local(upload_file, agency_id, control_id)
-        elif self.backend == "azure":
-            return await self._save_file_azure(upload_file, agency_id, control_id)
-        else:
-            raise NotImplementedError(f"Backend '{self.backend}' not implemented")
+        async with self._upload_sem:
+            if self.backend == "local":
+                return await self._save_file_local(upload_file, agency_id, control_id, extension)
+            elif self.backend == "azure":
+                return await self._save_file_azure(upload_file, agency_id, control_id, extension)
+            else:
+                raise NotImplementedError(f"Backend '{self.backend}' not implemented")
 
     async def _save_file_local(
         self,
         upload_file: UploadFile,
         agency_id: int,
-        control_id: int
+        control_id: int,
+        extension: str
     ) -> Dict[str, object]:
         """Save file to local filesystem."""
         target_dir = self._build_target_dir(agency_id, control_id)
-        extension = Path(upload_file.filename).suffix.lower()
-        generated_name = f"{secrets.token_hex(16)}{extension}"
+        generated_name = self._mint_filename(extension)
         file_path = target_dir / generated_name
 
-        sha256 = hashlib.sha256()
+        sha256 = _new_sha256()
         total_bytes = 0
 
-        with file_path.open("wb") as destination:
+        # Writes run in aiofiles' thread pool so the event loop is not blocked on disk
+        async with aiofiles.open(file_path, "wb") as destination:
             while True:
                 chunk = await upload_file.read(1024 * 1024)
                 if not chunk:
@@ -117,8 +150,12 @@ class EvidenceStorageService:
                         status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
                         detail=f"File exceeds size limit of {settings.EVIDENCE_MAX_FILE_SIZE_MB} MB"
                     )
-                destination.write(chunk)
-                sha256.update(chunk)
+                # hashlib releases the GIL on large buffers, so hashing in a worker
+                # thread overlaps with the write instead of following it
+                await asyncio.gather(
+                    destination.write(chunk),
+                    asyncio.to_thread(sha256.update, chunk)
+                )
 
         await upload_file.close()
 
@@ -135,11 +172,11 @@ class EvidenceStorageService:
         self,
         upload_file: UploadFile,
         agency_id: int,
-        control_id: int
+        control_id: int,
+        extension: str
     ) -> Dict[str, object]:
         """Save file to Azure Blob Storage."""
-        extension = Path(upload_file.filename).suffix.lower()
-        generated_name = f"{secrets.token_hex(16)}{extension}"
+        generated_name = self._mint_filename(extension)
         blob_name = f"{agency_id}/{control_id}/{generated_name}"
         
         container_name = settings.AZURE_STORAGE_CONTAINER_EVIDENCE
@@ -153,29 +190,39 @@ class EvidenceStorageService:
         
         blob_client = container_client.get_blob_client(blob_name)
         
-        sha256 = hashlib.sha256()
+        from azure.storage.blob import BlobBlock
+
+        sha256 = _new_sha256()
         total_bytes = 0
-        chunks = []
-
-        # Read file in chunks and validate size
-        while True:
-            chunk = await upload_file.read(1024 * 1024)
-            if not chunk:
-                break
-            total_bytes += len(chunk)
-            if total_bytes > self.max_file_size_bytes:
-                raise HTTPException(
-                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                    detail=f"File exceeds size limit of {settings.EVIDENCE_MAX_FILE_SIZE_MB} MB"
-                )
-            chunks.append(chunk)
-            sha256.update(chunk)
+        block_list = []
 
-        # Upload to Azure Blob Storage
+        # Stage each chunk as a block as soon as it is read, then commit the
+        # block list, so the file is never held in memory as a whole. Blocks
+        # staged before a failure are never committed and expire on their own.
         try:
-            blob_data = b''.join(chunks)
-            blob_client.upload_blob(blob_data, overwrite=True)
+            while True:
+                chunk = await upload_file.read(1024 * 1024)
+                if not chunk:
+                    break
+                total_bytes += len(chunk)
+                if total_bytes > self.max_file_size_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File exceeds size limit of {settings.EVIDENCE_MAX_FILE_SIZE_MB} MB"
+                    )
+                # Block ids must all have the same length within a blob
+                block_id = base64.b64encode(f"{len(block_list):08d}".encode()).decode()
+                # Hash alongside the block upload rather than before it
+                await asyncio.gather(
+                    asyncio.to_thread(blob_client.stage_block, block_id, chunk),
+                    asyncio.to_thread(sha256.update, chunk)
+                )
+                block_list.append(BlobBlock(block_id=block_id))
+
+            await asyncio.to_thread(blob_client.commit_block_list, block_list)
             logger.info(f"Uploaded blob: {blob_name} ({total_bytes} bytes)")
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Failed to upload blob {blob_name}: {e}")
             raise HTTPException(
@@ -224,15 +271,62 @@ class EvidenceStorageService:
             raise FileNotFoundError("Evidence file not found")
         return target_path
     
+    def file_exists(self, relative_path: str) -> bool:
+        """Check that a stored evidence file exists without reading its content."""
+
+        if self.backend == "local":
+            return (self.base_path / relative_path).is_file()
+        elif self.backend == "azure":
+            container_name = settings.AZURE_STORAGE_CONTAINER_EVIDENCE
+            container_client = self.blob_service_client.get_container_client(container_name)
+            try:
+                return container_client.get_blob_client(relative_path).exists()
+            except Exception as e:
+                logger.warning(f"Failed to check blob {relative_path}: {e}")
+                return False
+        else:
+            raise NotImplementedError(f"file_exists not supported for backend '{self.backend}'")
+
+    def iter_file(self, relative_path: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """Stream file content in chunks (works for both local and Azure).
+
+        Raises FileNotFoundError up front; the returned iterator only yields data.
+        """
+
+        if self.backend == "local":
+            target_path = self.base_path / relative_path
+            if not target_path.is_file():
+                raise FileNotFoundError(f"Evidence file not found: {relative_path}")
+            return self._iter_local_file(target_path, chunk_size)
+
+        elif self.backend == "azure":
+            container_name = settings.AZURE_STORAGE_CONTAINER_EVIDENCE
+            container_client = self.blob_service_client.get_container_client(container_name)
+            blob_client = container_client.get_blob_client(relative_path)
+
+            try:
+                return blob_client.download_blob().chunks()
+            except Exception as e:
+                raise FileNotFoundError(f"Failed to download from Azure: {e}")
+        else:
+            raise NotImplementedError(f"iter_file not supported for backend '{self.backend}'")
+
+    @staticmethod
+    def _iter_local_file(target_path: Path, chunk_size: int) -> Iterator[bytes]:
+        with open(target_path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
     def download_file(self, relative_path: str) -> bytes:
         """Download file content from storage (works for both local and Azure)."""
         
         if self.backend == "local":
-            target_path = self.base_path / relative_path
-            if not target_path.exists():
-                raise FileNotFoundError(f"Evidence file not found: {relative_path}")
-            with open(target_path, "rb") as f:
-                return f.read()
+            # Callers parse the whole document, so read it in one call; the
+            # open itself tells us whether the file exists
+            try:
+                return (self.base_path / relative_path).read_bytes()
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Evidence file not found: {relative_path}") from None
                 
         elif self.backend == "azure":
             container_name = settings.AZURE_STORAGE_CONTAINER_EVIDENCE
@@ -3,18 +3,183 @@ IM8 Excel Processor Service
 Handles parsing IM8 assessment Excel files and extracting embedded PDFs
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple
 import io
-from datetime import datetime
+import posixpath
+from collections import Counter
+import re
+import shutil
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import date, datetime, time
 from pathlib import Path
 
+from api.src.utils.datetime_utils import now_sgt
+
 try:
     from openpyxl import load_workbook
-    from openpyxl.worksheet.worksheet import Worksheet
     OPENPYXL_AVAILABLE = True
 except ImportError:
     OPENPYXL_AVAILABLE = False
 
+# Rust-backed reader, much faster than openpyxl on large workbooks; its rows
+# are normalised to what openpyxl returns (see _normalise_calamine_row)
+try:
+    from python_calamine import CalamineWorkbook
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+# A sheet read into plain row values, top-left cell first
+Rows = List[List[Any]]
+
+# OOXML namespaces used when reading the .xlsx ZIP parts directly
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_NS_XDR = "{http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing}"
+
+_EMBEDDINGS_PREFIX = "xl/embeddings/"
+_PDF_SIGNATURE = b"%PDF-"
+_COPY_BUFFER_SIZE = 256 * 1024
+_CELL_REF = re.compile(r"^\$?([A-Z]+)\$?(\d+)")
+
+# Date strings accepted in date columns, matched in one go by _parse_date
+_DATE_FORMATS = re.compile(
+    r"(\d{4})-(\d{1,2})-(\d{1,2})"
+    r"|(\d{1,2})/(\d{1,2})/(\d{4})"
+    r"|(\d{4})(\d{2})(\d{2})"
+)
+
+
+def _column_index(letters: str) -> int:
+    """Zero-based column index of a column reference ("A" -> 0)"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _normalise_calamine_row(row: List[Any]) -> List[Any]:
+    """
+    Make a calamine row hold the values openpyxl returns for the same cells:
+    blank cells are None, whole numbers are int and dates are datetime
+    """
+    normalised = []
+    for value in row:
+        if value == "":
+            value = None
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)
+        elif type(value) is date:
+            value = datetime.combine(value, time())
+        normalised.append(value)
+    return normalised
+
+
+def _parse_range(ref: str) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Bounds of a cell or range reference ("E2" or "E2:E9") as
+    (first row, first column, last row, last column); 1-based rows, 0-based columns
+    """
+    corners = []
+    for corner in ref.split(":", 1):
+        match = _CELL_REF.match(corner)
+        if not match:
+            return None
+        corners.append((int(match.group(2)), _column_index(match.group(1))))
+    (first_row, first_column), (last_row, last_column) = corners[0], corners[-1]
+    return (
+        min(first_row, last_row), min(first_column, last_column),
+        max(first_row, last_row), max(first_column, last_column)
+    )
+
+
+def _column_letters(index: int) -> str:
+    """Column reference of a zero-based column index (0 -> "A")"""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _read_rels(archive: zipfile.ZipFile, part: str) -> Dict[str, str]:
+    """Map relationship ids of a ZIP part to the archive paths they target"""
+    folder, name = posixpath.split(part)
+    rels_path = posixpath.join(folder, "_rels", name + ".rels")
+    if rels_path not in archive.NameToInfo:
+        return {}
+    
+    targets = {}
+    root = ET.fromstring(archive.read(rels_path))
+    for rel in root.iter(f"{_NS_PKG_REL}Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            target = target.lstrip("/")
+        else:
+            target = posixpath.normpath(posixpath.join(folder, target))
+        targets[rel.get("Id")] = target
+    return targets
+
+
+def _sheet_parts(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """Map sheet names to their worksheet part (e.g. xl/worksheets/sheet1.xml)"""
+    rels = _read_rels(archive, "xl/workbook.xml")
+    root = ET.fromstring(archive.read("xl/workbook.xml"))
+    return {
+        sheet.get("name"): rels[sheet.get(f"{_NS_REL}id")]
+        for sheet in root.iter(f"{_NS_MAIN}sheet")
+        if sheet.get(f"{_NS_REL}id") in rels
+    }
+
+
+def _scan_sheet_part(
+    archive: zipfile.ZipFile,
+    part: str
+) -> Tuple[List[Tuple[int, int, int, int]], List[Tuple[Optional[Tuple[int, int]], str]]]:
+    """
+    Read the hyperlinks and embedded objects of one worksheet part
+    
+    Returns:
+        ([bounds of each hyperlinked cell or range, as from _parse_range],
+         [((row, column) the object is anchored at or None, embedding path)])
+        with 1-based rows and 0-based columns
+    """
+    rels = _read_rels(archive, part)
+    hyperlinks = []
+    objects = {}
+    
+    with archive.open(part) as stream:
+        for _, element in ET.iterparse(stream):
+            tag = element.tag
+            if tag == f"{_NS_MAIN}row":
+                # Cell data is not needed here; free it as we go
+                element.clear()
+            elif tag == f"{_NS_MAIN}hyperlink":
+                bounds = _parse_range(element.get("ref", ""))
+                if bounds:
+                    hyperlinks.append(bounds)
+            elif tag == f"{_NS_MAIN}oleObject":
+                target = rels.get(element.get(f"{_NS_REL}id"))
+                if not target:
+                    continue
+                anchor = None
+                start = element.find(f"{_NS_MAIN}objectPr/{_NS_MAIN}anchor/{_NS_MAIN}from")
+                if start is not None:
+                    anchor = (
+                        int(start.findtext(f"{_NS_XDR}row", "0")) + 1,
+                        int(start.findtext(f"{_NS_XDR}col", "0"))
+                    )
+                # The same object can appear in both branches of mc:AlternateContent
+                if objects.get(target) is None:
+                    objects[target] = anchor
+    
+    return hyperlinks, [(anchor, target) for target, anchor in objects.items()]
+
 
 class IM8ExcelProcessor:
     """Process IM8 assessment Excel documents"""
@@ -32,7 +197,7 @@ class IM8ExcelProcessor:
     OPTIONAL_SHEETS = ["Instructions"]
     
     def __init__(self):
-        if not OPENPYXL_AVAILABLE:
+        if not (CALAMINE_AVAILABLE or OPENPYXL_AVAILABLE):
             raise ImportError(
                 "openpyxl is required for IM8 Excel processing. "
                 "Install with: pip install openpyxl"
@@ -53,14 +218,17 @@ class IM8ExcelProcessor:
             ValueError: If file format is invalid
         """
         try:
-            workbook = load_workbook(io.BytesIO(file_content), data_only=True)
+            workbook = self._load_sheets(file_content)
+            # Linked and embedded evidence is read straight from the ZIP parts
+            with zipfile.ZipFile(io.BytesIO(file_content)) as archive:
+                evidence_links = self._find_linked_evidence(archive)
         except Exception as e:
             raise ValueError(f"Failed to load Excel file: {str(e)}")
         
         # Validate required sheets exist
         missing_sheets = [
             sheet for sheet in self.REQUIRED_SHEETS 
-            if sheet not in workbook.sheetnames
+            if sheet not in workbook
         ]
         if missing_sheets:
             raise ValueError(
@@ -71,11 +239,13 @@ class IM8ExcelProcessor:
         metadata = self._parse_metadata_sheet(workbook["Metadata"])
         domain_1 = self._parse_domain_sheet(
             workbook["Domain_1_Info_Security_Governance"],
-            "Domain 1: Information Security Governance"
+            "Domain 1: Information Security Governance",
+            evidence_links.get("Domain_1_Info_Security_Governance")
         )
         domain_2 = self._parse_domain_sheet(
             workbook["Domain_2_Network_Security"],
-            "Domain 2: Network Security"
+            "Domain 2: Network Security",
+            evidence_links.get("Domain_2_Network_Security")
         )
         reference_policies = self._parse_reference_policies_sheet(
             workbook["Reference_Policies"]
@@ -97,13 +267,68 @@ class IM8ExcelProcessor:
         
         return result
     
-    def _parse_metadata_sheet(self, sheet: Worksheet) -> Dict[str, Any]:
+    def _load_sheets(self, file_content: bytes) -> Dict[str, Rows]:
+        """
+        Read the sheets this processor parses into lists of row values
+        
+        Uses python-calamine when installed and falls back to openpyxl.
+        Row 1 of the sheet is rows[0] and column A is row[0].
+        """
+        wanted = set(self.REQUIRED_SHEETS)
+        
+        if CALAMINE_AVAILABLE:
+            workbook = CalamineWorkbook.from_filelike(io.BytesIO(file_content))
+            return {
+                name: [
+                    _normalise_calamine_row(row)
+                    for row in workbook.get_sheet_by_name(name).to_python(skip_empty_area=False)
+                ]
+                for name in workbook.sheet_names
+                if name in wanted
+            }
+        
+        # Read-only mode streams rows without building Cell objects; hyperlinks
+        # are not available there but come from the ZIP parts instead
+        workbook = load_workbook(io.BytesIO(file_content), read_only=True, data_only=True)
+        try:
+            return {
+                name: list(workbook[name].iter_rows(values_only=True))
+                for name in workbook.sheetnames
+                if name in wanted
+            }
+        finally:
+            workbook.close()
+    
+    def _find_linked_evidence(self, archive: zipfile.ZipFile) -> Dict[str, Set[int]]:
+        """
+        Find the domain sheet rows whose Evidence cell (column E) carries a
+        hyperlink or has an embedded object anchored on it
+        """
+        evidence_column = 4
+        links = {}
+        for sheet_name, part in _sheet_parts(archive).items():
+            if not sheet_name.startswith("Domain_"):
+                continue
+            hyperlinks, objects = _scan_sheet_part(archive, part)
+            rows = set()
+            # A link on a range applies to every cell in it
+            for first_row, first_column, last_row, last_column in hyperlinks:
+                if first_column <= evidence_column <= last_column:
+                    rows.update(range(first_row, last_row + 1))
+            rows.update(
+                anchor[0] for anchor, _ in objects
+                if anchor and anchor[1] == evidence_column
+            )
+            links[sheet_name] = rows
+        return links
+    
+    def _parse_metadata_sheet(self, rows: Rows) -> Dict[str, Any]:
         """Parse Metadata sheet (key-value pairs)"""
         metadata = {}
         
         # Expect format: Column A = Field, Column B = Value
-        for row in sheet.iter_rows(min_row=1, values_only=True):
-            if row[0] and len(row) > 1:  # Has field name
+        for row in rows:
+            if row and row[0] and len(row) > 1:  # Has field name
                 field = str(row[0]).strip()
                 value = row[1] if row[1] is not None else ""
                 
@@ -113,17 +338,22 @@ class IM8ExcelProcessor:
         
         return metadata
     
-    def _parse_domain_sheet(self, sheet: Worksheet, domain_name: str) -> Dict[str, Any]:
-        """Parse domain control sheet"""
+    def _parse_domain_sheet(
+        self,
+        rows: Rows,
+        domain_name: str,
+        linked_rows: Optional[Set[int]] = None
+    ) -> Dict[str, Any]:
+        """Parse domain control sheet (linked_rows: rows whose Evidence cell is hyperlinked)"""
         controls = []
-        
-        # Get headers (row 1)
-        headers = [cell.value for cell in sheet[1]]
+        linked_rows = linked_rows or set()
         
         # Expected columns: Control ID, Control Name, Description, Status, Evidence, Implementation Date, Notes
         # Parse data rows (starting from row 2)
-        for row in sheet.iter_rows(min_row=2, values_only=False):
-            control_id = row[0].value
+        for row_number, row in enumerate(rows[1:], start=2):
+            if len(row) < 7:
+                row = list(row) + [None] * (7 - len(row))
+            control_id = row[0]
             
             # Skip empty rows
             if not control_id:
@@ -131,12 +361,14 @@ class IM8ExcelProcessor:
             
             control = {
                 "control_id": str(control_id).strip() if control_id else "",
-                "control_name": str(row[1].value).strip() if row[1].value else "",
-                "description": str(row[2].value).strip() if row[2].value else "",
-                "status": str(row[3].value).strip() if row[3].value else "",
-                "implementation_date": self._parse_date(row[5].value) if row[5].value else None,
-                "notes": str(row[6].value).strip() if row[6].value else "",
-                "has_embedded_evidence": self._check_embedded_file(row[4])
+                "control_name": str(row[1]).strip() if row[1] else "",
+                "description": str(row[2]).strip() if row[2] else "",
+                "status": str(row[3]).strip() if row[3] else "",
+                "implementation_date": self._parse_date(row[5]) if row[5] else None,
+                "notes": str(row[6]).strip() if row[6] else "",
+                "has_embedded_evidence": (
+                    row_number in linked_rows or self._check_embedded_file(row[4])
+                )
             }
             
             controls.append(control)
@@ -148,14 +380,16 @@ class IM8ExcelProcessor:
             "control_count": len(controls)
         }
     
-    def _parse_reference_policies_sheet(self, sheet: Worksheet) -> List[Dict[str, Any]]:
+    def _parse_reference_policies_sheet(self, rows: Rows) -> List[Dict[str, Any]]:
         """Parse Reference_Policies sheet"""
         policies = []
         
         # Parse data rows (starting from row 2)
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            if not row[0]:  # Skip empty rows
+        for row in rows[1:]:
+            if not row or not row[0]:  # Skip empty rows
                 continue
+            if len(row) < 5:
+                row = list(row) + [None] * (5 - len(row))
             
             policy = {
                 "policy_name": str(row[0]).strip() if row[0] else "",
@@ -169,13 +403,13 @@ class IM8ExcelProcessor:
         
         return policies
     
-    def _parse_summary_sheet(self, sheet: Worksheet) -> Dict[str, Any]:
+    def _parse_summary_sheet(self, rows: Rows) -> Dict[str, Any]:
         """Parse Summary sheet"""
         summary = {}
         
         # Parse key-value pairs (similar to metadata)
-        for row in sheet.iter_rows(values_only=True):
-            if row[0] and len(row) > 1:
+        for row in rows:
+            if row and row[0] and len(row) > 1:
                 field = str(row[0]).strip()
                 value = row[1]
                 
@@ -184,20 +418,17 @@ class IM8ExcelProcessor:
         
         return summary
     
-    def _check_embedded_file(self, cell) -> bool:
+    def _check_embedded_file(self, value: Any) -> bool:
         """
-        Check if cell contains embedded file/object
+        Check if an Evidence cell value indicates an embedded file/object
         
         Note: openpyxl has limited support for embedded objects.
         This is a basic check - may need enhancement for production.
+        Hyperlinked cells are detected by the caller.
         """
-        # Check if cell has a hyperlink or object
-        if hasattr(cell, 'hyperlink') and cell.hyperlink:
-            return True
-        
         # Check cell value indicates embedded file
-        if cell.value:
-            value_str = str(cell.value).lower()
+        if value:
+            value_str = str(value).lower()
             if 'pdf' in value_str or 'embed' in value_str:
                 return True
         
@@ -213,16 +444,31 @@ class IM8ExcelProcessor:
         
         # Try parsing string dates
         if isinstance(value, str):
-            try:
-                # Try common formats
-                for fmt in ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%Y%m%d"]:
+            text = value.strip()
+            
+            # Fast path: already ISO (YYYY-MM-DD)
+            if len(text) == 10 and text[4] == "-" and text[7] == "-":
+                try:
+                    return date.fromisoformat(text).isoformat()
+                except ValueError:
+                    pass
+            
+            # Other common formats, in order: YYYY-M-D, D/M/YYYY, M/D/YYYY, YYYYMMDD
+            match = _DATE_FORMATS.fullmatch(text)
+            if match:
+                iso_y, iso_m, iso_d, dmy_1, dmy_2, dmy_y, ymd_y, ymd_m, ymd_d = match.groups()
+                if iso_y:
+                    candidates = [(iso_y, iso_m, iso_d)]
+                elif dmy_y:
+                    candidates = [(dmy_y, dmy_2, dmy_1), (dmy_y, dmy_1, dmy_2)]
+                else:
+                    candidates = [(ymd_y, ymd_m, ymd_d)]
+                
+                for year, month, day in candidates:
                     try:
-                        dt = datetime.strptime(value.strip(), fmt)
-                        return dt.date().isoformat()
+                        return date(int(year), int(month), int(day)).isoformat()
                     except ValueError:
                         continue
-            except Exception:
-                pass
         
         return str(value)
     
@@ -239,29 +485,45 @@ class IM8ExcelProcessor:
             output_dir: Directory to save extracted PDFs
             
         Returns:
-            List of extracted PDF info (filename, path, size)
+            List of extracted PDF info (filename, path, size, sheet, cell)
             
         Note:
-            openpyxl has limited support for embedded objects.
-            For production, may need to use win32com (Windows) or 
-            extract directly from .xlsx ZIP structure.
+            Reads the .xlsx ZIP directly: members of xl/embeddings/ that
+            start with a PDF signature are copied out and mapped to the
+            cell they are anchored on. PDFs wrapped in an OLE container
+            (oleObjectN.bin) are not unpacked.
         """
         extracted_pdfs = []
         
         try:
-            workbook = load_workbook(io.BytesIO(file_content))
-            
-            # Note: This is a placeholder implementation
-            # Full implementation would need to:
-            # 1. Unzip .xlsx file (it's a ZIP archive)
-            # 2. Look for embedded objects in xl/embeddings/
-            # 3. Extract and save PDFs
-            # 4. Map PDFs to specific cells/controls
-            
-            # For MVP, we'll rely on validation that PDFs exist
-            # and assume external PDF upload if needed
-            
-            pass  # TODO: Implement full PDF extraction
+            with zipfile.ZipFile(io.BytesIO(file_content)) as archive:
+                # Where each embedding is anchored, from the worksheet parts
+                anchors = {}
+                for sheet_name, part in _sheet_parts(archive).items():
+                    for anchor, target in _scan_sheet_part(archive, part)[1]:
+                        anchors[target] = (sheet_name, anchor)
+                
+                for name in archive.namelist():
+                    if not name.startswith(_EMBEDDINGS_PREFIX) or name.endswith("/"):
+                        continue
+                    
+                    with archive.open(name) as source:
+                        if source.read(len(_PDF_SIGNATURE)) != _PDF_SIGNATURE:
+                            continue
+                    
+                    output_dir.mkdir(parents=True, exist_ok=True)
+                    destination = output_dir / (Path(name).stem + ".pdf")
+                    with archive.open(name) as source, open(destination, "wb") as target:
+                        shutil.copyfileobj(source, target, _COPY_BUFFER_SIZE)
+                    
+                    sheet_name, anchor = anchors.get(name, (None, None))
+                    extracted_pdfs.append({
+                        "filename": destination.name,
+                        "path": str(destination),
+                        "size": archive.getinfo(name).file_size,
+                        "sheet": sheet_name,
+                        "cell": f"{_column_letters(anchor[1])}{anchor[0]}" if anchor else None
+                    })
             
         except Exception as e:
             raise ValueError(f"Failed to extract embedded PDFs: {str(e)}")
@@ -270,22 +532,17 @@ class IM8ExcelProcessor:
     
     def calculate_completion_stats(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate assessment completion statistics"""
-        total_controls = 0
-        implemented = 0
-        partial = 0
-        not_started = 0
+        # Tally every status in one pass, then read off the ones we report
+        status_counts = Counter(
+            control.get("status", "").lower()
+            for domain in parsed_data.get("domains", [])
+            for control in domain.get("controls", [])
+        )
         
-        for domain in parsed_data.get("domains", []):
-            for control in domain.get("controls", []):
-                total_controls += 1
-                status = control.get("status", "").lower()
-                
-                if status == "implemented":
-                    implemented += 1
-                elif status == "partial":
-                    partial += 1
-                elif status in ["not started", "not_started"]:
-                    not_started += 1
+        total_controls = sum(status_counts.values())
+        implemented = status_counts["implemented"]
+        partial = status_counts["partial"]
+        not_started = status_counts["not started"] + status_counts["not_started"]
         
         completion_percentage = (
             (implemented / total_controls * 100) if total_controls > 0 else 0
@@ -3,13 +3,84 @@ LLM Service for Agentic AI
 Provides natural language understanding and generation capabilities
 """
 import os
-import json
+import re
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
-from openai import AzureOpenAI
+from typing import Awaitable, Callable, Dict, List, Any, Optional
+import httpx
+import orjson
+from json_repair import repair_json
+from openai import AsyncAzureOpenAI
 
 logger = logging.getLogger(__name__)
 
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$", re.MULTILINE)
+
+
+def parse_llm_json(content: str) -> Dict[str, Any]:
+    """
+    Parse a JSON object from model output
+    
+    JSON mode normally returns clean JSON, so strict parsing is tried first.
+    Fenced or truncated output (e.g. a long list cut off at max_tokens) is
+    repaired rather than discarding the whole completion.
+    """
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        pass
+    
+    cleaned = _CODE_FENCE.sub("", content.strip())
+    if cleaned.endswith("}"):
+        try:
+            return orjson.loads(cleaned)
+        except orjson.JSONDecodeError:
+            pass
+    
+    repaired = repair_json(cleaned, return_objects=True)
+    if not isinstance(repaired, dict) or not repaired:
+        raise ValueError(f"LLM returned unparseable JSON: {content[:200]}")
+    logger.warning("Repaired malformed JSON from LLM response")
+    return repaired
+
+
+def _dumps_for_prompt(data: Any) -> str:
+    """Pretty-print data for embedding in a prompt"""
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2, default=str).decode()
+
+
+# Shape of one evidence analysis; used as a structured-output schema where the
+# provider supports it so the reply needs no cleanup before parsing
+_EVIDENCE_ANALYSIS_PROPERTIES: Dict[str, Any] = {
+    "completeness_score": {"type": "number"},
+    "satisfied_requirements": {"type": "array", "items": {"type": "string"}},
+    "missing_requirements": {"type": "array", "items": {"type": "string"}},
+    "gaps": {"type": "array", "items": {"type": "string"}},
+    "recommendations": {"type": "array", "items": {"type": "string"}},
+    "metadata": {"type": "object"},
+}
+
+_EVIDENCE_ANALYSIS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": _EVIDENCE_ANALYSIS_PROPERTIES,
+    "required": list(_EVIDENCE_ANALYSIS_PROPERTIES),
+}
+
+_EVIDENCE_ANALYSIS_BATCH_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "analyses": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"evidence_id": {"type": "integer"}, **_EVIDENCE_ANALYSIS_PROPERTIES},
+                "required": ["evidence_id", *_EVIDENCE_ANALYSIS_PROPERTIES],
+            },
+        },
+    },
+    "required": ["analyses"],
+}
+
 
 class LLMService:
     """Service for interacting with Azure OpenAI / OpenAI / Groq for agentic capabilities"""
@@ -22,22 +93,26 @@ class LLMService:
         self.groq_api_key = os.getenv("GROQ_API_KEY")
         self.model = os.getenv("AZURE_OPENAI_MODEL", "gpt-4")
         
+        # Async clients share a pooled httpx client so concurrent task handlers
+        # don't block the event loop or reconnect for every request
+        self._http_client: Optional[httpx.AsyncClient] = None
         if self.azure_endpoint and self.azure_api_key:
-            self.client = AzureOpenAI(
+            self.client = AsyncAzureOpenAI(
                 api_key=self.azure_api_key,
                 api_version="2024-02-15-preview",
-                azure_endpoint=self.azure_endpoint
+                azure_endpoint=self.azure_endpoint,
+                http_client=self._build_http_client()
             )
             self.provider = "azure"
             logger.info("Initialized Azure OpenAI client")
         elif self.openai_api_key:
-            from openai import OpenAI
-            self.client = OpenAI(api_key=self.openai_api_key)
+            from openai import AsyncOpenAI
+            self.client = AsyncOpenAI(api_key=self.openai_api_key, http_client=self._build_http_client())
             self.provider = "openai"
             logger.info("Initialized OpenAI client")
         elif self.groq_api_key:
-            from groq import Groq
-            self.client = Groq(api_key=self.groq_api_key)
+            from groq import AsyncGroq
+            self.client = AsyncGroq(api_key=self.groq_api_key, http_client=self._build_http_client())
             self.model = "llama-3.3-70b-versatile"  # Groq's best model for structured output
             self.provider = "groq"
             logger.info("Initialized Groq client with llama-3.3-70b-versatile")
@@ -46,11 +121,35 @@ class LLMService:
             self.provider = None
             logger.warning("No LLM provider configured. Set AZURE_OPENAI_ENDPOINT + AZURE_OPENAI_API_KEY, OPENAI_API_KEY, or GROQ_API_KEY")
     
+    def _build_http_client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client for the LLM SDK (closed by aclose)"""
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            timeout=httpx.Timeout(60.0, connect=5.0)
+        )
+        return self._http_client
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client and its connections (call on app shutdown)"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+    
+    def _json_response_format(self, name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        response_format for a JSON reply: schema-constrained on OpenAI, plain JSON
+        mode elsewhere (the pinned Azure API version and Groq models don't all
+        accept json_schema). parse_llm_json stays as the safety net either way.
+        """
+        if self.provider == "openai":
+            return {"type": "json_schema", "json_schema": {"name": name, "schema": schema}}
+        return {"type": "json_object"}
+    
     def is_available(self) -> bool:
         """Check if LLM service is available"""
         return self.client is not None
     
-    def parse_user_intent(self, user_prompt: str, conversation_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def parse_user_intent(self, user_prompt: str, conversation_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Parse user's natural language prompt to extract intent and parameters
         Supports multi-turn conversation for gathering missing parameters
@@ -76,7 +175,7 @@ class LLMService:
         # Build context-aware system prompt
         context_info = ""
         if conversation_context:
-            context_info = f"\n\nCONVERSATION CONTEXT (previous information collected):\n{json.dumps(conversation_context, indent=2)}\n\nIMPORTANT: Merge this context with any new information from the user's message. If the user provides a parameter value (like a number or ID), add it to the parameters from the context. For example, if context shows missing 'project_id' and user says '1' or '001', set parameters.project_id = 1."
+            context_info = f"\n\nCONVERSATION CONTEXT (previous information collected):\n{_dumps_for_prompt(conversation_context)}\n\nIMPORTANT: Merge this context with any new information from the user's message. If the user provides a parameter value (like a number or ID), add it to the parameters from the context. For example, if context shows missing 'project_id' and user says '1' or '001', set parameters.project_id = 1."
         
         system_prompt = f"""You are an AI assistant for a compliance management system that uses CONVERSATIONAL information gathering.
 
@@ -162,7 +261,7 @@ Response: {{
 """
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -172,7 +271,7 @@ Response: {{
                 temperature=0.1
             )
             
-            intent = json.loads(response.choices[0].message.content)
+            intent = parse_llm_json(response.choices[0].message.content)
             logger.info(f"Parsed intent: {intent}")
             return intent
         except Exception as e:
@@ -350,7 +449,7 @@ Response: {{
         
         return len(missing) == 0 and not error_msg, missing, error_msg
     
-    def generate_controls(self, framework: str, domain_areas: List[str], count: int) -> List[Dict[str, Any]]:
+    async def generate_controls(self, framework: str, domain_areas: List[str], count: int) -> List[Dict[str, Any]]:
         """
         Generate security controls based on framework and domains
         
@@ -392,7 +491,7 @@ Return a JSON object:
         user_prompt = f"Generate {count} {framework} security controls distributed across: {', '.join(domain_areas)}"
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -403,7 +502,7 @@ Return a JSON object:
                 max_tokens=4000
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = parse_llm_json(response.choices[0].message.content)
             controls = result.get("controls", [])
             logger.info(f"Generated {len(controls)} controls")
             return controls
@@ -411,7 +510,7 @@ Return a JSON object:
             logger.error(f"Error generating controls: {str(e)}")
             raise
     
-    def generate_findings(self, findings_description: str, assessment_id: int, framework: str = "IM8") -> List[Dict[str, Any]]:
+    async def generate_findings(self, findings_description: str, assessment_id: int, framework: str = "IM8") -> List[Dict[str, Any]]:
         """
         Generate structured findings from natural language description
         
@@ -458,7 +557,7 @@ Return JSON:
 """
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -468,7 +567,7 @@ Return JSON:
                 temperature=0.3
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = parse_llm_json(response.choices[0].message.content)
             findings = result.get("findings", [])
             
             # Add assessment_id to each finding
@@ -481,7 +580,7 @@ Return JSON:
             logger.error(f"Error generating findings: {str(e)}")
             raise
     
-    def analyze_evidence(self, evidence_content: str, control_requirements: List[str]) -> Dict[str, Any]:
+    async def analyze_evidence(self, evidence_content: str, control_requirements: List[str]) -> Dict[str, Any]:
         """
         Analyze evidence document against control requirements
         
@@ -520,35 +619,137 @@ Return JSON:
 {evidence_content[:2000]}... (truncated)
 
 Control Requirements:
-{json.dumps(control_requirements, indent=2)}
+{_dumps_for_prompt(control_requirements)}
 
 Analyze this evidence."""
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
-                response_format={"type": "json_object"},
+                response_format=self._json_response_format("EvidenceAnalysis", _EVIDENCE_ANALYSIS_SCHEMA),
                 temperature=0.2
             )
             
-            analysis = json.loads(response.choices[0].message.content)
+            analysis = parse_llm_json(response.choices[0].message.content)
             logger.info(f"Evidence analysis complete. Score: {analysis.get('completeness_score', 'N/A')}")
             return analysis
         except Exception as e:
             logger.error(f"Error analyzing evidence: {str(e)}")
             raise
     
-    def generate_report(self, report_type: str, data: Dict[str, Any]) -> str:
+    async def analyze_evidence_batch(
+        self,
+        evidence_items: Dict[int, str],
+        control_requirements: List[str],
+        batch_size: int = 8
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Analyze several evidence documents against the same control requirements,
+        sending up to batch_size documents per LLM call instead of one call each
+        
+        Args:
+            evidence_items: Evidence content keyed by evidence ID
+            control_requirements: List of requirements the evidence should satisfy
+            batch_size: Maximum documents per request
+        
+        Returns:
+            Analysis results (same shape as analyze_evidence) keyed by evidence ID
+        """
+        if not self.is_available():
+            raise ValueError("LLM service not available")
+        
+        system_prompt = """You are a compliance auditor. Analyze each evidence document (marked [[id=N]]) against the control requirements.
+
+For every document provide:
+1. evidence_id: The N from the document's [[id=N]] marker
+2. completeness_score: 0-100 based on how well evidence satisfies requirements
+3. satisfied_requirements: List of requirements that are satisfied
+4. missing_requirements: List of requirements not addressed
+5. gaps: List of specific gaps found
+6. recommendations: Suggestions for improvement
+7. metadata: Any relevant metadata extracted (dates, owners, versions, etc.)
+
+Return JSON with one entry per document:
+{
+    "analyses": [
+        {"evidence_id": 1, "completeness_score": 85, "satisfied_requirements": [...], "missing_requirements": [...], "gaps": [...], "recommendations": [...], "metadata": {...}},
+        ...
+    ]
+}
+"""
+        
+        requirements_json = _dumps_for_prompt(control_requirements)
+        evidence_ids = list(evidence_items)
+        results: Dict[int, Dict[str, Any]] = {}
+        
+        async def analyze_batch(batch_ids: List[int]) -> None:
+            documents = "\n\n".join(
+                f"[[id={eid}]]\n{evidence_items[eid][:2000]}" for eid in batch_ids
+            )
+            user_prompt = f"""Evidence Documents:
+{documents}
+
+Control Requirements:
+{requirements_json}
+
+Analyze each evidence document."""
+            
+            try:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    response_format=self._json_response_format("EvidenceAnalysisBatch", _EVIDENCE_ANALYSIS_BATCH_SCHEMA),
+                    temperature=0.2
+                )
+                
+                for analysis in parse_llm_json(response.choices[0].message.content).get("analyses", []):
+                    try:
+                        eid = int(analysis.pop("evidence_id"))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    if eid in evidence_items:
+                        results[eid] = analysis
+            except Exception as e:
+                logger.error(f"Error analyzing evidence batch {batch_ids}: {str(e)}")
+            
+            # Anything the batch call dropped is analyzed individually
+            for eid in batch_ids:
+                if eid not in results:
+                    results[eid] = await self.analyze_evidence(evidence_items[eid], control_requirements)
+        
+        # Batches are independent, so issue them concurrently
+        await asyncio.gather(*(
+            analyze_batch(evidence_ids[start:start + batch_size])
+            for start in range(0, len(evidence_ids), batch_size)
+        ))
+        
+        logger.info(f"Batch evidence analysis complete for {len(results)} items")
+        return results
+    
+    async def generate_report(
+        self,
+        report_type: str,
+        data: Dict[str, Any],
+        on_section: Optional[Callable[[int, str], Awaitable[None]]] = None
+    ) -> str:
         """
         Generate compliance report in markdown format
         
+        The completion is streamed; each markdown heading is reported through
+        on_section as soon as it has been generated, so callers can show
+        progress long before the full report is finished.
+        
         Args:
             report_type: "executive" or "technical"
             data: Report data (assessment results, findings, metrics)
+            on_section: Optional async callback(section_number, heading)
         
         Returns:
             Report content in markdown format
@@ -599,21 +800,41 @@ Format in Markdown with sections:
         
         user_prompt = f"""Generate a {report_type} compliance report using this data:
 
-{json.dumps(data, indent=2)}
+{_dumps_for_prompt(data)}
 """
         
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=0.5,
-                max_tokens=2000
+                max_tokens=2000,
+                stream=True
             )
             
-            report_content = response.choices[0].message.content
+            parts: List[str] = []
+            line = ""
+            sections = 0
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                
+                # Only completed lines can be headings; carry the partial tail forward
+                *complete_lines, line = (line + delta).split("\n")
+                for complete_line in complete_lines:
+                    if complete_line.startswith("#"):
+                        sections += 1
+                        if on_section:
+                            await on_section(sections, complete_line.lstrip("#").strip())
+            
+            report_content = "".join(parts)
             logger.info(f"Generated {report_type} report ({len(report_content)} chars)")
             return report_content
         except Exception as e:
@@ -624,6 +845,15 @@ Format in Markdown with sections:
 # Singleton instance
 _llm_service = None
 
+async def close_llm_service() -> None:
+    """Close the LLMService singleton's connection pool, if it was created"""
+    if _llm_service is not None:
+        try:
+            await _llm_service.aclose()
+        except Exception as e:
+            logger.warning("Failed to close LLM service client: %s", e)
+
+
 def get_llm_service() -> LLMService:
     """Get or create LLM service singleton"""
     global _llm_service
@@ -11,6 +11,11 @@ def now_sgt() -> datetime:
     return datetime.now(SGT).replace(tzinfo=None)
 
 
+def utc_now_iso() -> str:
+    """Get current UTC time as an ISO-8601 string with a 'Z' suffix (second precision)"""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
 def utc_to_sgt(dt: datetime) -> datetime:
     """Convert UTC datetime to Singapore timezone"""
     if dt.tzinfo is None:
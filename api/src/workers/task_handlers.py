@@ -486,7 +486,7 @@ async def handle_create_controls_task(task_id: int, payload: Dict[str, Any], db:
         await update_progress(task_id, 20, f"Generating {count} controls for {framework}...")
         
         # Generate controls using LLM
-        controls_data = llm_service.generate_controls(framework, domain_areas, count)
+        controls_data = await llm_service.generate_controls(framework, domain_areas, count)
         
         await update_progress(task_id, 60, f"Generated {len(controls_data)} controls, saving to database...")
         
@@ -577,7 +577,7 @@ async def handle_create_findings_task(task_id: int, payload: Dict[str, Any], db:
         await update_progress(task_id, 20, "Parsing findings description...")
         
         # Generate findings using LLM
-        findings_data = llm_service.generate_findings(findings_description, assessment_id, framework)
+        findings_data = await llm_service.generate_findings(findings_description, assessment_id, framework)
         
         await update_progress(task_id, 60, f"Generated {len(findings_data)} findings, saving to database...")
         
@@ -672,17 +672,28 @@ async def handle_analyze_evidence_task(task_id: int, payload: Dict[str, Any], db
         
         await update_progress(task_id, 20, f"Analyzing {len(evidence_ids)} evidence items...")
         
+        evidence_by_id = {
+            evidence.id: evidence
+            for evidence in db.query(Evidence).filter(Evidence.id.in_(evidence_ids)).all()
+        }
+        found_ids = [eid for eid in evidence_ids if eid in evidence_by_id]
+        
+        # For now, analyze based on file name and type
+        # In production, you'd read the actual file content from Azure Blob Storage
+        evidence_contents = {
+            eid: f"File: {evidence_by_id[eid].file_name}\nType: {evidence_by_id[eid].type}\nDescription: {evidence_by_id[eid].description or 'N/A'}"
+            for eid in found_ids
+        }
+        
+        # One LLM call per batch of documents rather than one per document
+        analyses = await llm_service.analyze_evidence_batch(evidence_contents, requirements)
+        
+        await update_progress(task_id, 80, f"Analyzed {len(analyses)} evidence items, saving results...")
+        
         analysis_results = []
-        for idx, evidence_id in enumerate(evidence_ids):
-            evidence = db.query(Evidence).filter(Evidence.id == evidence_id).first()
-            if not evidence:
-                continue
-            
-            # For now, analyze based on file name and type
-            # In production, you'd read the actual file content from Azure Blob Storage
-            evidence_content = f"File: {evidence.file_name}\nType: {evidence.type}\nDescription: {evidence.description or 'N/A'}"
-            
-            analysis = llm_service.analyze_evidence(evidence_content, requirements)
+        for evidence_id in found_ids:
+            evidence = evidence_by_id[evidence_id]
+            analysis = analyses[evidence_id]
             
             # Update evidence with analysis results
             evidence.review_comments = f"AI Analysis - Completeness: {analysis.get('completeness_score', 0)}%\n" + \
@@ -694,9 +705,6 @@ async def handle_analyze_evidence_task(task_id: int, payload: Dict[str, Any], db
                 "completeness_score": analysis.get("completeness_score", 0),
                 "gaps": analysis.get("gaps", [])
             })
-            
-            progress = 20 + int((idx + 1) / len(evidence_ids) * 70)
-            await update_progress(task_id, progress, f"Analyzed {idx + 1}/{len(evidence_ids)} items...")
         
         db.commit()
         
@@ -788,7 +796,10 @@ async def handle_generate_compliance_report_task(task_id: int, payload: Dict[str
         await update_progress(task_id, 60, f"Generating {report_type} report...")
         
         # Generate report using LLM
-        report_content = llm_service.generate_report(report_type, report_data)
+        async def report_section_written(section: int, heading: str) -> None:
+            await update_progress(task_id, min(60 + section * 5, 95), f"Writing report: {heading}")
+        
+        report_content = await llm_service.generate_report(report_type, report_data, on_section=report_section_written)
         
         await update_progress(task_id, 100, "Report generated successfully")
         
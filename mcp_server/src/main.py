@@ -173,6 +173,14 @@ async def call_tool(request: ToolCallRequest):
     try:
         logger.info(f"Tool call request: tool='{request.tool}', available_tools={list(registry.tools.keys())}")
         
+        # "<tool>_batch" runs several calls of one tool in a single round-trip
+        if request.tool.endswith("_batch") and request.tool not in registry.tools:
+            tool = registry.get(request.tool[:-len("_batch")])
+            return ToolCallResponse(
+                success=True,
+                result={"results": await _execute_batch(tool, request.parameters.get("calls", []))}
+            )
+        
         # Get tool from registry
         tool = registry.get(request.tool)
         
@@ -212,6 +220,17 @@ async def call_tool(request: ToolCallRequest):
         )
 
 
+async def _execute_batch(tool: MCPTool, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Execute each parameter set in order; one failing call does not abort the rest"""
+    results = []
+    for parameters in calls:
+        try:
+            results.append({"success": True, "result": await tool.instance.execute(parameters)})
+        except Exception as e:
+            results.append({"success": False, "error": str(e)})
+    return results
+
+
 # ==================== Legacy Endpoints (for backward compatibility) ====================
 
 @app.get("/sample-evidence", response_model=List[SampleEvidence])
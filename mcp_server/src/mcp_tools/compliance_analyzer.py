@@ -103,6 +103,9 @@ class ComplianceAnalyzerTool:
         total_score = 0.0
         status_counts = defaultdict(int)  # Auto-initialize any status to 0
         critical_gaps = []
+        # Tallies for the high-level recommendations, taken in the same pass
+        needs_evidence = 0
+        not_implemented = 0
         
         # Normalize statuses (pending -> not_implemented for reporting)
         def normalize_status(status: str) -> str:
@@ -124,6 +127,11 @@ class ComplianceAnalyzerTool:
             normalized_status = normalize_status(assessment.status)
             status_counts[normalized_status] += 1
             
+            if assessment.status in ("implemented", "partial") and assessment.evidence_count == 0:
+                needs_evidence += 1
+            elif assessment.status == "not_implemented":
+                not_implemented += 1
+            
             # Collect critical gaps (score < 0.3)
             if assessment.score < 0.3 and assessment.status != "not_applicable":
                 critical_gaps.extend([
@@ -137,7 +145,8 @@ class ComplianceAnalyzerTool:
         
         # Generate high-level recommendations
         recommendations = await self._generate_recommendations(
-            control_assessments,
+            needs_evidence,
+            not_implemented,
             overall_score
         )
         
@@ -370,10 +379,18 @@ class ComplianceAnalyzerTool:
     
     async def _generate_recommendations(
         self,
-        control_assessments: List[ControlAssessment],
+        needs_evidence: int,
+        not_implemented: int,
         overall_score: float
     ) -> List[str]:
-        """Generate high-level recommendations"""
+        """
+        Generate high-level recommendations
+        
+        Args:
+            needs_evidence: Implemented/partial controls with no evidence
+            not_implemented: Controls not yet implemented
+            overall_score: Overall compliance score (0-100)
+        """
         recommendations = []
         
         # Score-based recommendations
@@ -402,24 +419,12 @@ class ComplianceAnalyzerTool:
                 "and keep evidence up to date."
             )
         
-        # Count controls needing evidence
-        needs_evidence = sum(
-            1 for ca in control_assessments
-            if ca.status in ["implemented", "partial"] and ca.evidence_count == 0
-        )
-        
         if needs_evidence > 0:
             recommendations.append(
                 f"📎 Upload evidence for {needs_evidence} control(s) to strengthen "
                 f"compliance demonstration"
             )
         
-        # Count not implemented
-        not_implemented = sum(
-            1 for ca in control_assessments
-            if ca.status == "not_implemented"
-        )
-        
         if not_implemented > 0:
             recommendations.append(
                 f"🔧 Implement {not_implemented} control(s) to improve compliance score"
@@ -0,0 +1,112 @@
+"""
+Tests for ConversationManager.get_conversation_history windowing
+(api/src/services/conversation_manager.py)
+
+Sessions are put straight into the manager's per-request cache, so no
+database is needed.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from api.src.services.conversation_manager import ConversationManager, count_tokens
+
+SESSION_ID = "session-1"
+
+
+def _messages(*tokens):
+    """Messages whose cached token counts are the given numbers"""
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}", "tokens": t}
+        for i, t in enumerate(tokens)
+    ]
+
+
+def _manager(messages):
+    manager = ConversationManager(db=MagicMock(), user_id=1)
+    manager._sessions[SESSION_ID] = SimpleNamespace(messages=messages)
+    return manager
+
+
+def _reference_window(messages, limit=None, max_tokens=None, exclude_last=False):
+    """The window built with plain slicing: drop the newest, then limit, then budget"""
+    if exclude_last:
+        messages = messages[:-1]
+    if limit:
+        messages = messages[-limit:]
+    if max_tokens:
+        used = 0
+        start = len(messages)
+        while start > 0:
+            msg = messages[start - 1]
+            tokens = msg.get("tokens")
+            if tokens is None:
+                tokens = count_tokens(msg.get("content"))
+            # The newest message is kept even when it alone exceeds the budget
+            if used + tokens > max_tokens and start < len(messages):
+                break
+            used += tokens
+            start -= 1
+        messages = messages[start:]
+    return messages
+
+
+class TestHistoryWindow:
+
+    @pytest.mark.parametrize("tokens", [(), (5,), (5, 5), (3, 4, 5, 6, 7)])
+    @pytest.mark.parametrize("limit", [None, 0, 1, 2, 5, 10])
+    @pytest.mark.parametrize("max_tokens", [None, 0, 1, 5, 6, 11, 18, 100])
+    @pytest.mark.parametrize("exclude_last", [False, True])
+    def test_matches_slicing(self, tokens, limit, max_tokens, exclude_last):
+        messages = _messages(*tokens)
+
+        window = _manager(messages).get_conversation_history(
+            SESSION_ID, limit=limit, max_tokens=max_tokens, exclude_last=exclude_last
+        )
+
+        assert window == _reference_window(messages, limit, max_tokens, exclude_last)
+
+    def test_full_window_is_not_copied(self):
+        messages = _messages(1, 2, 3)
+
+        assert _manager(messages).get_conversation_history(SESSION_ID) is messages
+        assert _manager(messages).get_conversation_history(SESSION_ID, limit=3, max_tokens=6) is messages
+
+    def test_exclude_last_drops_current_turn_before_budget(self):
+        # The just-added message (50 tokens) must not use up the budget
+        messages = _messages(4, 4, 50)
+
+        window = _manager(messages).get_conversation_history(SESSION_ID, max_tokens=8, exclude_last=True)
+
+        assert window == messages[:2]
+
+    def test_newest_message_kept_when_over_budget(self):
+        messages = _messages(1, 1, 30)
+
+        assert _manager(messages).get_conversation_history(SESSION_ID, max_tokens=10) == messages[2:]
+
+    def test_exclude_last_on_single_message(self):
+        messages = _messages(5)
+
+        assert _manager(messages).get_conversation_history(SESSION_ID, exclude_last=True) == []
+        assert _manager(messages).get_conversation_history(
+            SESSION_ID, limit=1, max_tokens=1, exclude_last=True
+        ) == []
+
+    def test_missing_token_counts_are_computed(self):
+        messages = _messages(None, None, None)
+        per_message = count_tokens(messages[0]["content"])
+
+        window = _manager(messages).get_conversation_history(SESSION_ID, max_tokens=2 * per_message)
+
+        assert window == messages[1:]
+
+    def test_unknown_or_empty_session(self):
+        manager = _manager(None)
+
+        assert manager.get_conversation_history(SESSION_ID, limit=2, exclude_last=True) == []
+
+        manager.db.query.return_value.filter.return_value.first.return_value = None
+        assert manager.get_conversation_history("missing") == []
@@ -0,0 +1,184 @@
+"""
+Tests for the IM8 Excel processor (api/src/services/excel_processor.py)
+
+Fixtures live in tests/fixtures/:
+- im8_assessment.xlsx: the five required sheets with numbers, blanks, dates
+  and date strings, saved by openpyxl
+- im8_embedded_evidence.xlsx: Domain 1 has a hyperlink on the range E3:E4,
+  a PDF anchored at E5 and a hyperlink on F6; Domain 2 has a PDF anchored at
+  E2 and an OLE-wrapped (non-PDF) object anchored at E3
+"""
+
+import io
+import zipfile
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+
+from api.src.services import excel_processor
+from api.src.services.excel_processor import IM8ExcelProcessor
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def assessment_workbook() -> bytes:
+    return (FIXTURES / "im8_assessment.xlsx").read_bytes()
+
+
+@pytest.fixture
+def embedded_workbook() -> bytes:
+    return (FIXTURES / "im8_embedded_evidence.xlsx").read_bytes()
+
+
+def _parse_with(monkeypatch, use_calamine: bool, content: bytes) -> dict:
+    monkeypatch.setattr(excel_processor, "CALAMINE_AVAILABLE", use_calamine)
+    parsed = IM8ExcelProcessor().parse_im8_document(content, "im8_assessment.xlsx")
+    parsed.pop("parsed_at")
+    return parsed
+
+
+class TestReaders:
+    """calamine and openpyxl must produce the same parse"""
+
+    def test_calamine_and_openpyxl_parse_identically(self, monkeypatch, assessment_workbook):
+        pytest.importorskip("openpyxl")
+        pytest.importorskip("python_calamine")
+
+        with_openpyxl = _parse_with(monkeypatch, False, assessment_workbook)
+        with_calamine = _parse_with(monkeypatch, True, assessment_workbook)
+
+        assert with_calamine == with_openpyxl
+
+    def test_parsed_values(self, monkeypatch, assessment_workbook):
+        pytest.importorskip("openpyxl")
+
+        parsed = _parse_with(monkeypatch, False, assessment_workbook)
+
+        assert parsed["metadata"]["assessment_year"] == 2024
+        assert parsed["metadata"]["assessor"] == ""
+        assert parsed["summary"]["implemented_percentage"] == 40
+        assert parsed["summary"]["remarks"] is None
+
+        first, second, third = parsed["domains"][0]["controls"]
+        assert first["control_id"] == "1"
+        assert first["implementation_date"] == "2024-01-15"
+        assert first["has_embedded_evidence"] is True
+        assert second["description"] == ""
+        assert second["implementation_date"] == "2024-04-03"
+        assert third["notes"] == "42"
+
+        assert parsed["reference_policies"][0] == {
+            "policy_name": "IT Security Policy",
+            "version": "2",
+            "approval_date": "2023-06-30",
+            "document_location": "SharePoint",
+            "notes": "",
+        }
+
+
+class TestEmbeddedEvidence:
+    """Hyperlinks and embedded objects read from the .xlsx ZIP parts"""
+
+    def test_linked_evidence_rows(self, embedded_workbook):
+        with zipfile.ZipFile(io.BytesIO(embedded_workbook)) as archive:
+            links = IM8ExcelProcessor()._find_linked_evidence(archive)
+
+        assert links == {
+            # E3:E4 range link and the object at E5; the F6 link is not Evidence
+            "Domain_1_Info_Security_Governance": {3, 4, 5},
+            "Domain_2_Network_Security": {2, 3},
+        }
+
+    def test_has_embedded_evidence_flags(self, monkeypatch, embedded_workbook):
+        pytest.importorskip("openpyxl")
+
+        parsed = _parse_with(monkeypatch, False, embedded_workbook)
+
+        flags = {
+            control["control_id"]: control["has_embedded_evidence"]
+            for domain in parsed["domains"]
+            for control in domain["controls"]
+        }
+        assert flags == {
+            "IM8-1.1": False,
+            "IM8-1.2": True,
+            "IM8-1.3": True,
+            "IM8-1.4": True,
+            "IM8-1.5": False,
+            "IM8-2.1": True,
+            "IM8-2.2": True,
+            "IM8-2.3": False,
+        }
+
+    def test_extract_embedded_pdfs(self, tmp_path, embedded_workbook):
+        extracted = IM8ExcelProcessor().extract_embedded_pdfs(embedded_workbook, tmp_path / "pdfs")
+
+        located = sorted((pdf["sheet"], pdf["cell"], pdf["filename"]) for pdf in extracted)
+        assert located == [
+            ("Domain_1_Info_Security_Governance", "E5", "oleObject1.pdf"),
+            ("Domain_2_Network_Security", "E2", "oleObject2.pdf"),
+        ]
+        for pdf in extracted:
+            content = Path(pdf["path"]).read_bytes()
+            assert content.startswith(b"%PDF-")
+            assert pdf["size"] == len(content)
+
+
+def _strptime_parse_date(value):
+    """_parse_date as it was before the regex rewrite, for comparison"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, str):
+        for fmt in ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%Y%m%d"]:
+            try:
+                return datetime.strptime(value.strip(), fmt).date().isoformat()
+            except ValueError:
+                continue
+    return str(value)
+
+
+class TestParseDate:
+    """_parse_date must keep the behaviour of the old strptime loop"""
+
+    @pytest.mark.parametrize("value, expected", [
+        # ISO (fast path)
+        ("2024-01-02", "2024-01-02"),
+        ("  2024-01-02 ", "2024-01-02"),
+        # YYYY-M-D
+        ("2024-1-2", "2024-01-02"),
+        ("2024-01-2", "2024-01-02"),
+        # D/M/YYYY is tried before M/D/YYYY
+        ("03/04/2024", "2024-04-03"),
+        ("1/2/2024", "2024-02-01"),
+        ("12/31/2024", "2024-12-31"),
+        ("31/12/2024", "2024-12-31"),
+        # YYYYMMDD
+        ("20240105", "2024-01-05"),
+        # Invalid dates and other strings come back unchanged
+        ("2024-02-30", "2024-02-30"),
+        ("2024-13-01", "2024-13-01"),
+        ("13/13/2024", "13/13/2024"),
+        ("99999999", "99999999"),
+        ("2024-W01-1", "2024-W01-1"),
+        ("2024/01/02", "2024/01/02"),
+        ("not a date", "not a date"),
+        ("", ""),
+        # Non-string input
+        (None, None),
+        (datetime(2024, 3, 1, 15, 30), "2024-03-01"),
+        (20240105, "20240105"),
+        (45292.0, "45292.0"),
+    ])
+    def test_matches_strptime_behaviour(self, value, expected):
+        parsed = IM8ExcelProcessor()._parse_date(value)
+
+        assert parsed == expected
+        assert parsed == _strptime_parse_date(value)
+
+    def test_leap_day(self):
+        assert IM8ExcelProcessor()._parse_date("29/02/2024") == date(2024, 2, 29).isoformat()
+        assert IM8ExcelProcessor()._parse_date("29/02/2023") == "29/02/2023"